@@ -8,12 +8,14 @@
 
 from .dc_pf import DCPF
 from .dc_opf import DCOPF
+from .scdc_opf import SCDCOPF
 from .ac_pf import ACPF
 from .ac_opf import ACOPF
 from .method import PFmethod
 from .method_error import PFmethodError
+from .dist_factors import DistributionFactors
 
-methods = [DCPF,DCOPF,ACPF,ACOPF]
+methods = [DCPF,DCOPF,SCDCOPF,ACPF,ACOPF]
 
 def new_method(name):
     """
@@ -21,7 +23,7 @@ def new_method(name):
     
     Parameters
     ----------
-    name : {``'DCPF'``, ``'DCOPF'``, ``'ACPF'``, ``'ACOPF'``}
+    name : {``'DCPF'``, ``'DCOPF'``, ``'SCDCOPF'``, ``'ACPF'``, ``'ACOPF'``}
     """
     
     try:
@@ -0,0 +1,105 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+from .method_error import *
+from .dc_pf import DCPF
+from .dc_utils import get_period_values
+
+def get_voltages(net):
+    """
+    Gets bus voltage magnitudes and angles.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    v_mag : 2-D array
+            Magnitudes (buses x time periods)
+    v_ang : 2-D array
+            Angles (buses x time periods)
+    """
+
+    T = net.num_periods
+    v_mag = np.array([get_period_values(bus.v_mag,T) for bus in net.buses]).reshape((net.num_buses,T))
+    v_ang = np.array([get_period_values(bus.v_ang,T) for bus in net.buses]).reshape((net.num_buses,T))
+    return v_mag,v_ang
+
+def set_voltages(net,v_mag,v_ang):
+    """
+    Sets bus voltage magnitudes and angles.
+
+    Parameters
+    ----------
+    net : |Network|
+    v_mag : 2-D array
+            Magnitudes (buses x time periods)
+    v_ang : 2-D array
+            Angles (buses x time periods)
+    """
+
+    T = net.num_periods
+    for bus in net.buses:
+        bus.v_mag = v_mag[bus.index,0] if T == 1 else v_mag[bus.index,:]
+        bus.v_ang = v_ang[bus.index,0] if T == 1 else v_ang[bus.index,:]
+
+def apply_init(net,init,previous=None):
+    """
+    Sets initial bus voltages of network for AC methods. Modes are
+    ``'network'`` (current values), ``'flat'`` (unit magnitudes or set
+    points of regulated buses, and angles of the slack bus), ``'dc'``
+    (flat magnitudes and DC power flow angles), and ``'previous'``
+    (voltages of a previous solution, or current values if there is none
+    or it does not match the network). Slack buses are not modified.
+
+    Parameters
+    ----------
+    net : |Network|
+    init : string
+    previous : tuple
+               Magnitudes and angles of previous solution (see :func:`get_voltages`)
+    """
+
+    T = net.num_periods
+    v_mag,v_ang = get_voltages(net)
+    slack = np.array([bus.is_slack() for bus in net.buses],dtype=bool)
+
+    # Network
+    if init == 'network':
+        return
+
+    # Previous
+    elif init == 'previous':
+        if previous is None or previous[0].shape != v_mag.shape:
+            return
+        new_mag,new_ang = previous
+
+    # Flat and DC
+    elif init in ['flat','dc']:
+        new_mag = np.ones(v_mag.shape)
+        for bus in net.buses:
+            if bus.is_regulated_by_gen():
+                new_mag[bus.index,:] = get_period_values(bus.v_set,T)
+        new_ang = np.zeros(v_ang.shape)
+        if np.any(slack):
+            new_ang[:,:] = v_ang[np.where(slack)[0][0],:]
+        if init == 'dc':
+            method = DCPF()
+            method.solve(net)
+            new_ang = get_voltages(method.get_results()['network snapshot'])[1]
+
+    # Invalid
+    else:
+        raise PFmethodError_BadParams(['init'])
+
+    # Set
+    v_mag[~slack,:] = new_mag[~slack,:]
+    v_ang[~slack,:] = new_ang[~slack,:]
+    set_voltages(net,v_mag,v_ang)
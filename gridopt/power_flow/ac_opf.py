@@ -8,10 +8,25 @@
 
 from __future__ import print_function
 import time
+import multiprocessing
 import numpy as np
 from .method_error import *
 from .method import PFmethod
+from .ac_init import apply_init, get_voltages
+from .nr_linsolver import norm_inf
+from .terminations import get_terminations
+from .warm_start import get_var_indices, map_vars
+from .ac_utils import get_branch_flows, project_ramps
+from .ac_periods import get_json_data, get_period_data, set_solutions, map_periods, get_num_procs
+from .multi_start import get_starts, solve_start
+from .krylov import KrylovLinSolver, KRYLOV_SOLVERS, install_linsolvers
         
+# Results of lazy thermal limits, decomposed periods and multi-start
+MODE_RESULTS = ['lazy rounds','lazy branches',
+                'admm iterations','admm primal residuals','admm dual residuals',
+                'period statuses','period iterations','period times',
+                'start statuses','start costs','best start','cancelled starts']
+
 class ACOPF(PFmethod):
     """
     AC optimal power flow method.
@@ -26,7 +41,25 @@ class ACOPF(PFmethod):
                    'weight_t' : 0.,         # weight for tap ratios regularization
                    'weight_b' : 0.,         # weight for shunt susceptances regularization
                    'thermal_limits': False, # flag for thermal limits
+                   'lazy_thermal_limits': False, # flag for adding thermal limits of overloaded branches in rounds
+                   'lazy_margin': 0.05,     # fraction of rating for adding nearly overloaded branches
+                   'lazy_max_rounds': 10,   # max number of rounds
                    'vmin_thresh': 0.1,      # threshold for vmin termination
+                   'vmax_thresh': 2.0,      # threshold for vmax termination (zero to disable)
+                   'growth_iters': 0,       # consecutive mismatch increases for divergence (zero to disable)
+                   'stag_iters': 0,         # iterations without mismatch progress for stagnation (zero to disable)
+                   'stag_tol': 1e-3,        # min relative mismatch progress for stagnation
+                   'init': 'network',       # initial voltages (network, flat, dc, previous)
+                   'decompose_periods': False, # flag for solving time periods with ADMM over ramping limits dP_max (zero for none)
+                   'num_procs': 0,          # number of processes for decomposed periods (zero for all cores)
+                   'admm_rho': 1.,          # initial ADMM penalty
+                   'admm_maxiter': 50,      # max number of ADMM iterations
+                   'admm_tol': 1e-4,        # tolerance for ADMM primal and dual residuals
+                   'num_starts': 0,         # number of starting points for parallel multi-start (zero to disable)
+                   'start_perturbation': 0.05, # std of random perturbations of voltages of starting points
+                   'start_seed': 0,         # seed of random perturbations of starting points
+                   'cost_bound': -np.inf,   # known lower bound of generation cost for stopping multi-start
+                   'bound_tol': 1e-3,       # relative tolerance of generation cost with respect to bound
                    'solver': 'augl'}        # OPTALG optimization solver (augl, ipopt, inlp)
 
     _parameters_augl = {'feastol' : 1e-4,
@@ -54,10 +87,109 @@ class ACOPF(PFmethod):
         inlp_params = OptSolverINLP.parameters.copy()
         inlp_params.update(self._parameters_inlp)   # overwrite defaults
 
+        krylov_params = KrylovLinSolver.parameters.copy()
+
         self._parameters = ACOPF._parameters.copy()
         self._parameters['solver_parameters'] = {'augl': augl_params,
                                                  'ipopt': ipopt_params,
-                                                 'inlp': inlp_params}
+                                                 'inlp': inlp_params,
+                                                 'krylov': krylov_params}
+
+        # Previous solution
+        self._previous = None
+
+        # Warm start
+        self._warm_start = None
+
+    def set_warm_start(self,x=None,duals=None,net=None,results=None):
+        """
+        Sets starting point for the next solves. Values are mapped
+        onto the variables of the new problem by component and quantity,
+        so the primal and dual variables of an ACPF, DCOPF or ACOPF solve
+        can be used even if generator outages changed the number of
+        variables. Dual variables of constraints other than variable
+        bounds are only used if their sizes match the new problem.
+
+        Parameters
+        ----------
+        x : vector
+            Primal variables (``None`` removes warm start)
+        duals : list
+                Dual variables ``[lam,nu,mu,pi]``
+        net : |Network|
+              Network whose flags define the ordering of the variables
+              (``None`` for the ordering of the new problem)
+        results : dict
+                  Results of a previous solve, which give the primal and
+                  dual variables and the network
+        """
+
+        if results is not None:
+            x = results['solver primal variables']
+            duals = results['solver dual variables']
+            net = results['network snapshot']
+
+        if x is None:
+            self._warm_start = None
+        else:
+            self._warm_start = {'x': np.array(x,dtype=float),
+                                'duals': duals,
+                                'vars': get_var_indices(net) if net is not None else None}
+
+    def apply_warm_start(self,net,problem):
+        """
+        Applies warm start to problem.
+
+        Parameters
+        ----------
+        net : |Network|
+        problem : |Problem|
+
+        Returns
+        -------
+        problem : :class:`OptProblem <optalg.opt_solver.problem.OptProblem>`
+        """
+
+        from optalg.opt_solver.problem import cast_problem
+
+        ws = self._warm_start
+        n = net.num_vars
+        dst = get_var_indices(net)
+
+        # Mapping
+        if ws['vars'] is not None:
+            remap = lambda v,v0: map_vars(v,ws['vars'],dst,v0)
+        elif ws['x'].size >= n:
+            remap = lambda v,v0: np.array(v[:n],dtype=float)
+        else:
+            raise PFmethodError_BadWarmStart()
+
+        # Primal
+        x = np.array(problem.x,dtype=float)
+        x[:n] = remap(ws['x'],x[:n])
+        net.set_var_values(x[:n])
+
+        # Problem
+        opt_problem = cast_problem(problem)
+        opt_problem.x = x
+
+        # Duals
+        if ws['duals'] is not None and all([d is not None for d in ws['duals']]):
+            lam,nu,mu,pi = [np.array(d,dtype=float) for d in ws['duals']]
+            same = lambda v,m: v if v.size == m else np.zeros(m)
+            nG = problem.G.shape[0]
+            n_src = ws['vars'][1].size if ws['vars'] is not None else n
+            def bounds(v):
+                if v.size < n_src:
+                    return np.zeros(nG)
+                return np.hstack((remap(v,np.zeros(n)),same(v[n_src:],nG-n)))
+            opt_problem.lam = same(lam,problem.A.shape[0])
+            opt_problem.nu = same(nu,problem.f.size)
+            opt_problem.mu = bounds(mu)
+            opt_problem.pi = bounds(pi)
+
+        # Return
+        return opt_problem
                    
     def create_problem(self,net):
         
@@ -108,7 +240,7 @@ class ACOPF(PFmethod):
         # Constraints
         problem.add_constraint(pfnet.Constraint('AC power balance',net))
         problem.add_constraint(pfnet.Constraint('variable bounds',net))
-        if th:
+        if th and np.any([br.ratingA > 0. for br in net.branches]):
             problem.add_constraint(pfnet.Constraint("AC branch flow limits",net))
 
         # Functions
@@ -136,12 +268,325 @@ class ACOPF(PFmethod):
             
     def solve(self,net):
 
+        # Parameters
+        params = self._parameters
+
+        # Clear results of modes
+        for key in MODE_RESULTS:
+            self.results.pop(key,None)
+
+        # Multi-start
+        if params['num_starts'] > 1:
+            self.solve_multi_start(net)
+
+        # Decomposed periods
+        elif params['decompose_periods'] and net.num_periods > 1:
+            self.solve_decomposed(net)
+
+        # Lazy thermal limits
+        elif params['thermal_limits'] and params['lazy_thermal_limits']:
+            self.solve_lazy(net)
+
+        else:
+            self.solve_problem(net)
+
+    def solve_multi_start(self,net):
+        """
+        Solves problem from several starting points on a pool of processes
+        and keeps the solution with the lowest generation cost among those
+        that are solved. Starting points use the current, DC power flow and
+        flat voltages, and random perturbations of the current voltages.
+        If a solution has a generation cost within a relative tolerance
+        bound_tol of the known lower bound cost_bound, the remaining solves
+        are cancelled. The statuses and costs of the starting points, the
+        index of the best one, and the number of cancelled ones are saved
+        in the results as ``'start statuses'``, ``'start costs'``,
+        ``'best start'`` and ``'cancelled starts'``.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
+        # Parameters
+        params = self._parameters
+        num_starts = params['num_starts']
+        bound = params['cost_bound']
+        num_procs = get_num_procs(params['num_procs'],num_starts)
+
+        # Copy network
+        net = net.get_copy()
+
+        # Tasks
+        t0 = time.time()
+        data = get_json_data(net)
+        start_params = params.copy()
+        start_params['init'] = 'network'
+        start_params['num_starts'] = 0
+        start_params['decompose_periods'] = False
+        tasks = [(self.name,start_params,data,start)
+                 for start in get_starts(num_starts,params['start_perturbation'],params['start_seed'])]
+        problem_time = time.time()-t0
+
+        # Solve
+        infos = []
+        bound_met = lambda info: (info['status'] == 'solved' and np.isfinite(bound) and
+                                  info['cost'] <= bound+params['bound_tol']*np.abs(bound))
+        t0 = time.time()
+        if num_procs > 1:
+            pool = multiprocessing.Pool(num_procs)
+            try:
+                for info in pool.imap_unordered(solve_start,tasks):
+                    infos.append(info)
+                    if bound_met(info):
+                        break
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for task in tasks:
+                infos.append(solve_start(task))
+                if bound_met(infos[-1]):
+                    break
+        infos = sorted(infos,key=lambda info: info['start'])
+        solved = [info for info in infos if info['status'] == 'solved']
+        best = min(solved,key=lambda info: info['cost']) if solved else infos[0]
+
+        # Update network
+        set_solutions(net,[best['solution']])
+        self._previous = get_voltages(net)
+
+        # Save results
+        self.set_solver_name(params['solver'])
+        self.set_solver_status(best['status'])
+        self.set_solver_message(best['message'])
+        self.set_solver_iterations(best['iterations'])
+        self.set_solver_time(time.time()-t0)
+        self.set_solver_primal_variables(None)
+        self.set_solver_dual_variables(None)
+        self.set_problem(None)
+        self.set_problem_time(problem_time)
+        self.set_network_snapshot(net)
+        self.results['start statuses'] = num_starts*['cancelled']
+        self.results['start costs'] = np.nan*np.ones(num_starts)
+        for info in infos:
+            self.results['start statuses'][info['start']] = info['status']
+            self.results['start costs'][info['start']] = info['cost']
+        self.results['best start'] = best['start']
+        self.results['cancelled starts'] = num_starts-len(infos)
+
+        if not solved:
+            raise PFmethodError_SolverError(best['message'])
+
+    def solve_decomposed(self,net):
+        """
+        Solves the time periods of a multi-period network as separate
+        single-period problems on a pool of processes, coordinated with
+        the alternating direction method of multipliers (ADMM) over the
+        ramping limits (dP_max) of generators between consecutive periods.
+        These limits are not part of the multi-period problem solved
+        otherwise, so this mode solves a different problem when they are
+        binding. Generators with zero dP_max have no ramping limits, and
+        the powers of the first period are not limited by previous powers.
+        At each iteration, the period problems are solved with generation
+        costs augmented with the multipliers and a quadratic penalty around
+        the consensus powers, which are then updated by projecting onto
+        the ramping limits. The penalty is adapted to balance the primal
+        and dual residuals. The number of iterations and the residuals are
+        saved in the results as ``'admm iterations'``, ``'admm primal
+        residuals'`` and ``'admm dual residuals'``.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
+        # Parameters
+        params = self._parameters
+        T = net.num_periods
+        rho = params['admm_rho']
+        tol = params['admm_tol']
+        num_procs = get_num_procs(params['num_procs'],T)
+
+        # Copy network
+        net = net.get_copy()
+
+        # Initial point
+        apply_init(net,params['init'],self._previous)
+
+        # Data
+        t0 = time.time()
+        data = get_json_data(net)
+        period_data = [get_period_data(data,t) for t in range(T)]
+        period_params = params.copy()
+        period_params['init'] = 'network'
+        period_params['decompose_periods'] = False
+        ng = net.num_generators
+        ramps = np.array([gen.dP_max if gen.dP_max > 0. else np.inf for gen in net.generators])
+        problem_time = time.time()-t0
+
+        # ADMM
+        starts = T*[None]
+        z = None
+        y = np.zeros((ng,T))
+        primal = []
+        dual = []
+        pool = multiprocessing.Pool(num_procs) if num_procs > 1 else None
+        t0 = time.time()
+        try:
+            for k in range(max(params['admm_maxiter'],1)):
+
+                # Period problems
+                tasks = []
+                for t in range(T):
+                    costs = None
+                    if z is not None:
+                        costs = {'Q1': y[:,t]-rho*z[:,t],
+                                 'Q2': 0.5*rho*np.ones(ng)}
+                    tasks.append((self.name,period_params,t,period_data[t],starts[t],costs))
+                infos = map_periods(tasks,num_procs,pool)
+                starts = [info['solution'] for info in infos]
+                P = np.hstack([sol[('generators','P')] for sol in starts]).reshape((ng,T))
+
+                # Consensus
+                z_prev = P if z is None else z
+                z = project_ramps(P+y/rho,ramps)
+                y = y+rho*(P-z)
+                primal.append(norm_inf(P-z))
+                dual.append(rho*norm_inf(z-z_prev))
+                if primal[-1] < tol and dual[-1] < tol:
+                    break
+
+                # Penalty
+                if primal[-1] > 10.*dual[-1]:
+                    rho *= 2.
+                elif dual[-1] > 10.*primal[-1]:
+                    rho /= 2.
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        converged = primal[-1] < tol and dual[-1] < tol
+        failed = [info for info in infos if info['status'] != 'solved']
+
+        # Update network
+        set_solutions(net,starts)
+        self._previous = get_voltages(net)
+
+        # Save results
+        self.set_solver_name(params['solver'])
+        if failed:
+            self.set_solver_status(failed[0]['status'])
+            self.set_solver_message(failed[0]['message'])
+        elif not converged:
+            self.set_solver_status('error')
+            self.set_solver_message('maximum number of ADMM iterations')
+        else:
+            self.set_solver_status('solved')
+            self.set_solver_message('')
+        self.set_solver_iterations(k+1)
+        self.set_solver_time(time.time()-t0)
+        self.set_solver_primal_variables(None)
+        self.set_solver_dual_variables(None)
+        self.set_problem(None)
+        self.set_problem_time(problem_time)
+        self.set_network_snapshot(net)
+        self.results['admm iterations'] = k+1
+        self.results['admm primal residuals'] = np.array(primal)
+        self.results['admm dual residuals'] = np.array(dual)
+        self.results['period statuses'] = [info['status'] for info in infos]
+        self.results['period iterations'] = np.array([info['iterations'] for info in infos])
+        self.results['period times'] = np.array([info['time'] for info in infos])
+
+        if failed:
+            raise PFmethodError_SolverError('time periods %s: %s' %(', '.join([str(info['period']) for info in failed]),
+                                                                    failed[0]['message']))
+        if not converged:
+            raise PFmethodError_SolverError('maximum number of ADMM iterations')
+
+    def solve_lazy(self,net):
+        """
+        Solves problem by adding thermal limits of branches as needed.
+        The first round has no thermal limits, and each round adds the
+        limits of branches whose flows exceed a fraction 1-lazy_margin of
+        their ratings and re-solves starting from the previous solution,
+        until no branch is added. Branches with zero ratingA are not
+        limited. The number of rounds and the indices of the branches with
+        limits are saved in the results as ``'lazy rounds'`` and
+        ``'lazy branches'``. If branches without limits are still overloaded
+        after lazy_max_rounds rounds, the solver status is set to ``'error'``.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
+        # Parameters
+        params = self._parameters
+        margin = params['lazy_margin']
+        max_rounds = params['lazy_max_rounds']
+
+        # Data
+        rating = np.array([br.ratingA for br in net.branches])
+        monitored = np.zeros(net.num_branches,dtype=bool)
+        overloaded = np.zeros(net.num_branches,dtype=bool)
+        max_rounds = max(max_rounds,1)
+        warm_start = self._warm_start
+        iterations = 0
+        t0 = time.time()
+
+        # Rounds
+        try:
+            for k in range(max_rounds):
+                net_k = net.get_copy()
+                for br in net_k.branches:
+                    if not monitored[br.index]:
+                        br.ratingA = 0.
+                try:
+                    self.solve_problem(net_k)
+                finally:
+                    iterations += self.results['solver iterations']
+                results = self.results.copy()
+                flows = get_branch_flows(results['network snapshot'])
+                added = (rating > 0.) & (~monitored) & (np.max(flows,axis=1) >= (1.-margin)*rating)
+                if not np.any(added):
+                    break
+                if k == max_rounds-1:
+                    overloaded = (rating > 0.) & (~monitored) & (np.max(flows,axis=1) > rating)
+                    break
+                monitored |= added
+                self.set_warm_start(results=results)
+        finally:
+            self._warm_start = warm_start
+            self.set_solver_iterations(iterations)
+            self.set_solver_time(time.time()-t0)
+            self.results['lazy rounds'] = k+1
+            self.results['lazy branches'] = np.where(monitored)[0]
+
+        # Ratings
+        for br in self.results['network snapshot'].branches:
+            br.ratingA = rating[br.index]
+
+        # Overloads
+        if np.any(overloaded):
+            self.set_solver_status('error')
+            self.set_solver_message('%d branches overloaded after %d rounds (lazy_max_rounds)' %(np.sum(overloaded),k+1))
+
+    def solve_problem(self,net):
+        """
+        Solves problem with the thermal limits of all branches
+        if ``'thermal_limits'`` is set.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
         from optalg.opt_solver import OptSolverError, OptTermination
         from optalg.opt_solver import OptSolverAugL, OptSolverIpopt, OptSolverINLP
         
         # Parameters
         params = self._parameters
-        vmin_thresh = params['vmin_thresh']
         solver_name = params['solver']
         solver_params = params['solver_parameters']
 
@@ -156,21 +601,36 @@ class ACOPF(PFmethod):
             raise PFmethodError_BadOptSolver()
         solver.set_parameters(solver_params[solver_name])
 
+        # Krylov linear solver
+        linsolver_name = solver_params[solver_name].get('linsolver','default')
+        krylov = linsolver_name in KRYLOV_SOLVERS
+        if krylov:
+            install_linsolvers(solver,linsolver_name,solver_params['krylov'])
+
         # Copy network
         net = net.get_copy()
+
+        # Initial point
+        apply_init(net,params['init'],self._previous)
         
         # Problem
         t0 = time.time()
         problem = self.create_problem(net)
         problem_time = time.time()-t0
 
-        # Termination
-        def t1(s):
-            if np.min(s.problem.wrapped_problem.network.bus_v_min) < vmin_thresh:
-                return True
-            else:
-                return False
-        solver.add_termination(OptTermination(t1,'low voltage'))
+        # Warm start
+        if self._warm_start is not None:
+            opt_problem = self.apply_warm_start(net,problem)
+        else:
+            opt_problem = problem
+
+        # Terminations
+        fired = {}
+        for func,msg in get_terminations(params,
+                                         lambda s: s.problem.wrapped_problem.network,
+                                         lambda s: norm_inf(s.problem.f),
+                                         fired):
+            solver.add_termination(OptTermination(func,msg))
         
         # Info printer
         info_printer = self.get_info_printer()
@@ -180,7 +640,7 @@ class ACOPF(PFmethod):
         update = True
         t0 = time.time()
         try:
-            solver.solve(problem)
+            solver.solve(opt_problem)
         except OptSolverError as e:
             raise PFmethodError_SolverError(e)
         except Exception as e:
@@ -192,12 +652,13 @@ class ACOPF(PFmethod):
             if update:
                 net.set_var_values(solver.get_primal_variables()[:net.num_vars])
                 net.update_properties()
+                self._previous = get_voltages(net)
                 net.clear_sensitivities()
                 problem.store_sensitivities(*solver.get_dual_variables())
 
             # Save results
             self.set_solver_name(solver_name)
-            self.set_solver_status(solver.get_status())
+            self.set_solver_status(fired.get('msg',solver.get_status()))
             self.set_solver_message(solver.get_error_msg())
             self.set_solver_iterations(solver.get_iterations())
             self.set_solver_time(time.time()-t0)
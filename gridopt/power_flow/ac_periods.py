@@ -0,0 +1,263 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import os
+import json
+import tempfile
+import numpy as np
+from .method_error import *
+from .dc_utils import get_period_values
+
+# Component lists and time-varying attributes of network data
+TIME_SERIES = [('buses',['v_mag','v_ang','v_set']),
+               ('generators',['P','Q']),
+               ('loads',['P','Q','P_max','P_min','Q_max','Q_min']),
+               ('var_generators',['P','Q','P_ava']),
+               ('batteries',['P','E']),
+               ('branches',['ratio','phase']),
+               ('shunts',['b'])]
+
+# Component lists and attributes of power flow solutions
+SOLUTION_DATA = [('buses',['v_mag','v_ang']),
+                 ('generators',['P','Q']),
+                 ('branches',['ratio','phase']),
+                 ('shunts',['b'])]
+
+def get_json_data(net):
+    """
+    Gets JSON data of network.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    data : dict
+    """
+
+    import pfnet
+
+    fd,filename = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        pfnet.ParserJSON().write(net,filename)
+        with open(filename,'r') as f:
+            return json.load(f)
+    finally:
+        os.remove(filename)
+
+def parse_json_data(data):
+    """
+    Parses network from JSON data.
+
+    Parameters
+    ----------
+    data : dict
+
+    Returns
+    -------
+    net : |Network|
+    """
+
+    import pfnet
+
+    fd,filename = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        with open(filename,'w') as f:
+            json.dump(data,f)
+        return pfnet.ParserJSON().parse(filename)
+    finally:
+        os.remove(filename)
+
+def get_period_data(data,t):
+    """
+    Gets JSON data of a single-period network with the
+    values of a time period of a multi-period network.
+
+    Parameters
+    ----------
+    data : dict
+           JSON data of multi-period network
+    t : int
+        Time period
+
+    Returns
+    -------
+    data_t : dict
+    """
+
+    T = data['num_periods']
+    data_t = dict(data)
+    data_t['num_periods'] = 1
+    for comps,attrs in TIME_SERIES:
+        if comps not in data:
+            continue
+        data_t[comps] = []
+        for c in data[comps]:
+            c = dict(c)
+            for attr in attrs:
+                if isinstance(c.get(attr),list) and len(c[attr]) == T:
+                    c[attr] = [c[attr][t]]
+            data_t[comps].append(c)
+    return data_t
+
+def get_solution(net):
+    """
+    Gets power flow solution of network.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    sol : dict
+          2-D arrays of values (components x time periods)
+          keyed by component list and attribute
+    """
+
+    T = net.num_periods
+    sol = {}
+    for comps,attrs in SOLUTION_DATA:
+        for attr in attrs:
+            sol[(comps,attr)] = np.array([get_period_values(getattr(c,attr),T)
+                                          for c in getattr(net,comps)]).reshape((-1,T))
+    return sol
+
+def set_solutions(net,sols):
+    """
+    Sets power flow solutions of consecutive time periods on network.
+
+    Parameters
+    ----------
+    net : |Network|
+    sols : list
+           Solutions of time periods (see :func:`get_solution`)
+    """
+
+    T = net.num_periods
+    for comps,attrs in SOLUTION_DATA:
+        for attr in attrs:
+            values = np.hstack([sol[(comps,attr)] for sol in sols])
+            for c in getattr(net,comps):
+                setattr(c,attr,values[c.index,0] if T == 1 else values[c.index,:])
+    net.update_properties()
+
+def solve_period(args):
+    """
+    Solves a power flow or optimal power flow problem of a single time period.
+
+    Parameters
+    ----------
+    args : tuple
+           Method name, method parameters, time period, JSON data of
+           period network, solution for starting point (or ``None``),
+           and terms added to the generator cost coefficients Q1 and Q2
+           (dict of arrays or ``None``)
+
+    Returns
+    -------
+    info : dict
+           Period, solution, generation cost, and solver status,
+           message, iterations and time
+    """
+
+    from . import new_method
+
+    name,params,t,data,start,costs = args
+    net = parse_json_data(data)
+    if start is not None:
+        set_solutions(net,[start])
+    if costs is not None:
+        for gen in net.generators:
+            gen.cost_coeff_Q1 = gen.cost_coeff_Q1+costs['Q1'][gen.index]
+            gen.cost_coeff_Q2 = gen.cost_coeff_Q2+costs['Q2'][gen.index]
+    method = new_method(name)
+    method.set_parameters(params)
+    try:
+        method.solve(net)
+    except PFmethodError:
+        pass
+    results = method.get_results()
+    snapshot = results['network snapshot']
+    if snapshot is None:
+        snapshot = net
+    if costs is not None:
+        for gen in snapshot.generators:
+            gen.cost_coeff_Q1 = gen.cost_coeff_Q1-costs['Q1'][gen.index]
+            gen.cost_coeff_Q2 = gen.cost_coeff_Q2-costs['Q2'][gen.index]
+        snapshot.update_properties()
+    return {'period': t,
+            'solution': get_solution(snapshot),
+            'cost': float(np.sum(snapshot.gen_P_cost)),
+            'status': results['solver status'],
+            'message': results['solver message'],
+            'iterations': results['solver iterations'],
+            'time': results['solver time']}
+
+def map_periods(tasks,num_procs,pool=None):
+    """
+    Solves problems of time periods, in parallel if there
+    is more than one process.
+
+    Parameters
+    ----------
+    tasks : list
+            Arguments of :func:`solve_period`
+    num_procs : int
+    pool : :class:`Pool <multiprocessing.pool.Pool>`
+           Pool of processes (created if ``None``)
+
+    Returns
+    -------
+    infos : list
+            Information of time periods sorted by period
+    """
+
+    import multiprocessing
+
+    if num_procs <= 1:
+        infos = [solve_period(task) for task in tasks]
+    elif pool is not None:
+        infos = pool.map(solve_period,tasks)
+    else:
+        pool = multiprocessing.Pool(num_procs)
+        try:
+            infos = pool.map(solve_period,tasks)
+            pool.close()
+        except Exception as e:
+            pool.terminate()
+            raise e
+        finally:
+            pool.join()
+
+    return sorted(infos,key=lambda info: info['period'])
+
+def get_num_procs(num_procs,T):
+    """
+    Gets number of processes for solving time periods.
+
+    Parameters
+    ----------
+    num_procs : int
+                Requested number (zero for all cores)
+    T : int
+        Number of time periods
+
+    Returns
+    -------
+    num_procs : int
+    """
+
+    import multiprocessing
+
+    if num_procs <= 0:
+        num_procs = multiprocessing.cpu_count()
+    return max(min(num_procs,T),1)
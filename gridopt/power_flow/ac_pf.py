@@ -11,6 +11,14 @@ import time
 import numpy as np
 from .method_error import *
 from .method import PFmethod
+from .ac_init import apply_init, get_voltages
+from .ac_periods import get_json_data, get_period_data, set_solutions, map_periods, get_num_procs
+from .dc_utils import solve_multiple
+from .fdlf import FDLF
+from .krylov import KrylovLinSolver, KRYLOV_SOLVERS, install_linsolvers
+from .nr_linsolver import NRLinSolver, has_analysis, norm_inf
+from .terminations import get_terminations
+from .factor_cache import FactorCache
 from numpy.linalg import norm
 
 class ACPF(PFmethod):
@@ -32,8 +40,22 @@ class ACPF(PFmethod):
                    'shunt_step': 0.5,   # susceptance acceleration factor (NR only)
                    'dtap': 1e-5,        # tap ratio perturbation (NR only)
                    'dsus': 1e-5,        # susceptance perturbation (NR only)
+                   'reg_block_size': 256, # max number of perturbations per sensitivity solve (NR only)
+                   'jacobian_reuse': False, # flag for reusing Jacobian factorizations (NR only)
+                   'reuse_max_iters': 5, # max number of iterations per Jacobian factorization (NR only)
+                   'reuse_ratio': 0.5,  # mismatch reduction ratio that triggers refactorization (NR only)
+                   'cache_analysis': True, # flag for caching Jacobian analyses across solves (NR with MUMPS only)
+                   'cache_max_memory': 5e8, # max memory of cached analyses in bytes (NR only)
+                   'line_search': 'none', # NR step line search (none, auto, iwamoto, backtracking)
                    'vmin_thresh': 0.1,  # threshold for vmin
-                   'solver': 'augl'}    # OPTALG optimization solver (augl, ipopt, nr, inlp)
+                   'vmax_thresh': 2.0,  # threshold for vmax (zero to disable)
+                   'growth_iters': 0,   # consecutive mismatch increases for divergence (NR and FDLF only, zero to disable)
+                   'stag_iters': 0,     # iterations without mismatch progress for stagnation (NR and FDLF only, zero to disable)
+                   'stag_tol': 1e-3,    # min relative mismatch progress for stagnation
+                   'init': 'network',   # initial voltages (network, flat, dc, previous)
+                   'parallel_periods': False, # flag for solving time periods separately in parallel
+                   'num_procs': 0,      # number of processes for parallel periods (zero for all cores)
+                   'solver': 'augl'}    # OPTALG optimization solver (augl, ipopt, nr, inlp) or fdlf
 
     _parameters_augl = {'feastol' : 1e-4,
                         'optol' : 1e-4,
@@ -44,6 +66,9 @@ class ACPF(PFmethod):
     _parameters_inlp = {}
     
     _parameters_nr = {}
+
+    _parameters_fdlf = {}
+
                   
     def __init__(self):
 
@@ -65,11 +90,24 @@ class ACPF(PFmethod):
         nr_params = OptSolverNR.parameters.copy()
         nr_params.update(self._parameters_nr)       # overwrite defaults
 
+        fdlf_params = FDLF.parameters.copy()
+        fdlf_params.update(self._parameters_fdlf)   # overwrite defaults
+
+        krylov_params = KrylovLinSolver.parameters.copy()
+
         self._parameters = ACPF._parameters.copy()
         self._parameters['solver_parameters'] = {'augl': augl_params,
                                                  'ipopt': ipopt_params,
                                                  'nr': nr_params,
-                                                 'inlp': inlp_params}
+                                                 'inlp': inlp_params,
+                                                 'fdlf': fdlf_params,
+                                                 'krylov': krylov_params}
+
+        # Previous solution
+        self._previous = None
+
+        # Jacobian analyses
+        self._cache = FactorCache()
 
     def create_problem(self,net):
 
@@ -92,7 +130,7 @@ class ACPF(PFmethod):
 
         # OPT-based
         ###########
-        if solver_name != 'nr':
+        if solver_name not in ['nr','fdlf']:
             
             # Set up variables
             net.set_flags('bus',
@@ -171,9 +209,9 @@ class ACPF(PFmethod):
             # Return
             return problem
 
-        # NR-based
-        ##########
-        elif solver_name == 'nr':
+        # NR-based (and FDLF)
+        #####################
+        elif solver_name in ['nr','fdlf']:
 
             # Voltages
             net.set_flags('bus',
@@ -227,7 +265,7 @@ class ACPF(PFmethod):
             problem.add_constraint(pfnet.Constraint('generator active power participation',net))
             problem.add_constraint(pfnet.Constraint('generator reactive power participation',net))
             problem.add_constraint(pfnet.Constraint('variable fixing',net))
-            if limit_gens:
+            if limit_gens and solver_name == 'nr':
                 problem.add_heuristic(pfnet.HEUR_TYPE_PVPQ)
             problem.analyze()
 
@@ -248,10 +286,15 @@ class ACPF(PFmethod):
         params = self._parameters
         lock_taps= params['lock_taps']
         lock_shunts = params['lock_shunts']
-        vmin_thresh = params['vmin_thresh']
         solver_name = params['solver']
         solver_params = params['solver_parameters']
         feastol = solver_params['nr']['feastol']
+        if params['line_search'] not in ['none','auto','iwamoto','backtracking']:
+            raise PFmethodError_BadParams(['line_search'])
+
+        # Parallel periods
+        if params['parallel_periods'] and net.num_periods > 1:
+            return self.solve_periods(net)
 
         # Opt solver
         if solver_name == 'augl':
@@ -262,24 +305,67 @@ class ACPF(PFmethod):
             solver = OptSolverINLP()
         elif solver_name == 'nr':
             solver = OptSolverNR()
+        elif solver_name == 'fdlf':
+            solver = FDLF()
         else:
             raise PFmethodError_BadOptSolver()
         solver.set_parameters(solver_params[solver_name])
+        if solver_name == 'fdlf':
+            if not (lock_taps and lock_shunts):
+                raise PFmethodError_BadParams(['lock_taps','lock_shunts'])
+            solver.set_parameters({'pvpq': params['limit_gens']})
+            solver.linsolver_parameters = solver_params['krylov']
+
+        # Krylov linear solver
+        linsolver_name = solver_params[solver_name].get('linsolver','default')
+        krylov = solver_name != 'fdlf' and linsolver_name in KRYLOV_SOLVERS
+        if krylov:
+            install_linsolvers(solver,linsolver_name,solver_params['krylov'])
 
         # Copy network
         net = net.get_copy()
 
+        # Initial point
+        apply_init(net,params['init'],self._previous)
+
         # Problem
         t0 = time.time()
         problem = self.create_problem(net)
         problem_time = time.time()-t0
+
+        # Regulation data
+        tran_data = None
+        shunt_data = None
+        if solver_name == 'nr':
+            if not lock_taps:
+                tran_data = self.get_regulation_data(problem,'tran')
+            if not lock_shunts:
+                shunt_data = self.get_regulation_data(problem,'shunt')
         
         # Callbacks
+        def c0(s):
+            if isinstance(s.linsolver,NRLinSolver):
+                return
+            cache = None
+            if params['cache_analysis'] and not krylov and has_analysis(s.linsolver):
+                cache = self._cache # only for linear solvers with symbolic analysis
+            if params['jacobian_reuse'] or params['line_search'] != 'none' or cache is not None:
+                s.linsolver = NRLinSolver(s.linsolver,s,
+                                          reuse=params['jacobian_reuse'],
+                                          max_reuse=params['reuse_max_iters'],
+                                          ratio=params['reuse_ratio'],
+                                          cache=cache,
+                                          name=linsolver_name,
+                                          line_search=params['line_search'])
+                if params['line_search'] != 'none':
+                    s.line_search = s.linsolver.line_search # replaces Wolfe line search
+        self._cache.max_memory = params['cache_max_memory']
+
         def c1(s):
             if (s.k != 0 and
                 (not lock_taps) and norm(s.problem.f,np.inf) < 100.*feastol):
                 try:
-                    self.apply_tran_v_regulation(s)
+                    self.apply_tran_v_regulation(s,tran_data)
                 except Exception as e:
                     raise PFmethodError_TranVReg(e)
             
@@ -287,7 +373,7 @@ class ACPF(PFmethod):
             if (s.k != 0 and
                 (not lock_shunts) and norm(s.problem.f,np.inf) < 100.*feastol):
                 try:
-                    self.apply_shunt_v_regulation(s)
+                    self.apply_shunt_v_regulation(s,shunt_data)
                 except Exception as e:
                     raise PFmethodError_ShuntVReg(e)                
 
@@ -299,17 +385,24 @@ class ACPF(PFmethod):
                 s.problem.b = prob.b
 
         if solver_name == 'nr':
+            solver.add_callback(OptCallback(c0))
             solver.add_callback(OptCallback(c1))
             solver.add_callback(OptCallback(c2))
             solver.add_callback(OptCallback(c3))
                 
-        # Termination
-        def t1(s):
-            if np.min(s.problem.wrapped_problem.network.bus_v_min) < vmin_thresh:
-                return True
-            else:
-                return False
-        solver.add_termination(OptTermination(t1,'low voltage'))
+        # Terminations (divergence and stagnation only for monotone methods)
+        fired = {}
+        term_params = params.copy()
+        if solver_name not in ['nr','fdlf']:
+            term_params.update({'growth_iters': 0, 'stag_iters': 0})
+        if solver_name == 'fdlf':
+            get_network = lambda s: s.network
+            get_mismatch = lambda s: s.mismatch
+        else:
+            get_network = lambda s: s.problem.wrapped_problem.network
+            get_mismatch = lambda s: norm_inf(s.problem.f)
+        for func,msg in get_terminations(term_params,get_network,get_mismatch,fired):
+            solver.add_termination(OptTermination(func,msg))
             
         # Info printer
         info_printer = self.get_info_printer()
@@ -331,13 +424,14 @@ class ACPF(PFmethod):
             if update:
                 net.set_var_values(solver.get_primal_variables()[:net.num_vars])
                 net.update_properties()
+                self._previous = get_voltages(net)
                 net.clear_sensitivities()
-                if solver_name != 'nr':
+                if solver_name not in ['nr','fdlf']:
                     problem.store_sensitivities(*solver.get_dual_variables())
 
             # Save results
             self.set_solver_name(solver_name)
-            self.set_solver_status(solver.get_status())
+            self.set_solver_status(fired.get('msg',solver.get_status()))
             self.set_solver_message(solver.get_error_msg())
             self.set_solver_iterations(solver.get_iterations())
             self.set_solver_time(time.time()-t0)
@@ -346,7 +440,79 @@ class ACPF(PFmethod):
             self.set_problem(None) # skip for now
             self.set_problem_time(problem_time)
             self.set_network_snapshot(net)
+            self.results.pop('solver factorizations',None)
+            self.results.pop('solver step lengths',None)
+            for key in ['period statuses','period iterations','period times']:
+                self.results.pop(key,None)
+            if solver_name == 'fdlf':
+                self.results['solver factorizations'] = solver.num_factorizations
+            elif solver_name == 'nr' and isinstance(getattr(solver,'linsolver',None),NRLinSolver):
+                self.results['solver factorizations'] = solver.linsolver.num_factorizations
+                self.results['solver step lengths'] = np.array(solver.linsolver.step_lengths)
  
+    def solve_periods(self,net):
+        """
+        Solves the time periods of a multi-period network as
+        separate single-period power flow problems on a pool of
+        processes, and merges their solutions into one multi-period
+        network snapshot. Each process only holds the data of the
+        time period it solves.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
+        # Parameters
+        params = self._parameters
+        T = net.num_periods
+        num_procs = get_num_procs(params['num_procs'],T)
+
+        # Copy network
+        net = net.get_copy()
+
+        # Initial point
+        apply_init(net,params['init'],self._previous)
+
+        # Tasks
+        t0 = time.time()
+        data = get_json_data(net)
+        period_params = params.copy()
+        period_params['init'] = 'network'
+        period_params['parallel_periods'] = False
+        tasks = [(self.name,period_params,t,get_period_data(data,t),None,None) for t in range(T)]
+        problem_time = time.time()-t0
+
+        # Solve
+        t0 = time.time()
+        infos = map_periods(tasks,num_procs)
+        failed = [info for info in infos if info['status'] != 'solved']
+
+        # Update network
+        set_solutions(net,[info['solution'] for info in infos])
+        self._previous = get_voltages(net)
+
+        # Save results
+        self.set_solver_name(params['solver'])
+        self.set_solver_status(failed[0]['status'] if failed else 'solved')
+        self.set_solver_message(failed[0]['message'] if failed else '')
+        self.set_solver_iterations(max([info['iterations'] for info in infos]))
+        self.set_solver_time(time.time()-t0)
+        self.set_solver_primal_variables(None)
+        self.set_solver_dual_variables(None)
+        self.set_problem(None)
+        self.set_problem_time(problem_time)
+        self.set_network_snapshot(net)
+        self.results.pop('solver factorizations',None)
+        self.results.pop('solver step lengths',None)
+        self.results['period statuses'] = [info['status'] for info in infos]
+        self.results['period iterations'] = np.array([info['iterations'] for info in infos])
+        self.results['period times'] = np.array([info['time'] for info in infos])
+
+        if failed:
+            raise PFmethodError_SolverError('time periods %s: %s' %(', '.join([str(info['period']) for info in failed]),
+                                                                    failed[0]['message']))
+
     def get_info_printer(self):
 
         # Parameters
@@ -354,7 +520,7 @@ class ACPF(PFmethod):
 
         # OPT-based
         ###########
-        if solver_name != 'nr':
+        if solver_name not in ['nr','fdlf']:
         
             def info_printer(solver,header):
                 net = solver.problem.wrapped_problem.network
@@ -390,90 +556,200 @@ class ACPF(PFmethod):
                     print('{0:^8.1e}'.format(np.average(net.shunt_v_vio)))
             return info_printer
 
+        # FDLF
+        ######
+        elif solver_name == 'fdlf':
+
+            def info_printer(solver,header):
+                net = solver.network
+                if header:
+                    print('{0:^5}'.format('iter'), end=' ')
+                    print('{0:^8}'.format('pmis'), end=' ')
+                    print('{0:^8}'.format('qmis'), end=' ')
+                    print('{0:^5}'.format('vmax'), end=' ')
+                    print('{0:^5}'.format('vmin'), end=' ')
+                    print('{0:^8}'.format('gQvio'))
+                else:
+                    print('{0:^5d}'.format(solver.k), end=' ')
+                    print('{0:^8.1e}'.format(np.average(net.bus_P_mis)), end=' ')
+                    print('{0:^8.1e}'.format(np.average(net.bus_Q_mis)), end=' ')
+                    print('{0:^5.2f}'.format(np.average(net.bus_v_max)), end=' ')
+                    print('{0:^5.2f}'.format(np.average(net.bus_v_min)), end=' ')
+                    print('{0:^8.1e}'.format(np.average(net.gen_Q_vio)))
+            return info_printer
+
         # Invalid
         #########
         else:
             raise PFmethodError_BadOptSolver()
 
-    def apply_shunt_v_regulation(self,solver):
+    def get_regulation_data(self,problem,devices):
+        """
+        Gets data for adjusting devices that regulate bus voltage
+        magnitudes in NR-based power flow. Entries correspond to regulated
+        buses that are not slack and time periods.
+
+        Parameters
+        ----------
+        problem : |Problem|
+        devices : string
+                  Type of regulating devices ``{'tran','shunt'}``
+
+        Returns
+        -------
+        data : dict
+               Keys ``'offset'`` (first row of variable fixing constraint),
+               ``'v_index'``, ``'v_max'``, ``'v_min'`` (arrays of entries), and
+               ``'devices'`` (list of tuples of variable index, variable fixing
+               row, and min and max values of regulating devices of each entry)
+        """
 
         # Local variables
-        dsus = self._parameters['dsus']
-        step = self._parameters['shunt_step']
-        p = solver.problem.wrapped_problem
-        net = p.network
-        x = solver.x
-        eps = 1e-8
+        net = problem.network
+        if devices == 'tran':
+            is_regulated = lambda bus: bus.is_regulated_by_tran()
+            get_devices = lambda bus: bus.reg_trans
+            quantity,index,dmin,dmax = 'tap ratio','index_ratio','ratio_min','ratio_max'
+        elif devices == 'shunt':
+            is_regulated = lambda bus: bus.is_regulated_by_shunt()
+            get_devices = lambda bus: bus.reg_shunts
+            quantity,index,dmin,dmax = 'susceptance','index_b','b_min','b_max'
+        else:
+            raise ValueError('invalid regulating devices')
 
         # Fix constraints
-        c = p.find_constraint('variable fixing')
-        A = c.A        
-        b = c.b
-        
-        # Rhs
-        rhs = np.hstack((np.zeros(p.f.size),np.zeros(p.b.size)))
+        A = problem.find_constraint('variable fixing').A
+        assert(np.all(A.data == 1.))
+        rows = dict(zip(A.col,A.row))
 
         # Offset
         offset = 0
-        for c in p.constraints:
+        for c in problem.constraints:
             if c.name == 'variable fixing':
                 break
             else:
                 offset += c.A.shape[0]
 
-        # Violation check
-        for i in range(net.num_buses):
+        # Entries
+        v_index = []
+        v_max = []
+        v_min = []
+        entries = []
+        for bus in net.buses:
 
-            bus = net.get_bus(i)
+            if is_regulated(bus) and not bus.is_slack():
 
-            if bus.is_regulated_by_shunt() and not bus.is_slack():
-                
                 assert(bus.has_flags('variable','voltage magnitude'))
+                assert(len(get_devices(bus)) > 0)
+                assert(bus.v_max_reg >= bus.v_min_reg)
 
                 for t in range(net.num_periods):
+                    v_index.append(bus.index_v_mag[t])
+                    v_max.append(bus.v_max_reg)
+                    v_min.append(bus.v_min_reg)
+                    entry = []
+                    for reg in get_devices(bus):
+                        assert(reg.has_flags('variable',quantity))
+                        assert(getattr(reg,dmin) <= getattr(reg,dmax))
+                        i = getattr(reg,index)[t]
+                        entry.append((i,rows[i],getattr(reg,dmin),getattr(reg,dmax)))
+                    entries.append(entry)
+
+        return {'offset': offset,
+                'v_index': np.array(v_index,dtype=int),
+                'v_max': np.array(v_max),
+                'v_min': np.array(v_min),
+                'devices': entries}
+
+    def get_regulation_sensitivities(self,solver,data,entries,delta):
+        """
+        Gets sensitivities of regulated voltage magnitudes with respect to
+        their regulating devices using the current factorization. Perturbations
+        of all devices are solved together as multiple right-hand sides.
+
+        Parameters
+        ----------
+        solver : :class:`OptSolverNR <optalg.opt_solver.nr.OptSolverNR>`
+        data : dict
+               Regulation data (see :func:`get_regulation_data`)
+        entries : array
+                  Indices of regulation data entries
+        delta : float
+                Perturbation
+
+        Returns
+        -------
+        sens : list
+               Arrays of sensitivities of the devices of each entry
+        """
+
+        if len(entries) == 0:
+            return []
 
-                    v = x[bus.index_v_mag[t]]
-                    vmax = bus.v_max_reg
-                    vmin = bus.v_min_reg
+        # Local variables
+        block = self._parameters['reg_block_size']
+        p = solver.problem.wrapped_problem
+        n = p.f.size+p.b.size
+        offset = p.f.size+data['offset']
+        linsolver = getattr(solver.linsolver,'linsolver',solver.linsolver) # without line search
 
-                    assert(len(bus.reg_shunts) > 0)
-                    assert(vmax >= vmin)
+        # Perturbations
+        sizes = [len(data['devices'][j]) for j in entries]
+        rows = np.array([i for j in entries for index,i,dmin,dmax in data['devices'][j]],dtype=int)
+        v_index = np.repeat(data['v_index'][entries],sizes)
 
-                    # Violation
-                    if v > vmax or v < vmin:
+        # Solves
+        sens = np.zeros(rows.size)
+        for k in range(0,rows.size,block):
+            kk = np.arange(k,min(k+block,rows.size))
+            cols = np.arange(kk.size)
+            B = np.zeros((n,kk.size))
+            B[offset+rows[kk],cols] = delta
+            X = solve_multiple(linsolver,B)
+            sens[kk] = X[v_index[kk],cols]/delta
 
-                        for reg_shunt in bus.reg_shunts:
-                    
-                            assert(reg_shunt.has_flags('variable','susceptance'))
-                        
-                            s = x[reg_shunt.index_b[t]]
-                            smax = reg_shunt.b_max
-                            smin = reg_shunt.b_min
-                            assert(smin <= smax)
-                            
-                            # Fix constr index
-                            k = int(np.where(A.col == reg_shunt.index_b[t])[0])
-                            i = A.row[k]
-                            
-                            assert(np.abs(b[i]-x[reg_shunt.index_b[t]]) < eps)
-                            assert(A.data[k] == 1.)
-                            
-                            # Sensitivity
-                            assert(rhs[p.f.size+offset+i] == 0.)
-                            rhs[p.f.size+offset+i] = dsus
-                            dx = solver.linsolver.solve(rhs)
-                            dv = dx[bus.index_v_mag[t]]
-                            dvds = dv/dsus
-                            rhs[p.f.size+offset+i] = 0.
+        return np.split(sens,np.cumsum(sizes)[:-1])
+
+    def apply_shunt_v_regulation(self,solver,data=None):
+
+        # Local variables
+        dsus = self._parameters['dsus']
+        step = self._parameters['shunt_step']
+        p = solver.problem.wrapped_problem
+        x = solver.x
+        eps = 1e-8
+
+        # Regulation data
+        if data is None:
+            data = self.get_regulation_data(p,'shunt')
+
+        # Fix constraints
+        b = p.find_constraint('variable fixing').b
+
+        # Violation check
+        v = x[data['v_index']]
+        vmax = data['v_max']
+        vmin = data['v_min']
+        entries = np.where((v > vmax) | (v < vmin))[0]
+
+        # Sensitivities
+        sens = self.get_regulation_sensitivities(solver,data,entries,dsus)
+
+        for j,dvds_j in zip(entries,sens):
+
+            for (index,i,smin,smax),dvds in zip(data['devices'][j],dvds_j):
+
+                s = x[index]
+                assert(np.abs(b[i]-s) < eps)
                             
-                            # Adjustment
-                            dv = (vmax+vmin)/2.-v
-                            ds = step*dv/dvds if dvds != 0. else 0.
-                            snew = np.maximum(np.minimum(s+ds,smax),smin)
-                            x[reg_shunt.index_b[t]] = snew
-                            b[i] = snew
-                            if np.abs(snew-s) > eps:
-                                break
+                # Adjustment
+                dv = (vmax[j]+vmin[j])/2.-v[j]
+                ds = step*dv/dvds if dvds != 0. else 0.
+                snew = np.maximum(np.minimum(s+ds,smax),smin)
+                x[index] = snew
+                b[i] = snew
+                if np.abs(snew-s) > eps:
+                    break
 
         # Update
         solver.func(x)
@@ -481,84 +757,46 @@ class ACPF(PFmethod):
         solver.problem.A = p.A
         solver.problem.b = p.b
 
-    def apply_tran_v_regulation(self,solver):
+    def apply_tran_v_regulation(self,solver,data=None):
         
         # Local variables
         dtap = self._parameters['dtap']
         step = self._parameters['tap_step']
         p = solver.problem.wrapped_problem
-        net = p.network
         x = solver.x
         eps = 1e-8
 
-        # Fix constraints
-        c = p.find_constraint('variable fixing')
-        A = c.A        
-        b = c.b
+        # Regulation data
+        if data is None:
+            data = self.get_regulation_data(p,'tran')
 
-        # Rhs
-        rhs = np.hstack((np.zeros(p.f.size),np.zeros(p.b.size)))
-        
-        # Offset
-        offset = 0
-        for c in p.constraints:
-            if c.name == 'variable fixing':
-                break
-            else:
-                offset += c.A.shape[0]
+        # Fix constraints
+        b = p.find_constraint('variable fixing').b
 
         # Violation check
-        for i in range(net.num_buses):
+        v = x[data['v_index']]
+        vmax = data['v_max']
+        vmin = data['v_min']
+        entries = np.where((v > vmax) | (v < vmin))[0]
 
-            bus = net.get_bus(i)
+        # Sensitivities
+        sens = self.get_regulation_sensitivities(solver,data,entries,dtap)
 
-            if bus.is_regulated_by_tran() and not bus.is_slack():
-                
-                assert(bus.has_flags('variable','voltage magnitude'))
+        for j,dvdt_j in zip(entries,sens):
 
-                for tau in range(net.num_periods):
-                    
-                    v = x[bus.index_v_mag[tau]]
-                    vmax = bus.v_max_reg
-                    vmin = bus.v_min_reg
-                    
-                    assert(len(bus.reg_trans) > 0)
-                    assert(vmax > vmin)
-                
-                    # Violation
-                    if v > vmax or v < vmin:
-                        
-                        for reg_tran in bus.reg_trans:
-                    
-                            assert(reg_tran.has_flags('variable','tap ratio'))
-                                
-                            t = x[reg_tran.index_ratio[tau]]
-                            tmax = reg_tran.ratio_max
-                            tmin = reg_tran.ratio_min
-                            assert(tmax >= tmin)
-                            
-                            # Fix constr index
-                            k = int(np.where(A.col == reg_tran.index_ratio[tau])[0])
-                            i = A.row[k]
-                            assert(np.abs(b[i]-x[reg_tran.index_ratio[tau]]) < eps)
-                            assert(A.data[k] == 1.)
-                            
-                            # Sensitivity
-                            assert(rhs[p.f.size+offset+i] == 0.)
-                            rhs[p.f.size+offset+i] = dtap
-                            dx = solver.linsolver.solve(rhs)
-                            dv = dx[bus.index_v_mag[tau]]
-                            dvdt = dv/dtap
-                            rhs[p.f.size+offset+i] = 0.
+            for (index,i,tmin,tmax),dvdt in zip(data['devices'][j],dvdt_j):
+
+                t = x[index]
+                assert(np.abs(b[i]-t) < eps)
                             
-                            # Adjustment
-                            dv = (vmax+vmin)/2.-v
-                            dt = step*dv/dvdt if dvdt != 0. else 0.
-                            tnew = np.maximum(np.minimum(t+dt,tmax),tmin)
-                            x[reg_tran.index_ratio[tau]] = tnew
-                            b[i] = tnew
-                            if np.abs(tnew-t) > eps:
-                                break
+                # Adjustment
+                dv = (vmax[j]+vmin[j])/2.-v[j]
+                dt = step*dv/dvdt if dvdt != 0. else 0.
+                tnew = np.maximum(np.minimum(t+dt,tmax),tmin)
+                x[index] = tnew
+                b[i] = tnew
+                if np.abs(tnew-t) > eps:
+                    break
 
         # Update
         solver.func(x)        
@@ -0,0 +1,82 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+from .dc_utils import get_period_values
+
+def get_branch_flows(net):
+    """
+    Gets AC branch flows, i.e., the largest current magnitudes
+    at the two ends of the branches, in the units of ratingA
+    used by AC branch flow limits. Branches on outage have
+    zero flow.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    flows : 2-D array
+            Flows (branches x time periods)
+    """
+
+    T = net.num_periods
+    flows = np.zeros((net.num_branches,T))
+    for br in net.branches:
+        if not br.is_on_outage():
+            flows[br.index,:] = np.maximum(get_period_values(br.i_km_mag,T),
+                                           get_period_values(br.i_mk_mag,T))
+    return flows
+
+def project_ramps(P,dP,maxiter=1000,tol=1e-10):
+    """
+    Projects generator powers onto the set defined by ramping limits
+    between consecutive time periods using Dykstra's algorithm with
+    the constraints of even and odd pairs of periods.
+
+    Parameters
+    ----------
+    P : 2-D array
+        Powers (generators x time periods)
+    dP : array
+         Ramping limits (``np.inf`` for no limit)
+    maxiter : int
+    tol : float
+
+    Returns
+    -------
+    P : 2-D array
+    """
+
+    r = np.array(dP,dtype=float).reshape((-1,1))
+    T = P.shape[1]
+
+    def project_pairs(Z,start):
+        Z = Z.copy()
+        t = np.arange(start,T-1,2)
+        d = Z[:,t+1]-Z[:,t]
+        excess = np.sign(d)*np.maximum(np.abs(d)-r,0.)
+        Z[:,t] += excess/2.
+        Z[:,t+1] -= excess/2.
+        return Z
+
+    X = np.array(P,dtype=float)
+    if T < 2 or X.size == 0:
+        return X
+    p = np.zeros(X.shape)
+    q = np.zeros(X.shape)
+    for k in range(maxiter):
+        Y = project_pairs(X+p,0)
+        p = X+p-Y
+        X_new = project_pairs(Y+q,1)
+        q = Y+q-X_new
+        if np.max(np.abs(X_new-X)) < tol:
+            return X_new
+        X = X_new
+    return X
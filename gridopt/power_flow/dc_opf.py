@@ -9,9 +9,23 @@
 from __future__ import print_function
 import time
 import numpy as np
+from scipy.sparse import bmat, coo_matrix, eye
+from numpy.linalg import norm
 from .method_error import *
 from .method import PFmethod
-from numpy.linalg import norm
+from .dc_pf import DCPF
+from .dist_factors import DistributionFactors
+from .dc_utils import get_bus_injections
+from .warm_start import get_var_indices, shift_vars, shift_rows
+
+# Component lists and data copied into reused problem networks
+TEMPLATE_DATA = [('buses',['v_ang']),
+                 ('branches',['b','phase','ratingA']),
+                 ('generators',['P','P_max','P_min',
+                                'cost_coeff_Q0','cost_coeff_Q1','cost_coeff_Q2']),
+                 ('loads',['P','P_max','P_min',
+                           'util_coeff_Q0','util_coeff_Q1','util_coeff_Q2']),
+                 ('var_generators',['P','P_ava','P_max','P_min'])]
 
 class DCOPF(PFmethod):
     """
@@ -22,6 +36,11 @@ class DCOPF(PFmethod):
         
     _parameters = {'thermal_limits': False,
                    'renewable_curtailment': False,
+                   'lazy_thermal_limits': False, # flag for generating thermal limits as needed
+                   'lazy_margin': 0.05,          # fraction of rating for adding near-binding limits
+                   'lazy_max_rounds': 20,        # max number of constraint generation rounds
+                   'formulation': 'angle',       # formulation (angle, ptdf)
+                   'reuse_problem': False,       # flag for reusing problem across solves
                    'solver' : 'iqp'}
 
     _parameters_iqp = {}
@@ -52,22 +71,164 @@ class DCOPF(PFmethod):
                                                  'augl': augl_params,
                                                  'ipopt': ipopt_params}
 
-    def create_problem(self,net):
+        # Warm start
+        self._warm_start = None
 
-        import pfnet
+        # DC power flow and distribution factors (PTDF formulation)
+        self._dcpf = DCPF()
+        self._factors = None
+
+        # Problem template
+        self._template = None
+
+    def get_template_key(self,net):
+        """
+        Gets key of the structure of the problem of a network, i.e.,
+        of the network data and parameters that determine its variables
+        and constraints.
+
+        Parameters
+        ----------
+        net : |Network|
+
+        Returns
+        -------
+        key : tuple
+        """
+
+        params = self._parameters
+        return ((net.num_periods,net.num_buses,net.num_branches,net.num_generators,
+                 net.num_loads,net.num_var_generators),
+                tuple([bus.is_slack() for bus in net.buses]),
+                tuple([br.is_on_outage() for br in net.branches]),
+                tuple([(g.is_on_outage(),g.is_P_adjustable()) for g in net.generators]),
+                tuple([l.is_P_adjustable() for l in net.loads]),
+                tuple([params[k] for k in ['thermal_limits','renewable_curtailment','formulation']]))
+
+    def copy_network_data(self,src,dst):
+        """
+        Copies values, limits and cost coefficients of network components
+        that do not change the structure of the problem.
+
+        Parameters
+        ----------
+        src : |Network|
+        dst : |Network|
+        """
+
+        for comps,attrs in TEMPLATE_DATA:
+            for c_src,c_dst in zip(getattr(src,comps),getattr(dst,comps)):
+                for attr in attrs:
+                    setattr(c_dst,attr,getattr(c_src,attr))
+
+    def set_warm_start(self,x,duals=None,shift=0):
+        """
+        Sets starting point for the next solves, e.g., the
+        ``'solver primal variables'`` and ``'solver dual variables'``
+        of a previous solve of a problem with the same structure.
+        For rolling horizons, values can be shifted across time
+        periods, with periods beyond the horizon taking the values
+        of the last period.
+
+        Parameters
+        ----------
+        x : vector
+            Primal variables (``None`` removes warm start)
+        duals : list
+                Dual variables ``[lam,nu,mu,pi]``
+        shift : int
+                Number of periods to shift values
+        """
+
+        if x is None:
+            self._warm_start = None
+        else:
+            self._warm_start = {'x': np.array(x,dtype=float),
+                                'duals': duals,
+                                'shift': shift}
+
+    def apply_warm_start(self,net,problem,use_duals=True):
+        """
+        Applies warm start to problem.
+
+        Parameters
+        ----------
+        net : |Network|
+        problem : |Problem|
+        use_duals : {``True``, ``False``}
+                    Flag for applying dual variables
+
+        Returns
+        -------
+        problem : :class:`OptProblem <optalg.opt_solver.problem.OptProblem>`
+        """
+
+        from optalg.opt_solver.problem import cast_problem
+
+        ws = self._warm_start
+        T = net.num_periods
+        shift = ws['shift']
+        index = get_var_indices(net)[1]
+
+        # Primal
+        x = ws['x'][:net.num_vars]
+        if x.size != net.num_vars:
+            raise PFmethodError_BadWarmStart()
+        if shift:
+            x = shift_vars(x,index,shift)
+        net.set_var_values(x)
+
+        # Problem
+        opt_problem = cast_problem(problem)
+        opt_problem.x = problem.x
         
+        # Duals
+        if use_duals and ws['duals'] is not None:
+            lam,nu,mu,pi = ws['duals']
+            try:
+                assert(lam.size == problem.A.shape[0])
+                assert(nu.size == problem.f.size)
+                assert(mu.size == pi.size == problem.G.shape[0])
+            except AssertionError:
+                raise PFmethodError_BadWarmStart()
+            if shift:
+                lam = shift_rows(lam,T,shift)
+                mu = np.hstack((shift_vars(mu[:net.num_vars],index,shift),
+                                shift_rows(mu[net.num_vars:],T,shift)))
+                pi = np.hstack((shift_vars(pi[:net.num_vars],index,shift),
+                                shift_rows(pi[net.num_vars:],T,shift)))
+            opt_problem.lam = lam
+            opt_problem.nu = nu
+            opt_problem.mu = mu
+            opt_problem.pi = pi
+
+        # Return
+        return opt_problem
+
+    def set_network_flags(self,net):
+        """
+        Sets flags of network quantities that are variables.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
         # Parameters
         params = self._parameters
-        thermal_limits = params['thermal_limits']
+        formulation = params['formulation']
+        if formulation not in ['angle','ptdf']:
+            raise PFmethodError_BadParams(['formulation'])
         
         # Clear flags
         net.clear_flags()
         
         # Set flags
-        net.set_flags('bus',
-                      'variable',
-                      'not slack',
-                      'voltage angle')
+        if formulation == 'angle':
+            net.set_flags('bus',
+                          'variable',
+                          'not slack',
+                          'voltage angle')
         net.set_flags('generator',
                       ['variable','bounded'],
                       ['adjustable active power','not on outage'],
@@ -82,23 +243,38 @@ class DCOPF(PFmethod):
                           'any',
                           'active power')
 
+        # Check
         try:
             num_gvar =  len([g for g in net.generators if 
                              (not g.is_on_outage()) and g.is_P_adjustable()])
             num_cur = net.num_var_generators if params['renewable_curtailment'] else 0
             assert(net.num_bounded == (num_gvar+net.get_num_P_adjust_loads()+num_cur)*net.num_periods)
-            assert(net.num_vars == (net.num_buses-net.get_num_slack_buses()+
+            num_ang = net.num_buses-net.get_num_slack_buses() if formulation == 'angle' else 0
+            assert(net.num_vars == (num_ang+
                                     num_gvar+net.get_num_P_adjust_loads()+
                                     num_cur)*net.num_periods)
         except AssertionError:
             raise PFmethodError_BadProblem()
+
+    def create_problem(self,net):
+
+        import pfnet
+        
+        # Parameters
+        params = self._parameters
+        thermal_limits = params['thermal_limits']
+        formulation = params['formulation']
+
+        # Flags
+        self.set_network_flags(net)
             
         # Set up problem
         problem = pfnet.Problem(net)
         problem.add_constraint(pfnet.Constraint('variable bounds',net))
-        problem.add_constraint(pfnet.Constraint('DC power balance',net))
-        if thermal_limits:
-            problem.add_constraint(pfnet.Constraint('DC branch flow limits',net))
+        if formulation == 'angle':
+            problem.add_constraint(pfnet.Constraint('DC power balance',net))
+            if thermal_limits:
+                problem.add_constraint(pfnet.Constraint('DC branch flow limits',net))
         problem.add_function(pfnet.Function('generation cost',1.,net))
         problem.add_function(pfnet.Function('consumption utility',-1.,net))
         problem.analyze()
@@ -106,15 +282,360 @@ class DCOPF(PFmethod):
         # Return
         return problem
             
-    def solve(self,net):
+    def create_quad_problem(self,problem,G,l,u,x=None,duals=None,A=None,b=None):
+        """
+        Creates quadratic program with the objective, linear equality
+        constraints and variable bounds of the given problem, and the
+        linear inequality constraints l <= G*x <= u, which are modeled
+        with slack variables appended to the primal variables.
+
+        Parameters
+        ----------
+        problem : |Problem|
+        G : sparse matrix
+        l : vector
+        u : vector
+        x : vector
+            Starting point (without slack variables)
+        duals : list
+                Dual variables ``[lam,nu,mu,pi]`` of a quadratic program with
+                fewer inequality constraints, to be extended with zeros
+        A : sparse matrix
+            Matrix of linear equality constraints (those of problem if ``None``)
+        b : vector
+            Right-hand side of linear equality constraints
+
+        Returns
+        -------
+        qp : :class:`QuadProblem <optalg.opt_solver.problem_quad.QuadProblem>`
+        """
+
+        from optalg.opt_solver import QuadProblem
+
+        # Objective
+        x0 = problem.x
+        n = x0.size
+        problem.eval(x0)
+        H = coo_matrix(problem.Hphi)
+        H = (H+H.T-coo_matrix((H.diagonal(),(np.arange(n),np.arange(n))),shape=(n,n))).tocoo()
+        g = problem.gphi-H*x0
+
+        # Bounds
+        c = problem.find_constraint('variable bounds')
+        Gb = coo_matrix(c.G)
+        lx = -np.inf*np.ones(n)
+        ux = np.inf*np.ones(n)
+        lx[Gb.col] = c.l[Gb.row]/Gb.data
+        ux[Gb.col] = c.u[Gb.row]/Gb.data
+
+        # Equality constraints
+        if A is None:
+            A = problem.A
+            b = problem.b
+
+        # Slacks
+        m = G.shape[0]
+        if m > 0:
+            H = bmat([[H,None],[None,coo_matrix((m,m))]],format='coo')
+            A = bmat([[A,None],[G,-eye(m)]],format='coo')
+        else:
+            A = coo_matrix(A)
+        g = np.hstack((g,np.zeros(m)))
+        b = np.hstack((b,np.zeros(m)))
+        l = np.hstack((lx,l))
+        u = np.hstack((ux,u))
+
+        # Starting point
+        if x is None:
+            x = x0
+        x = np.hstack((x,G*x))
+        lam = mu = pi = None
+        if duals is not None:
+            lam,nu,mu,pi = duals
+            lam = np.hstack((lam,np.zeros(A.shape[0]-lam.size)))
+            mu = np.hstack((mu,np.zeros(x.size-mu.size)))
+            pi = np.hstack((pi,np.zeros(x.size-pi.size)))
+
+        # Return
+        return QuadProblem(H,g,A,b,l,u,x=x,lam=lam,mu=mu,pi=pi)
+
+    def solve_rounds(self,solver,problem,limits,rows,A=None,b=None):
+        """
+        Solves problem with inequality constraints generated as needed.
+        The problem is solved with the given initial constraints. Then,
+        the constraints that are violated or nearly binding are added and
+        the problem is solved again from the previous solution. This is
+        repeated until no constraint is violated.
+
+        Parameters
+        ----------
+        solver : :class:`OptSolver <optalg.opt_solver.opt_solver.OptSolver>`
+        problem : |Problem|
+        limits : dict
+                 Candidate constraints l <= G*x <= u, with keys ``'get'`` (function of
+                 rows returning G, l and u), ``'eval'`` (function of x returning
+                 values of all constraints, with the same offsets as ``'l'`` and
+                 ``'u'``), ``'l'`` and ``'u'``
+        rows : array
+               Initial constraints
+        A : sparse matrix
+        b : vector
+
+        Returns
+        -------
+        info : dict
+               Keys ``'x'``, ``'duals'`` (of the last quadratic program),
+               ``'iterations'``, ``'rounds'``, ``'rows'``, and ``'violations'``
+               (number of constraints violated by the solution when the
+               maximum number of rounds is reached)
+        """
+
+        # Parameters
+        params = self._parameters
+        margin = params['lazy_margin']
+        max_rounds = params['lazy_max_rounds']
+        if max_rounds < 1:
+            raise PFmethodError_BadParams(['lazy_max_rounds'])
+
+        # Limits
+        n = problem.x.size
+        l = limits['l']
+        u = limits['u']
+        band = np.where(np.isfinite(u-l),margin*(u-l)/2.,0.)
+        tol = 1e-6*(1.+np.where(np.isfinite(u-l),u-l,0.))
+
+        # Rounds
+        rows = np.array(rows,dtype=int)
+        x = problem.x
+        duals = None
+        iterations = 0
+        violations = 0
+        for k in range(max_rounds):
+            G,lr,ur = limits['get'](rows)
+            qp = self.create_quad_problem(problem,G,lr,ur,x,duals,A,b)
+            solver.solve(qp)
+            iterations += solver.get_iterations()
+            x = solver.get_primal_variables()[:n]
+            duals = solver.get_dual_variables()
+            if solver.get_status() != 'solved':
+                break
+            f = limits['eval'](x)
+            new = np.setdiff1d(np.where((f < l+band) | (f > u-band))[0],rows)
+            if new.size == 0:
+                break
+            if k == max_rounds-1:
+                violations = int(np.sum((f < l-tol) | (f > u+tol)))
+                break
+            rows = np.hstack((rows,new))
+
+        # Return
+        return {'x': x,
+                'duals': duals,
+                'iterations': iterations,
+                'rounds': k+1,
+                'rows': rows,
+                'violations': violations}
+
+    def solve_lazy(self,solver,problem,net):
+        """
+        Solves problem by generating branch flow limits as needed,
+        starting without any.
+
+        Parameters
+        ----------
+        solver : :class:`OptSolver <optalg.opt_solver.opt_solver.OptSolver>`
+        problem : |Problem|
+                  Problem with branch flow limits
+        net : |Network|
+
+        Returns
+        -------
+        info : dict
+               Keys ``'x'``, ``'duals'`` (with the shapes of those of the given problem),
+               ``'iterations'``, ``'rounds'``, and ``'rows'`` (indices of monitored
+               branch flow limits, ordered by branch index and then by time period).
+               Rounds and rows are also saved in the results as ``'lazy rounds'``
+               and ``'lazy rows'``.
+        """
+
+        # Branch flow limits
+        n = net.num_vars
+        G = problem.G.tocsr()
+        Gf = G[n:,:]
+        limits = {'get': lambda r: (Gf[r,:],problem.l[n+r],problem.u[n+r]),
+                  'eval': lambda x: Gf*x,
+                  'l': problem.l[n:],
+                  'u': problem.u[n:]}
+
+        # Solve
+        info = self.solve_rounds(solver,problem,limits,[])
+
+        # Duals
+        lam,nu,mu,pi = info['duals']
+        rows = info['rows']
+        m = rows.size
+        Gb = coo_matrix(problem.find_constraint('variable bounds').G)
+        mu_full = np.zeros(G.shape[0])
+        pi_full = np.zeros(G.shape[0])
+        mu_full[Gb.row] = mu[Gb.col]
+        pi_full[Gb.row] = pi[Gb.col]
+        mu_full[n+rows] = mu[n:n+m]
+        pi_full[n+rows] = pi[n:n+m]
+        info['duals'] = [lam[:problem.A.shape[0]],np.zeros(problem.f.size),mu_full,pi_full]
+
+        # Return
+        return info
+
+    def solve_ptdf(self,solver,problem,net):
+        """
+        Solves problem with the formulation without voltage angles.
+        Power balance is enforced with a single constraint per time
+        period, and flows of branches with nonzero ratingA are expressed
+        with power transfer distribution factors. Branch flow limits are
+        generated as needed if ``'lazy_thermal_limits'`` is set.
+        Distribution factors are kept across solves and refactorized
+        only when the topology or branch parameters change.
+
+        Parameters
+        ----------
+        solver : :class:`OptSolver <optalg.opt_solver.opt_solver.OptSolver>`
+        problem : |Problem|
+                  Problem without power balance constraints
+        net : |Network|
+
+        Returns
+        -------
+        info : dict
+               Keys ``'x'``, ``'duals'`` (``lam`` are the sensitivities with respect to
+               bus power balances as in the angle formulation, and ``mu`` and ``pi``
+               are those of the variable bounds followed by those of the branch
+               flow limits ordered by branch index and then by time period),
+               ``'iterations'``, ``'rounds'``, and ``'rows'``
+        """
+
+        # Parameters
+        params = self._parameters
+        thermal_limits = params['thermal_limits']
+        lazy = params['lazy_thermal_limits']
+
+        # Data
+        nb = net.num_buses
+        nbr = net.num_branches
+        T = net.num_periods
+        n = net.num_vars
+        if self._factors is None:
+            self._factors = DistributionFactors(net,self._dcpf,sparse=True)
+        else:
+            self._factors.update(net)
+        factors = self._factors
+        sign = factors.sign
+        p = get_bus_injections(net)
+
+        # Injections of variables
+        rows = []
+        cols = []
+        data = []
+        for comps,c in [(net.generators,1.),(net.var_generators,1.),(net.loads,-1.)]:
+            for comp in comps:
+                if comp.has_flags('variable','active power'):
+                    rows += [comp.bus.index+t*nb for t in range(T)]
+                    cols += [comp.index_P[t] for t in range(T)]
+                    data += T*[c]
+        K = coo_matrix((data,(rows,cols)),shape=(nb*T,n)).tocsr()
+
+        # Power balance
+        E = coo_matrix((np.ones(nb*T),(np.repeat(np.arange(T),nb),np.arange(nb*T))),shape=(T,nb*T))
+        A = sign*(E*K)
+        b = -sign*(E*p)
+
+        # Branch flow limits
+        rating = np.tile(np.array([br.ratingA for br in net.branches]),T)
+        monitored = (rating > 0.) & np.tile(~factors.outage,T)
+        if not thermal_limits:
+            monitored[:] = False
+        lf = np.where(monitored,-rating,-np.inf)
+        uf = np.where(monitored,rating,np.inf)
+        f0 = factors.get_angles_and_flows(np.zeros(nb*T))[1]
+
+        def get_ptdf(r):
+            P = coo_matrix(factors.get_ptdf(r%nbr))
+            return coo_matrix((P.data,(P.row,P.col+(r//nbr)[P.row]*nb)),shape=(r.size,nb*T)).tocsr()
+
+        def get_limits(r):
+            P = get_ptdf(r)
+            offset = P*p+f0[r]
+            return P*K,lf[r]-offset,uf[r]-offset
+
+        limits = {'get': get_limits,
+                  'eval': lambda x: factors.get_angles_and_flows(K*x+p)[1],
+                  'l': lf,
+                  'u': uf}
+
+        # Solve
+        info = self.solve_rounds(solver,problem,limits,
+                                 [] if lazy else np.where(monitored)[0],
+                                 A=A,b=b)
+
+        # Duals
+        lam,nu,mu,pi = info['duals']
+        rows = info['rows']
+        m = rows.size
+        eta = lam[T:T+m]
+        lam_bus = E.T*lam[:T]
+        if m > 0:
+            lam_bus += sign*(get_ptdf(rows).T*eta)
+        Gb = coo_matrix(problem.find_constraint('variable bounds').G)
+        mu_full = np.zeros(Gb.shape[0]+(nbr*T if thermal_limits else 0))
+        pi_full = np.zeros(mu_full.size)
+        mu_full[Gb.row] = mu[Gb.col]
+        pi_full[Gb.row] = pi[Gb.col]
+        mu_full[Gb.shape[0]+rows] = mu[n:n+m]
+        pi_full[Gb.shape[0]+rows] = pi[n:n+m]
+        info['duals'] = [lam_bus,np.zeros(problem.f.size),mu_full,pi_full]
+        info['angles'] = factors.get_angles_and_flows(K*info['x']+p)[0]
+
+        # Return
+        return info
+
+    def set_angles(self,net,angles):
+        """
+        Sets bus voltage angles of network. Flags of network
+        quantities that are variables are restored afterwards.
+
+        Parameters
+        ----------
+        net : |Network|
+        angles : array
+                 Angles ordered by bus index and then by time period
+        """
+
+        nb = net.num_buses
+        net.set_flags('bus',
+                      'variable',
+                      'not slack',
+                      'voltage angle')
+        x = net.get_var_values()
+        for bus in net.buses:
+            if bus.has_flags('variable','voltage angle'):
+                for t in range(net.num_periods):
+                    x[bus.index_v_ang[t]] = angles[bus.index+t*nb]
+        net.set_var_values(x)
+        self.set_network_flags(net)
+
+    def create_solver(self):
+        """
+        Creates optimization solver with the solver parameters.
+
+        Returns
+        -------
+        solver : :class:`OptSolver <optalg.opt_solver.opt_solver.OptSolver>`
+        """
 
-        from optalg.opt_solver import OptSolverError
         from optalg.opt_solver import OptSolverIQP, OptSolverAugL, OptSolverIpopt
-        
+
         # Parameters
         params = self._parameters
         solver_name = params['solver']
-        solver_params = params['solver_parameters']
 
         # Solver
         if solver_name == 'iqp':
@@ -125,21 +646,58 @@ class DCOPF(PFmethod):
             solver = OptSolverIpopt()
         else:
             raise PFmethodError_BadOptSolver()
-        solver.set_parameters(solver_params[solver_name])
+        solver.set_parameters(params['solver_parameters'][solver_name])
 
-        # Copy network
-        net = net.get_copy()
+        # Return
+        return solver
+
+    def solve(self,net):
+
+        from optalg.opt_solver import OptSolverError
+        
+        # Parameters
+        params = self._parameters
+        solver_name = params['solver']
+        ptdf = params['formulation'] == 'ptdf'
+        lazy = ptdf or (params['thermal_limits'] and params['lazy_thermal_limits'])
+        reuse = params['reuse_problem']
+        if lazy and params['lazy_max_rounds'] < 1:
+            raise PFmethodError_BadParams(['lazy_max_rounds'])
+
+        # Solver
+        solver = self.create_solver()
 
         # Problem
         t0 = time.time()
-        problem = self.create_problem(net)
+        template_key = self.get_template_key(net) if reuse else None
+        if reuse and self._template is not None and self._template['key'] == template_key:
+            self.copy_network_data(net,self._template['net'])
+            net = self._template['net']
+            problem = self._template['problem']
+            problem.update_lin()
+        else:
+            net = net.get_copy()
+            problem = self.create_problem(net)
+            self._template = {'key': template_key, 'net': net, 'problem': problem} if reuse else None
         problem_time = time.time()-t0
+
+        # Warm start
+        if self._warm_start is not None:
+            opt_problem = self.apply_warm_start(net,problem,use_duals=not lazy)
+        else:
+            opt_problem = problem
                 
         # Solve
         update = True
+        info = None
         t0 = time.time()
         try:
-            solver.solve(problem)
+            if ptdf:
+                info = self.solve_ptdf(solver,problem,net)
+            elif lazy:
+                info = self.solve_lazy(solver,problem,net)
+            else:
+                solver.solve(opt_problem)
         except OptSolverError as e:
             raise PFmethodError_SolverError(e)
         except Exception as e:
@@ -147,21 +705,50 @@ class DCOPF(PFmethod):
             raise e
         finally:
 
+            # Variables
+            if info is not None:
+                x = info['x']
+                duals = info['duals']
+                iterations = info['iterations']
+            elif lazy:
+                update = False
+                x = solver.get_primal_variables()
+                x = x[:net.num_vars] if x is not None else None
+                duals = 4*[None]
+                iterations = solver.get_iterations()
+            else:
+                x = solver.get_primal_variables()
+                duals = solver.get_dual_variables()
+                iterations = solver.get_iterations()
+
             # Update network
             if update:
-                net.set_var_values(solver.get_primal_variables()[:net.num_vars])
-                net.update_properties()
+                net.set_var_values(x[:net.num_vars])
                 net.clear_sensitivities()
-                problem.store_sensitivities(*solver.get_dual_variables())
+                if ptdf:
+                    nG = problem.G.shape[0]
+                    problem.store_sensitivities(np.zeros(0),duals[1],duals[2][:nG],duals[3][:nG])
+                    self.set_angles(net,info['angles'])
+                else:
+                    problem.store_sensitivities(*duals)
+                net.update_properties()
 
             # Save results
             self.set_solver_name(solver_name)
             self.set_solver_status(solver.get_status())
             self.set_solver_message(solver.get_error_msg())
-            self.set_solver_iterations(solver.get_iterations())
+            self.set_solver_iterations(iterations)
             self.set_solver_time(time.time()-t0)
-            self.set_solver_primal_variables(solver.get_primal_variables())
-            self.set_solver_dual_variables(solver.get_dual_variables())
+            self.set_solver_primal_variables(x)
+            self.set_solver_dual_variables(duals)
             self.set_problem(None) # skip for now
             self.set_problem_time(problem_time)
-            self.set_network_snapshot(net)
+            self.set_network_snapshot(net.get_copy() if reuse else net)
+            for key in ['rounds','rows']:
+                self.results.pop('lazy %s' %key,None)
+                if info is not None:
+                    self.results['lazy %s' %key] = info[key]
+            if info is not None and info['violations'] > 0:
+                self.set_solver_status('error')
+                self.set_solver_message('%d branch flow limits violated after %d rounds (lazy_max_rounds)'
+                                        %(info['violations'],info['rounds']))
@@ -9,8 +9,14 @@
 from __future__ import print_function
 import time
 import numpy as np
+from scipy.sparse import coo_matrix
 from .method_error import *
 from .method import PFmethod
+from .factor_cache import FactorCache
+from .krylov import KrylovLinSolver, new_linsolver
+from .dc_utils import get_bus_injections, get_injection_sign
+from .dc_utils import get_angle_map, get_flow_map, solve_multiple
+from .dc_utils import get_period_values, get_susceptance_matrix
 
 class DCPF(PFmethod):
     """
@@ -20,7 +26,12 @@ class DCPF(PFmethod):
     name = 'DCPF'
     
     _parameters = {'quiet': False,
-                   'solver' : 'superlu'}
+                   'cache_factors': True,     # flag for caching factorizations across solves
+                   'cache_max_entries': 10,   # max number of cached factorizations
+                   'cache_max_memory': 5e8,   # max memory of cached factorizations (bytes)
+                   'contingency_block_size': 256, # number of outages screened per blocked solve
+                   'direct_assembly': False,  # flag for assembling reduced system without pfnet problem
+                   'solver' : 'superlu'}      # linear solver (superlu, mumps, gmres, bicgstab)
     
     def __init__(self):
 
@@ -28,14 +39,74 @@ class DCPF(PFmethod):
 
         self._parameters = DCPF._parameters.copy()
         self._parameters['solver_parameters'] = {'superlu': {},
-                                                 'mumps': {}}
+                                                 'mumps': {},
+                                                 'gmres': KrylovLinSolver.parameters.copy(),
+                                                 'bicgstab': KrylovLinSolver.parameters.copy()}
 
-    def create_problem(self,net):
+        self._cache = FactorCache()
 
-        import pfnet
+    def get_linsolver(self,A,cache=True):
+        """
+        Gets linear solver factorized for the given matrix,
+        reusing cached factorizations if enabled.
+
+        Parameters
+        ----------
+        A : sparse matrix
+        cache : {``True``, ``False``}
+                Flag for allowing cached factorizations. Linear solvers
+                kept beyond the solve should not be cached ones, since
+                cache entries are refactorized in place by later solves
+
+        Returns
+        -------
+        linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+        """
 
         # Parameters
         params = self._parameters
+        solver_name = params['solver']
+        solver_params = params['solver_parameters'].get(solver_name)
+
+        # No cache
+        if not (cache and params['cache_factors']):
+            linsolver = new_linsolver(solver_name,'unsymmetric',solver_params)
+            linsolver.analyze(A)
+            linsolver.factorize(A)
+            return linsolver
+
+        # Cache
+        self._cache.max_entries = params['cache_max_entries']
+        self._cache.max_memory = params['cache_max_memory']
+        return self._cache.get_linsolver(A,solver_name,'unsymmetric',params=solver_params)
+
+    def get_factor_key(self,A):
+        """
+        Gets key of the factorization of a matrix used by the
+        factorization cache, which consists of hashes of the linear
+        solver and sparsity pattern, and of the values.
+
+        Parameters
+        ----------
+        A : sparse matrix
+
+        Returns
+        -------
+        key : tuple
+        """
+
+        A = coo_matrix(A)
+        return (self._cache.get_pattern_key(A,self._parameters['solver'],'unsymmetric'),
+                self._cache.get_values_key(A))
+
+    def set_network_flags(self,net):
+        """
+        Sets flags of network quantities that are variables.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
         
         # Clear flags
         net.clear_flags()
@@ -54,10 +125,18 @@ class DCPF(PFmethod):
 
         # Check
         try:
-            assert(net.num_vars == net.num_buses-1+net.get_num_slack_gens())
+            assert(net.num_vars == (net.num_buses-net.get_num_slack_buses()+
+                                    net.get_num_slack_gens())*net.num_periods)
         except AssertionError:
             raise PFmethodError_BadProblem()
 
+    def create_problem(self,net):
+
+        import pfnet
+
+        # Flags
+        self.set_network_flags(net)
+
         # Set up problem
         problem = pfnet.Problem(net)
         problem.add_constraint(pfnet.Constraint('DC power balance',net))
@@ -66,35 +145,180 @@ class DCPF(PFmethod):
 
         # Return
         return problem
+
+    def create_reduced_problem(self,net):
+        """
+        Creates reduced DC power flow system directly from vectorized
+        bus and branch data, without constructing a |Problem|. The
+        system is B*w = p, where B is the susceptance matrix of the
+        non-slack buses and w are their voltage angles.
+
+        Parameters
+        ----------
+        net : |Network|
+
+        Returns
+        -------
+        B : csr_matrix
+        p : 2-D array
+            Right-hand sides (non-slack buses x time periods)
+        data : dict
+               Data for recovering the slack generator powers
+        """
+
+        # Flags
+        self.set_network_flags(net)
+
+        # Data
+        nb = net.num_buses
+        T = net.num_periods
+        slack = np.array([bus.is_slack() for bus in net.buses],dtype=bool)
+        r = np.where(~slack)[0]
+        s = np.where(slack)[0]
+        w_s = np.array([get_period_values(net.get_bus(i).v_ang,T) for i in s]).reshape((s.size,T))
+        Bbus,p0 = get_susceptance_matrix(net)
+        p = get_bus_injections(net).reshape((T,nb)).T+p0
+
+        # Reduced system
+        B = Bbus[r,:][:,r]
+        data = {'r': r,
+                's': s,
+                'w_s': w_s,
+                'B_sr': Bbus[s,:][:,r],
+                'p_s': p[s,:]-Bbus[s,:][:,s]*w_s}
+        p = p[r,:]-Bbus[r,:][:,s]*w_s
+
+        # Return
+        return B,p,data
+
+    def get_reduced_solution(self,net,w_r,data):
+        """
+        Gets vector of variable values from voltage angles of
+        the non-slack buses. Power imbalances at the slack buses are
+        shared equally among their slack generators.
+
+        Parameters
+        ----------
+        net : |Network|
+        w_r : 2-D array
+              Angles (non-slack buses x time periods)
+        data : dict
+
+        Returns
+        -------
+        x : array
+        """
+
+        T = net.num_periods
+        x = np.zeros(net.num_vars)
+
+        # Angles
+        index = np.array([[net.get_bus(i).index_v_ang[t] for t in range(T)] for i in data['r']],dtype=int)
+        x[index.ravel()] = w_r.ravel()
+
+        # Slack gens
+        P = data['B_sr']*w_r-data['p_s']
+        for j,i in enumerate(data['s']):
+            gens = [g for g in net.get_bus(i).gens if g.has_flags('variable','active power')]
+            for gen in gens:
+                x[np.array([gen.index_P[t] for t in range(T)],dtype=int)] = P[j,:]/len(gens)
+
+        # Return
+        return x
                     
+    def get_period_blocks(self,net,A):
+        """
+        Gets rows and columns of the diagonal blocks of the system
+        matrix associated with each time period, if these blocks are
+        identical and there is no coupling between periods.
+
+        Parameters
+        ----------
+        net : |Network|
+        A : sparse matrix
+
+        Returns
+        -------
+        rows : 2-D array
+               Row indices (time periods x block size), or ``None``
+        cols : 2-D array
+               Column indices (time periods x block size), or ``None``
+        """
+
+        T = net.num_periods
+        A = A.tocsr()
+
+        # Columns
+        cols = np.array([[bus.index_v_ang[t] for bus in net.buses
+                          if bus.has_flags('variable','voltage angle')] +
+                         [gen.index_P[t] for gen in net.generators
+                          if gen.has_flags('variable','active power')]
+                         for t in range(T)],dtype=int)
+        col_period = np.zeros(A.shape[1],dtype=int)
+        for t in range(T):
+            col_period[cols[t,:]] = t
+
+        # Rows
+        if np.any(np.diff(A.indptr) == 0):
+            return None,None
+        row_period = col_period[A.indices[A.indptr[:-1]]]
+        rows = [np.where(row_period == t)[0] for t in range(T)]
+        if any([r.size != cols.shape[1] for r in rows]):
+            return None,None
+        rows = np.array(rows,dtype=int)
+
+        # Blocks
+        A0 = A[rows[0,:],:][:,cols[0,:]]
+        if A0.nnz*T != A.nnz:
+            return None,None
+        for t in range(1,T):
+            At = A[rows[t,:],:][:,cols[t,:]]
+            if At.nnz != A0.nnz or (At-A0).nnz != 0:
+                return None,None
+
+        # Return
+        return rows,cols
+
     def solve(self,net):
 
-        from optalg.lin_solver import new_linsolver
-        
         # Parameters
         params = self._parameters
         solver_name = params['solver']
+        direct_assembly = params['direct_assembly']
 
         # Copy network
         net = net.get_copy()
         
         # Problem
         t0 = time.time()
-        problem = self.create_problem(net)
+        rows,cols = None,None
+        if direct_assembly:
+            A,b,data = self.create_reduced_problem(net)
+            x = None
+        else:
+            problem = self.create_problem(net)
+            A = problem.A
+            b = problem.b
+            x = problem.x
+            if net.num_periods > 1:
+                rows,cols = self.get_period_blocks(net,A)
         problem_time = time.time()-t0
-        
-        A = problem.A
-        b = problem.b
-        x = problem.x
 
         # Solve
         update = True
         t0 = time.time()
         try:
             assert(A.shape[0] == A.shape[1])
-            linsolver = new_linsolver(solver_name,'unsymmetric')
-            linsolver.analyze(A)
-            x = linsolver.factorize_and_solve(A,b)
+            if direct_assembly:
+                linsolver = self.get_linsolver(A)
+                x = self.get_reduced_solution(net,solve_multiple(linsolver,b),data)
+            elif rows is not None:
+                linsolver = self.get_linsolver(A.tocsr()[rows[0,:],:][:,cols[0,:]])
+                x = np.zeros(A.shape[1])
+                x[cols.T] = solve_multiple(linsolver,b[rows.T])
+            else:
+                linsolver = self.get_linsolver(A)
+                x = linsolver.solve(b)
         except Exception as e:
             update = False
             raise PFmethodError_SolverError(e)
@@ -117,3 +341,142 @@ class DCPF(PFmethod):
             self.set_problem(None) # skip for now
             self.set_problem_time(problem_time)
             self.set_network_snapshot(net)
+
+    def solve_batch(self,net,injections):
+        """
+        Solves DC power flow problems for multiple bus injection
+        scenarios using a single factorization and a blocked solve.
+
+        Parameters
+        ----------
+        net : |Network|
+        injections : 2-D array
+                     Active power injections of components that are not
+                     variables (buses x scenarios, ordered by bus index
+                     and then by time period)
+
+        Returns
+        -------
+        angles : 2-D array
+                 Bus voltage angles (buses x scenarios)
+        flows : 2-D array
+                Branch active power flows (branches x scenarios)
+        """
+
+        # Injections
+        P = np.array(injections,dtype=float)
+        if P.ndim == 1:
+            P = P.reshape((P.size,1))
+
+        # Copy network
+        net = net.get_copy()
+
+        # Problem
+        problem = self.create_problem(net)
+        A = problem.A
+        b = problem.b
+        nbT = net.num_buses*net.num_periods
+        if P.ndim != 2 or P.shape[0] != nbT:
+            raise PFmethodError_BadInjections()
+
+        # Right-hand sides
+        B = np.tile(b.reshape((b.size,1)),(1,P.shape[1]))
+        p0 = get_bus_injections(net)
+        sign = get_injection_sign(net,A)
+        B[:nbT,:] -= sign*(P-p0.reshape((nbT,1)))
+
+        # Solve
+        try:
+            assert(A.shape[0] == A.shape[1])
+            linsolver = self.get_linsolver(A)
+            X = solve_multiple(linsolver,B)
+        except Exception as e:
+            raise PFmethodError_SolverError(e)
+
+        # Angles and flows
+        S,theta0 = get_angle_map(net,net.num_vars)
+        F,f0 = get_flow_map(net)
+        angles = S*X+theta0.reshape((nbT,1))
+        flows = F*angles+f0.reshape((f0.size,1))
+
+        # Return
+        return angles,flows
+
+    def solve_contingencies(self,net,outages=None):
+        """
+        Solves DC power flow and screens single-branch outages.
+
+        Post-contingency flows are obtained with rank-one
+        (Sherman-Morrison) updates of the base case through line
+        outage distribution factors, which take the base case
+        factorization from the factorization cache. Without caching
+        or with multiple time periods or direct assembly, the base
+        case system of the factors is factorized separately. Outages that island the network are reported
+        and their flows are filled with ``nan``. Branches with zero
+        ratingA are not checked for overloads.
+
+        Parameters
+        ----------
+        net : |Network|
+        outages : array
+                  Indices of outaged branches (all if ``None``)
+
+        Returns
+        -------
+        results : dict
+                  Keys ``'contingency outages'``, ``'contingency flows'``
+                  (branches x outages, ordered by branch index and then by
+                  time period), ``'contingency overloads'`` (dict mapping
+                  outages to overloaded flow rows), and ``'islanding outages'``.
+        """
+
+        from .dist_factors import DistributionFactors
+
+        # Parameters
+        block_size = self._parameters['contingency_block_size']
+
+        # Base case
+        self.solve(net)
+        snapshot = self.results['network snapshot']
+        x = self.results['solver primal variables']
+        S,theta0 = get_angle_map(snapshot,snapshot.num_vars)
+        F,f0 = get_flow_map(snapshot)
+        f = F*(S*x+theta0)+f0
+
+        # Data
+        nbr = snapshot.num_branches
+        T = snapshot.num_periods
+        rating = np.tile(np.array([br.ratingA for br in snapshot.branches]),T)
+        checked = rating > 0.
+        if outages is None:
+            outages = np.arange(nbr)
+        outages = np.array(outages,dtype=int)
+
+        # Screening
+        factors = DistributionFactors(snapshot,self,cache=True)
+        flows = np.zeros((nbr*T,outages.size))
+        overloads = {}
+        islanding = []
+        for i in range(0,outages.size,block_size):
+            block = outages[i:i+block_size]
+            lodf,isl = factors.get_lodf(block)
+            for t in range(T):
+                ft = f[t*nbr:(t+1)*nbr]
+                flows[t*nbr:(t+1)*nbr,i:i+block.size] = (ft.reshape((nbr,1)) +
+                                                         lodf*ft[block])
+            for j,k in enumerate(block):
+                if isl[j]:
+                    islanding.append(k)
+                    continue
+                fk = flows[:,i+j]
+                overloads[k] = np.where(checked & (np.abs(fk) > rating))[0]
+
+        # Results
+        results = {'contingency outages': outages,
+                   'contingency flows': flows,
+                   'contingency overloads': overloads,
+                   'islanding outages': np.array(islanding,dtype=int)}
+        self.results.update(results)
+
+        # Return
+        return results
@@ -0,0 +1,238 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+def get_period_values(value,T):
+    """
+    Gets values of a component quantity for every time period.
+
+    Parameters
+    ----------
+    value : float or array
+    T : int
+
+    Returns
+    -------
+    values : array
+    """
+
+    return np.ones(T)*value if np.isscalar(value) else np.array(value,dtype=float)
+
+def get_bus_injections(net):
+    """
+    Gets fixed active power injections at the buses,
+    i.e., from components whose active powers are not variables.
+    Injections are ordered by bus index and then by time period.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    p : array
+    """
+
+    nb = net.num_buses
+    T = net.num_periods
+    p = np.zeros(nb*T)
+    tt = np.arange(T)*nb
+
+    for gen in net.generators:
+        if not gen.is_on_outage() and not gen.has_flags('variable','active power'):
+            p[gen.bus.index+tt] += get_period_values(gen.P,T)
+    for vargen in net.var_generators:
+        if not vargen.has_flags('variable','active power'):
+            p[vargen.bus.index+tt] += get_period_values(vargen.P,T)
+    for load in net.loads:
+        if not load.has_flags('variable','active power'):
+            p[load.bus.index+tt] -= get_period_values(load.P,T)
+
+    return p
+
+def get_injection_sign(net,A):
+    """
+    Gets sign of active power injections in the rows of the
+    DC power balance constraint, which are assumed to be the
+    first rows of the given matrix.
+
+    Parameters
+    ----------
+    net : |Network|
+    A : sparse matrix
+
+    Returns
+    -------
+    sign : float
+    """
+
+    A = A.tocsr()
+    for gen in net.generators:
+        if gen.has_flags('variable','active power'):
+            return np.sign(A[gen.bus.index,gen.index_P[0]])
+    return 1.
+
+def get_angle_map(net,num_vars):
+    """
+    Gets map from variable vector to bus voltage angles,
+    i.e., theta = S*x + theta0. Angles are ordered by bus
+    index and then by time period.
+
+    Parameters
+    ----------
+    net : |Network|
+    num_vars : int
+
+    Returns
+    -------
+    S : coo_matrix
+    theta0 : array
+    """
+
+    nb = net.num_buses
+    T = net.num_periods
+    theta0 = np.zeros(nb*T)
+    rows = []
+    cols = []
+
+    for bus in net.buses:
+        if bus.has_flags('variable','voltage angle'):
+            rows += [bus.index+t*nb for t in range(T)]
+            cols += [bus.index_v_ang[t] for t in range(T)]
+        else:
+            theta0[bus.index+np.arange(T)*nb] = get_period_values(bus.v_ang,T)
+
+    S = coo_matrix((np.ones(len(rows)),(rows,cols)),shape=(nb*T,num_vars))
+
+    return S,theta0
+
+def get_branch_arrays(net):
+    """
+    Gets arrays of DC branch data.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    k : array
+        Indices of "k" buses
+    m : array
+        Indices of "m" buses
+    w : array
+        Branch weights -b (zero for branches on outage)
+    phase : 2-D array
+            Phase shifts (branches x time periods)
+    """
+
+    T = net.num_periods
+    branches = net.branches
+    k = np.array([br.bus_k.index for br in branches],dtype=int)
+    m = np.array([br.bus_m.index for br in branches],dtype=int)
+    b = np.array([br.b for br in branches],dtype=float)
+    out = np.array([br.is_on_outage() for br in branches],dtype=bool)
+    phase = np.array([get_period_values(br.phase,T) for br in branches]).reshape((len(branches),T))
+    w = np.where(out,0.,-b)
+
+    return k,m,w,phase
+
+def get_flow_map(net):
+    """
+    Gets map from bus voltage angles to DC branch active power
+    flows, i.e., P_km = F*theta + f0, where P_km = -b*(w_k-w_m-phi).
+    Flows are ordered by branch index and then by time period.
+    Branches on outage have zero flow.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    F : coo_matrix
+    f0 : array
+    """
+
+    nb = net.num_buses
+    nbr = net.num_branches
+    T = net.num_periods
+    k,m,w,phase = get_branch_arrays(net)
+
+    rows = (np.arange(nbr).reshape((nbr,1))+np.arange(T)*nbr).ravel()
+    cols_k = (k.reshape((nbr,1))+np.arange(T)*nb).ravel()
+    cols_m = (m.reshape((nbr,1))+np.arange(T)*nb).ravel()
+    ww = np.repeat(w,T)
+
+    F = coo_matrix((np.hstack((ww,-ww)),(np.hstack((rows,rows)),np.hstack((cols_k,cols_m)))),
+                   shape=(nbr*T,nb*T))
+    f0 = np.zeros(nbr*T)
+    f0[rows] = -(w.reshape((nbr,1))*phase).ravel()
+
+    return F,f0
+
+def get_susceptance_matrix(net):
+    """
+    Gets bus susceptance matrix and phase shift injections of
+    a single time period, i.e., the net branch flows leaving the
+    buses are B*theta - p0.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    B : csr_matrix
+    p0 : 2-D array
+         Phase shift injections (buses x time periods)
+    """
+
+    nb = net.num_buses
+    nbr = net.num_branches
+    k,m,w,phase = get_branch_arrays(net)
+    i = np.arange(nbr)
+
+    C = coo_matrix((np.hstack((np.ones(nbr),-np.ones(nbr))),
+                    (np.hstack((i,i)),np.hstack((k,m)))),
+                   shape=(nbr,nb)).tocsr()
+    B = (C.T*coo_matrix((w,(i,i)),shape=(nbr,nbr))*C).tocsr()
+    p0 = C.T*(w.reshape((nbr,1))*phase)
+
+    return B,p0
+
+def solve_multiple(linsolver,B):
+    """
+    Solves linear system with multiple right-hand sides
+    using a factorized linear solver.
+
+    Parameters
+    ----------
+    linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+    B : 2-D array
+
+    Returns
+    -------
+    X : 2-D array
+    """
+
+    # Blocked
+    try:
+        X = linsolver.solve(B)
+        if X.shape == B.shape:
+            return X
+    except (ValueError,TypeError):
+        pass
+
+    # By columns
+    X = np.zeros(B.shape)
+    for j in range(B.shape[1]):
+        X[:,j] = linsolver.solve(B[:,j])
+    return X
@@ -0,0 +1,334 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+from collections import OrderedDict
+from scipy.sparse import coo_matrix, csr_matrix, vstack, hstack
+from .dc_pf import DCPF
+from .dc_utils import get_bus_injections, get_injection_sign, get_angle_map, get_flow_map, solve_multiple
+
+class DistributionFactors:
+
+    def __init__(self,net,method=None,sparse=False,tol=1e-8,max_rows=10000,block_size=256,cache=False):
+        """
+        Power transfer and line outage distribution factors.
+
+        Factors are computed from the DC power balance system assembled
+        by :class:`DCPF <gridopt.power_flow.dc_pf.DCPF>`, whose
+        factorization is reused for all factors. Injections at a bus
+        are balanced by the slack generators. Factors do not depend on
+        the time period and are computed for the first one.
+
+        In sparse mode, rows of the power transfer distribution factor
+        matrix are computed on demand, entries with magnitude below
+        tol are dropped, and rows are cached. Line outage distribution
+        factors are computed and sparsified in blocks of outages.
+
+        Parameters
+        ----------
+        net : |Network|
+        method : :class:`DCPF <gridopt.power_flow.dc_pf.DCPF>`
+        sparse : {``True``, ``False``}
+                 Flag for lazy sparse output
+        tol : float
+              Drop tolerance for sparse output and islanding detection
+        max_rows : int
+                   Maximum number of cached rows in sparse mode
+        block_size : int
+                     Number of outages per block of line outage
+                     distribution factors in sparse mode
+        cache : {``True``, ``False``}
+                Flag for taking the factorization from the cache of method,
+                e.g., that of a previous solve of the network. Factors with
+                a cached factorization should not be kept beyond the next
+                solve of method
+        """
+
+        # Method
+        if method is None:
+            method = DCPF()
+        self.method = method
+        self.sparse = sparse
+        self.tol = tol
+        self.max_rows = max_rows
+        self.block_size = block_size
+        self.cache = cache
+        self.key = None
+
+        # Data and factorization
+        self.update(net)
+
+    def update(self,net):
+        """
+        Updates data with that of a network, e.g., with other
+        injections. The factorization and the cached rows of power
+        transfer distribution factors are kept if the key of the
+        DC power balance matrix, which depends on the topology and
+        branch parameters, is unchanged.
+
+        Parameters
+        ----------
+        net : |Network|
+        """
+
+        # Problem
+        net = net.get_copy()
+        problem = self.method.create_problem(net)
+        A = problem.A.tocsr()
+        S,theta0 = get_angle_map(net,net.num_vars)
+        F,f0 = get_flow_map(net)
+
+        # Data
+        self.num_buses = net.num_buses
+        self.num_branches = net.num_branches
+        self.num_periods = net.num_periods
+        self.bus_k = np.array([br.bus_k.index for br in net.branches],dtype=int)
+        self.bus_m = np.array([br.bus_m.index for br in net.branches],dtype=int)
+        self.outage = np.array([br.is_on_outage() for br in net.branches],dtype=bool)
+        self.A = A
+        self.b = problem.b
+        self.p = get_bus_injections(net)
+        self.sign = get_injection_sign(net,A)
+        self.S = S.tocsr()
+        self.theta0 = theta0
+        self.F = F.tocsr()
+        self.f0 = f0
+        self.M = (F*S).tocsr()[:self.num_branches,:] # flows of first period
+
+        # Factorization
+        key = self.method.get_factor_key(A)
+        if self.cache or key != self.key:
+            self.key = key
+            self.linsolver = self.method.get_linsolver(A,cache=self.cache)
+            self.linsolver_T = None
+            self.rows = OrderedDict()
+
+    def get_angles_and_flows(self,injections):
+        """
+        Gets bus voltage angles and branch flows resulting from
+        bus injections, using the existing factorization.
+
+        Parameters
+        ----------
+        injections : array
+                     Active power injections of components that are not
+                     slack generators (ordered by bus index and then by
+                     time period)
+
+        Returns
+        -------
+        angles : array
+        flows : array
+        """
+
+        nbT = self.num_buses*self.num_periods
+        b = self.b.copy()
+        b[:nbT] -= self.sign*(injections-self.p)
+        x = self.linsolver.solve(b)
+        angles = self.S*x+self.theta0
+        flows = self.F*angles+self.f0
+
+        return angles,flows
+
+    def get_injection_matrix(self,K):
+        """
+        Gets right-hand sides for unit injections.
+
+        Parameters
+        ----------
+        K : sparse matrix
+            Bus injections (buses x injections)
+
+        Returns
+        -------
+        B : 2-D array
+        """
+
+        n = self.A.shape[0]
+        K = coo_matrix(K)
+        B = coo_matrix((-self.sign*K.data,(K.row,K.col)),shape=(n,K.shape[1]))
+        return B.toarray()
+
+    def get_transfer_factors(self,branches):
+        """
+        Gets flow changes due to unit transfers from the "k" bus to the
+        "m" bus of the given branches.
+
+        Parameters
+        ----------
+        branches : array
+                   Branch indices
+
+        Returns
+        -------
+        D : 2-D array
+            Flow changes (branches x transfers)
+        """
+
+        branches = np.array(branches,dtype=int)
+        nt = branches.size
+        K = coo_matrix((np.hstack((np.ones(nt),-np.ones(nt))),
+                        (np.hstack((self.bus_k[branches],self.bus_m[branches])),
+                         np.hstack((np.arange(nt),np.arange(nt))))),
+                       shape=(self.num_buses,nt))
+        X = solve_multiple(self.linsolver,self.get_injection_matrix(K))
+        return self.M*X
+
+    def get_ptdf(self,branches=None):
+        """
+        Gets power transfer distribution factors, i.e., sensitivities of
+        branch flows with respect to bus injections.
+
+        Parameters
+        ----------
+        branches : array
+                   Indices of monitored branches (all if ``None``)
+
+        Returns
+        -------
+        ptdf : 2-D array or csr_matrix
+               Factors (branches x buses), sparse in sparse mode
+        """
+
+        if branches is None:
+            branches = np.arange(self.num_branches)
+        branches = np.array(branches,dtype=int)
+
+        # Dense
+        if not self.sparse:
+            K = coo_matrix((np.ones(self.num_buses),
+                            (np.arange(self.num_buses),np.arange(self.num_buses))))
+            X = solve_multiple(self.linsolver,self.get_injection_matrix(K))
+            return self.M[branches,:]*X
+
+        # Sparse
+        branches = [int(i) for i in branches]
+        missing = [i for i in branches if i not in self.rows]
+        if missing:
+            self.compute_rows(missing)
+        for i in branches:
+            self.rows[i] = self.rows.pop(i) # most recently used
+        ptdf = vstack([self.rows[i] for i in branches],format='csr')
+        self.evict()
+        return ptdf
+
+    def get_ptdf_row(self,branch):
+        """
+        Gets power transfer distribution factors of a branch.
+
+        Parameters
+        ----------
+        branch : int
+                 Branch index
+
+        Returns
+        -------
+        row : array
+        """
+
+        if not self.sparse:
+            return self.get_ptdf([branch])[0,:]
+        return self.get_ptdf([branch]).toarray()[0,:]
+
+    def compute_rows(self,branches):
+        """
+        Computes and caches rows of power transfer distribution factors
+        using transposed solves.
+
+        Parameters
+        ----------
+        branches : list
+                   Branch indices
+        """
+
+        if self.linsolver_T is None:
+            self.linsolver_T = self.method.get_linsolver(self.A.T.tocsr(),cache=False)
+        Y = solve_multiple(self.linsolver_T,self.M[branches,:].T.toarray())
+        R = -self.sign*Y[:self.num_buses,:].T
+        R[np.abs(R) < self.tol] = 0.
+        for j,i in enumerate(branches):
+            self.rows[i] = csr_matrix(R[j:j+1,:])
+
+    def evict(self):
+        """
+        Removes least recently used rows until the row limit is satisfied.
+        """
+
+        while len(self.rows) > self.max_rows:
+            self.rows.popitem(last=False)
+
+    def get_lodf(self,outages=None):
+        """
+        Gets line outage distribution factors, i.e., changes of branch
+        flows due to outages of branches, relative to the pre-outage
+        flows of the outaged branches. Columns of outages that island
+        the network are filled with ``nan``, and columns of branches
+        already on outage are zero.
+
+        Parameters
+        ----------
+        outages : array
+                  Indices of outaged branches (all if ``None``)
+
+        Returns
+        -------
+        lodf : 2-D array
+               Factors (branches x outages), sparse in sparse mode
+        islanding : array
+                    Flags for islanding outages
+        """
+
+        if outages is None:
+            outages = np.arange(self.num_branches)
+        outages = np.array(outages,dtype=int)
+
+        # Dense
+        if not self.sparse:
+            return self.get_lodf_block(outages)
+
+        # Sparse
+        size = max(int(self.block_size),1)
+        blocks = []
+        islanding = []
+        for i in range(0,outages.size,size):
+            lodf,isl = self.get_lodf_block(outages[i:i+size])
+            lodf[np.abs(lodf) < self.tol] = 0.
+            blocks.append(csr_matrix(lodf))
+            islanding.append(isl)
+        if not blocks:
+            return csr_matrix((self.num_branches,0)),np.zeros(0,dtype=bool)
+        return hstack(blocks,format='csr'),np.hstack(islanding)
+
+    def get_lodf_block(self,outages):
+        """
+        Gets dense line outage distribution factors of outages.
+
+        Parameters
+        ----------
+        outages : array
+                  Indices of outaged branches
+
+        Returns
+        -------
+        lodf : 2-D array
+        islanding : array
+        """
+
+        cols = np.arange(outages.size)
+
+        D = self.get_transfer_factors(outages)
+        den = 1.-D[outages,cols]
+        out = self.outage[outages]
+        islanding = (np.abs(den) < self.tol) & (~out)
+        den[islanding | out] = 1.
+        lodf = D/den
+        lodf[outages,cols] = -1.
+        lodf[:,out] = 0.
+        lodf[:,islanding] = np.nan
+
+        return lodf,islanding
@@ -0,0 +1,182 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from scipy.sparse import coo_matrix
+from .krylov import new_linsolver
+
+class FactorCache:
+
+    def __init__(self,max_entries=10,max_memory=5e8):
+        """
+        Cache of symbolic analyses and numeric factorizations
+        of sparse matrices, with least-recently-used eviction.
+
+        Entries are keyed by a hash of the sparsity pattern of the
+        matrix, which for power flow matrices depends only on the
+        network topology and variable flags. Each entry keeps the
+        linear solver together with a hash of the matrix values, which
+        depend on branch parameters. A matrix with a cached pattern
+        reuses the symbolic analysis, and a matrix with cached pattern
+        and values reuses the numeric factorization as well.
+
+        Parameters
+        ----------
+        max_entries : int
+                      Maximum number of cached matrices
+        max_memory : float
+                     Maximum estimated memory of cached factors in bytes
+        """
+
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self.entries = OrderedDict()
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_factorizations = 0
+
+    def clear(self):
+        """
+        Removes all cache entries.
+        """
+
+        self.entries = OrderedDict()
+
+    def get_memory(self):
+        """
+        Gets estimated memory of cached factors.
+
+        Returns
+        -------
+        memory : float
+                 Bytes
+        """
+
+        return float(sum([e['memory'] for e in list(self.entries.values())]))
+
+    def get_linsolver(self,A,solver_name,prop='unsymmetric',factorize=True,params=None):
+        """
+        Gets linear solver analyzed and factorized for the given matrix.
+
+        Parameters
+        ----------
+        A : sparse matrix
+        solver_name : string
+        prop : string
+        factorize : {``True``, ``False``}
+                    Flag for factorizing the matrix after the analysis
+        params : dict
+                 Parameters of Krylov linear solvers
+
+        Returns
+        -------
+        linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+        """
+
+        A = coo_matrix(A)
+        pattern_key = self.get_pattern_key(A,solver_name,prop)
+        values_key = self.get_values_key(A)
+
+        entry = self.entries.pop(pattern_key,None)
+        if entry is None:
+            self.num_misses += 1
+            linsolver = new_linsolver(solver_name,prop,params)
+            linsolver.analyze(A)
+            entry = {'linsolver': linsolver,
+                     'values': None,
+                     'memory': 0.}
+        else:
+            self.num_hits += 1
+
+        if factorize and entry['values'] != values_key:
+            self.num_factorizations += 1
+            entry['linsolver'].factorize(A)
+            entry['values'] = values_key
+        entry['memory'] = self.get_factor_memory(entry['linsolver'],A)
+
+        self.entries[pattern_key] = entry # most recently used
+        self.evict()
+
+        return entry['linsolver']
+
+    def evict(self):
+        """
+        Removes least recently used entries until the
+        number of entries and memory limits are satisfied.
+        """
+
+        while (len(self.entries) > 1 and
+               (len(self.entries) > self.max_entries or
+                self.get_memory() > self.max_memory)):
+            self.entries.popitem(last=False)
+        if len(self.entries) > self.max_entries:
+            self.clear()
+
+    def get_pattern_key(self,A,solver_name,prop):
+        """
+        Gets hash of sparsity pattern of matrix.
+
+        Parameters
+        ----------
+        A : coo_matrix
+        solver_name : string
+        prop : string
+
+        Returns
+        -------
+        key : string
+        """
+
+        h = hashlib.sha1()
+        h.update(('%s %s %d %d' %(solver_name,prop,A.shape[0],A.shape[1])).encode())
+        h.update(np.ascontiguousarray(A.row,dtype=np.int64).tobytes())
+        h.update(np.ascontiguousarray(A.col,dtype=np.int64).tobytes())
+        return h.hexdigest()
+
+    def get_values_key(self,A):
+        """
+        Gets hash of values of matrix.
+
+        Parameters
+        ----------
+        A : coo_matrix
+
+        Returns
+        -------
+        key : string
+        """
+
+        h = hashlib.sha1()
+        h.update(np.ascontiguousarray(A.data,dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    def get_factor_memory(self,linsolver,A):
+        """
+        Gets estimated memory of factors stored by linear solver.
+
+        Parameters
+        ----------
+        linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+        A : coo_matrix
+
+        Returns
+        -------
+        memory : float
+                 Bytes
+        """
+
+        if hasattr(linsolver,'get_memory'):
+            return linsolver.get_memory()
+        lu = getattr(linsolver,'lu',None)
+        try:
+            nnz = lu.L.nnz+lu.U.nnz
+        except AttributeError:
+            nnz = 10*A.nnz # fill-in estimate
+        return 12.*nnz # value and index
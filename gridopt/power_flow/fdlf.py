@@ -0,0 +1,432 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+from __future__ import print_function
+import numpy as np
+from scipy.sparse import coo_matrix
+from .method_error import *
+from .dc_utils import get_period_values, solve_multiple
+from .krylov import new_linsolver
+
+class FDLF:
+    """
+    Fast decoupled load flow solver.
+    """
+
+    parameters = {'variant': 'XB',       # variant (XB, BX)
+                  'feastol': 1e-4,       # tolerance for power mismatches
+                  'maxiter': 50,         # max number of iterations
+                  'linsolver': 'default',# OPTALG linear solver or Krylov method (gmres, bicgstab)
+                  'pvpq': True,          # flag for PV-PQ switching
+                  'quiet': False}        # flag for omitting output
+
+    def __init__(self):
+        """
+        Fast decoupled load flow solver.
+
+        The solver operates on the problem constructed by
+        :class:`ACPF <gridopt.power_flow.ac_pf.ACPF>` for the NR solver.
+        Voltage angles of buses that are not slack are updated using the
+        constant matrix B', and voltage magnitudes of buses not regulated
+        by generators are updated using the constant matrix B''. Both
+        matrices are factorized once per solve, and B'' is refactorized
+        only for time periods whose buses switch between PV and PQ.
+        Slack generators absorb active power mismatches and regulating
+        generators absorb reactive power mismatches within their limits.
+        Tap ratios and shunt susceptances are kept fixed, and generators
+        must regulate the voltage magnitudes of their own buses.
+        """
+
+        self.parameters = FDLF.parameters.copy()
+        self.linsolver_parameters = None
+        self.terminations = []
+        self.info_printer = None
+        self.network = None
+        self.x = None
+        self.k = 0
+        self.mismatch = 0.
+        self.status = 'unknown'
+        self.error_msg = ''
+        self.num_factorizations = 0
+
+    def set_parameters(self,params):
+        """
+        Sets solver parameters.
+
+        Parameters
+        ----------
+        params : dict
+        """
+
+        for key,value in list(params.items()):
+            if key in self.parameters:
+                self.parameters[key] = value
+
+    def set_info_printer(self,info_printer):
+        """
+        Sets function for printing information at each iteration.
+
+        Parameters
+        ----------
+        info_printer : function
+                       Function of solver and header flag
+        """
+
+        self.info_printer = info_printer
+
+    def add_termination(self,termination):
+        """
+        Adds termination condition.
+
+        Parameters
+        ----------
+        termination : :class:`OptTermination <optalg.opt_solver.opt_solver.OptTermination>`
+        """
+
+        self.terminations.append(termination)
+
+    def get_status(self):
+
+        return self.status
+
+    def get_error_msg(self):
+
+        return self.error_msg
+
+    def get_iterations(self):
+
+        return self.k
+
+    def get_primal_variables(self):
+
+        return self.x
+
+    def get_dual_variables(self):
+
+        return 4*[None]
+
+    def solve(self,problem):
+        """
+        Solves power flow problem.
+
+        Parameters
+        ----------
+        problem : |Problem|
+        """
+
+        from optalg.opt_solver import OptSolverError
+
+        # Parameters
+        params = self.parameters
+        feastol = params['feastol']
+        maxiter = params['maxiter']
+
+        # Local variables
+        net = problem.network
+        T = net.num_periods
+        self.network = net
+        self.x = problem.x.copy()
+        self.k = 0
+        self.status = 'error'
+        self.error_msg = ''
+        self.num_factorizations = 0
+
+        # Data
+        data = self.get_data(net)
+        Bp,Bpp = self.get_matrices(net,data)
+        buses = data['buses']
+        pv = data['pv'].copy()
+        x = self.x
+
+        # Initial point
+        for i,bus in enumerate(buses):
+            if data['regulated'][i]:
+                x[data['v_mag'][i,:]] = get_period_values(bus.v_set,T)
+
+        # Factorizations
+        linsolver_p = self.get_linsolver(Bp)
+        linsolvers_q = {}
+
+        # Info printer
+        if self.info_printer is not None and not params['quiet']:
+            self.info_printer(self,True)
+
+        while True:
+
+            # Mismatches
+            P,Q = self.get_mismatches(x,data,pv)
+            v = x[data['v_mag']]
+            self.mismatch = np.max(np.abs(np.hstack((P.ravel(),Q.ravel(),0.))))
+
+            # Info printer
+            if self.info_printer is not None and not params['quiet']:
+                self.info_printer(self,False)
+
+            # Terminations
+            for termination in self.terminations:
+                if termination.func(self):
+                    self.error_msg = termination.msg
+                    raise OptSolverError(None,termination.msg)
+
+            # Converged
+            if self.mismatch < feastol:
+                self.status = 'solved'
+                break
+
+            # Max iterations
+            if self.k >= maxiter:
+                self.error_msg = 'maximum number of iterations'
+                raise OptSolverError(None,self.error_msg)
+
+            # P-theta
+            x[data['v_ang']] += solve_multiple(linsolver_p,P/v)
+
+            # Q-V
+            P,Q = self.get_mismatches(x,data,pv)
+            for t in range(T):
+                pq = np.where(~pv[:,t])[0]
+                if pq.size == 0:
+                    continue
+                key = pq.tobytes()
+                if key not in linsolvers_q:
+                    linsolvers_q[key] = self.get_linsolver(Bpp[pq,:][:,pq])
+                x[data['v_mag'][pq,t]] += linsolvers_q[key].solve(Q[pq,t]/x[data['v_mag'][pq,t]])
+
+            # PV-PQ switching
+            if params['pvpq']:
+                self.apply_pvpq_switching(x,data,pv)
+
+            self.k += 1
+
+        # Network
+        net.set_var_values(x)
+
+    def get_linsolver(self,B):
+        """
+        Gets linear solver analyzed and factorized for the given matrix.
+
+        Parameters
+        ----------
+        B : sparse matrix
+
+        Returns
+        -------
+        linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+        """
+
+        B = coo_matrix(B)
+        linsolver = new_linsolver(self.parameters['linsolver'],'unsymmetric',self.linsolver_parameters)
+        linsolver.analyze(B)
+        linsolver.factorize(B)
+        self.num_factorizations += 1
+        return linsolver
+
+    def get_data(self,net):
+        """
+        Gets indices of variables and regulating devices of buses
+        that are not slack.
+
+        Parameters
+        ----------
+        net : |Network|
+
+        Returns
+        -------
+        data : dict
+        """
+
+        T = net.num_periods
+        buses = [bus for bus in net.buses if not bus.is_slack()]
+        pos = -np.ones(net.num_buses,dtype=int)
+        pos[[bus.index for bus in buses]] = np.arange(len(buses))
+
+        v_mag = np.array([[bus.index_v_mag[t] for t in range(T)] for bus in buses],dtype=int).reshape((len(buses),T))
+        v_ang = np.array([[bus.index_v_ang[t] for t in range(T)] for bus in buses],dtype=int).reshape((len(buses),T))
+        regulated = np.array([bus.is_regulated_by_gen() for bus in buses],dtype=bool)
+        for bus in net.buses:
+            if any([g.bus.index != bus.index for g in bus.reg_gens if not g.is_on_outage()]):
+                raise PFmethodError_SolverError('fdlf does not support remote voltage regulation')
+
+        slack_gens = [gen for gen in net.generators if gen.is_slack() and not gen.is_on_outage()]
+        reg_gens = [gen for gen in net.generators if gen.is_regulator() and not gen.is_on_outage()]
+
+        return {'buses': buses,
+                'pos': pos,
+                'v_mag': v_mag,
+                'v_ang': v_ang,
+                'regulated': regulated,
+                'pv': np.outer(regulated,np.ones(T,dtype=bool)),
+                'slack_gens': slack_gens,
+                'reg_gens': reg_gens}
+
+    def get_matrices(self,net,data):
+        """
+        Gets B' and B'' matrices of buses that are not slack.
+
+        Parameters
+        ----------
+        net : |Network|
+        data : dict
+
+        Returns
+        -------
+        Bp : csr_matrix
+        Bpp : csr_matrix
+        """
+
+        n = len(data['buses'])
+        pos = data['pos']
+        rows = {'p': [], 'pp': []}
+        cols = {'p': [], 'pp': []}
+        vals = {'p': [], 'pp': []}
+
+        def add(key,i,j,val):
+            if i >= 0 and j >= 0:
+                rows[key].append(i)
+                cols[key].append(j)
+                vals[key].append(val)
+
+        for br in net.branches:
+
+            if br.is_on_outage():
+                continue
+
+            k = pos[br.bus_k.index]
+            m = pos[br.bus_m.index]
+            a = get_period_values(br.ratio,net.num_periods)[0]
+
+            # Susceptances
+            y2 = br.g**2.+br.b**2.
+            bx = -y2/br.b if br.b != 0. else 0. # 1/x
+            if self.parameters['variant'] == 'XB':
+                bp,bpp = bx,-br.b
+            elif self.parameters['variant'] == 'BX':
+                bp,bpp = -br.b,bx
+            else:
+                raise PFmethodError_BadParams(['variant'])
+
+            # B'
+            add('p',k,k,bp)
+            add('p',m,m,bp)
+            add('p',k,m,-bp)
+            add('p',m,k,-bp)
+
+            # B''
+            add('pp',k,k,a*a*bpp-br.b_k)
+            add('pp',m,m,bpp-br.b_m)
+            add('pp',k,m,-a*bpp)
+            add('pp',m,k,-a*bpp)
+
+        for shunt in net.shunts:
+            add('pp',pos[shunt.bus.index],pos[shunt.bus.index],
+                -get_period_values(shunt.b,net.num_periods)[0])
+
+        Bp = coo_matrix((vals['p'],(rows['p'],cols['p'])),shape=(n,n)).tocsr()
+        Bpp = coo_matrix((vals['pp'],(rows['pp'],cols['pp'])),shape=(n,n)).tocsr()
+
+        return Bp,Bpp
+
+    def get_mismatches(self,x,data,pv):
+        """
+        Gets power mismatches of buses that are not slack after
+        updating the powers of slack and regulating generators.
+
+        Parameters
+        ----------
+        x : array
+        data : dict
+        pv : 2-D array
+             Flags of buses whose voltage magnitudes are regulated
+             (buses x time periods)
+
+        Returns
+        -------
+        P : 2-D array
+            Active power mismatches (buses x time periods)
+        Q : 2-D array
+            Reactive power mismatches, zero at regulated buses
+        """
+
+        net = self.network
+        T = net.num_periods
+        net.set_var_values(x)
+        net.update_properties()
+
+        # Slack generators
+        for gen in data['slack_gens']:
+            dP = get_period_values(gen.bus.P_mismatch,T)/len([g for g in data['slack_gens'] if g.bus.index == gen.bus.index])
+            for t in range(T):
+                x[gen.index_P[t]] -= dP[t]
+
+        # Regulating generators
+        for i,bus in enumerate(data['buses']):
+            if data['regulated'][i] and np.any(pv[i,:]):
+                gens = [g for g in bus.reg_gens if not g.is_on_outage()]
+                dQ = get_period_values(bus.Q_mismatch,T)/len(gens)
+                for gen in gens:
+                    for t in np.where(pv[i,:])[0]:
+                        x[gen.index_Q[t]] -= dQ[t]
+        for bus in net.buses:
+            if bus.is_slack():
+                gens = [g for g in bus.reg_gens if not g.is_on_outage()]
+                dQ = get_period_values(bus.Q_mismatch,T)/max(len(gens),1)
+                for gen in gens:
+                    for t in range(T):
+                        x[gen.index_Q[t]] -= dQ[t]
+
+        net.set_var_values(x)
+        net.update_properties()
+
+        P = np.array([get_period_values(bus.P_mismatch,T) for bus in data['buses']]).reshape((len(data['buses']),T))
+        Q = np.array([get_period_values(bus.Q_mismatch,T) for bus in data['buses']]).reshape((len(data['buses']),T))
+        Q[pv] = 0.
+
+        return P,Q
+
+    def apply_pvpq_switching(self,x,data,pv):
+        """
+        Switches regulated buses whose generators violate reactive power
+        limits to PQ, and switched buses whose voltage magnitudes move
+        back towards their set points to PV.
+
+        Parameters
+        ----------
+        x : array
+        data : dict
+        pv : 2-D array
+        """
+
+        T = self.network.num_periods
+
+        for i,bus in enumerate(data['buses']):
+
+            if not data['regulated'][i]:
+                continue
+
+            gens = [g for g in bus.reg_gens if not g.is_on_outage()]
+            Qmax = sum([g.Q_max for g in gens])
+            Qmin = sum([g.Q_min for g in gens])
+            v_set = get_period_values(bus.v_set,T)
+
+            for t in range(T):
+
+                Q = sum([x[g.index_Q[t]] for g in gens])
+                v = x[data['v_mag'][i,t]]
+
+                # PV to PQ
+                if pv[i,t] and (Q > Qmax or Q < Qmin):
+                    pv[i,t] = False
+                    for g in gens:
+                        x[g.index_Q[t]] = g.Q_max if Q > Qmax else g.Q_min
+
+                # PQ to PV
+                elif not pv[i,t]:
+                    at_max = np.abs(Q-Qmax) <= np.abs(Q-Qmin)
+                    if (at_max and v > v_set[t]) or (not at_max and v < v_set[t]):
+                        pv[i,t] = True
+                        x[data['v_mag'][i,t]] = v_set[t]
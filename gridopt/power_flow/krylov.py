@@ -0,0 +1,322 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix, identity, tril, triu
+from scipy.sparse.linalg import LinearOperator, gmres, bicgstab, spilu, splu
+from .method_error import *
+
+# Names of Krylov linear solvers
+KRYLOV_SOLVERS = ['gmres','bicgstab']
+
+class KrylovLinSolver:
+    """
+    Iterative Krylov linear solver.
+    """
+
+    parameters = {'krylov_tol': 1e-10,      # relative residual tolerance
+                  'krylov_maxiter': 500,    # max number of Krylov iterations per solve
+                  'krylov_restart': 50,     # GMRES restart length
+                  'precond': 'ilu',         # preconditioner (ilu, block_jacobi, none)
+                  'ilu_drop_tol': 1e-4,     # ILU drop tolerance
+                  'ilu_fill_factor': 10.,   # ILU max fill ratio
+                  'block_size': 500,        # block size of block Jacobi preconditioner
+                  'precond_refresh': 30}    # Krylov iterations that trigger preconditioner rebuild
+
+    def __init__(self,method='gmres',params=None,prop='unsymmetric'):
+        """
+        Iterative Krylov linear solver with the interface of OPTALG
+        linear solvers. The preconditioner is built from the first
+        factorized matrix and kept for later matrices with the same
+        sparsity pattern. It is rebuilt when a solve needs more than
+        precond_refresh iterations or does not converge. Symmetric
+        matrices are given by their lower triangles, as in OPTALG.
+
+        Parameters
+        ----------
+        method : string
+                 Krylov method ``{'gmres','bicgstab'}``
+        params : dict
+                 Parameters (see :attr:`parameters`)
+        prop : string
+               Linear system property ``{'symmetric','unsymmetric'}``
+        """
+
+        if method not in KRYLOV_SOLVERS:
+            raise PFmethodError_BadParams(['linsolver'])
+
+        self.method = method
+        self.prop = prop
+        self.parameters = KrylovLinSolver.parameters.copy()
+        if params:
+            self.set_parameters(params)
+        self.A = None
+        self.M = None
+        self.pattern = None
+        self.stale = False
+        self.num_iterations = 0
+        self.num_solves = 0
+        self.num_preconditioners = 0
+
+    def set_parameters(self,params):
+        """
+        Sets solver parameters.
+
+        Parameters
+        ----------
+        params : dict
+        """
+
+        for key,value in list(params.items()):
+            if key in self.parameters:
+                self.parameters[key] = value
+
+    def is_analyzed(self):
+
+        return self.pattern is not None
+
+    def analyze(self,A):
+
+        A = self.get_matrix(A)
+        self.pattern = (A.shape,A.nnz)
+        self.M = None
+
+    def factorize(self,A):
+
+        A = self.get_matrix(A)
+        if self.pattern != (A.shape,A.nnz):
+            self.analyze(A)
+        self.A = A
+        if self.M is None or self.stale:
+            self.M = self.get_preconditioner(A)
+            self.stale = False
+
+    def factorize_and_solve(self,A,b):
+
+        self.factorize(A)
+        return self.solve(b)
+
+    def get_matrix(self,A):
+        """
+        Gets full matrix of linear system.
+
+        Parameters
+        ----------
+        A : sparse matrix
+            Lower triangle if symmetric
+
+        Returns
+        -------
+        A : csr_matrix
+        """
+
+        if self.prop == 'symmetric':
+            L = tril(A)
+            A = L+triu(L.T,1)
+        A = csr_matrix(A)
+        A.sum_duplicates()
+        return A
+
+    def solve(self,b):
+
+        b = np.asarray(b,dtype=float)
+
+        # Multiple
+        if b.ndim == 2:
+            return np.hstack([self.solve(b[:,j]).reshape((-1,1)) for j in range(b.shape[1])])
+
+        # Single
+        x,info,k = self.run(b)
+        if info != 0:
+            self.M = self.get_preconditioner(self.A)
+            x,info,k = self.run(b,x)
+            if info != 0:
+                raise PFmethodError_SolverError('%s did not converge' %self.method)
+        self.stale = k > self.parameters['precond_refresh']
+
+        return x
+
+    def run(self,b,x0=None):
+        """
+        Runs Krylov method with current matrix and preconditioner.
+
+        Parameters
+        ----------
+        b : array
+        x0 : array
+
+        Returns
+        -------
+        x : array
+        info : int
+               Zero if converged
+        k : int
+            Number of iterations
+        """
+
+        params = self.parameters
+        counter = {'k': 0}
+
+        def callback(r):
+            counter['k'] += 1
+
+        M = self.M
+        if M is not None:
+            M = LinearOperator(self.A.shape,matvec=M,dtype=float)
+
+        kwargs = {'x0': x0,
+                  'M': M,
+                  'maxiter': params['krylov_maxiter'],
+                  'callback': callback}
+        if self.method == 'gmres':
+            kwargs['restart'] = params['krylov_restart']
+            kwargs['callback_type'] = 'pr_norm'
+            method = gmres
+        else:
+            method = bicgstab
+        try:
+            x,info = method(self.A,b,rtol=params['krylov_tol'],atol=0.,**kwargs)
+        except TypeError: # scipy < 1.12
+            x,info = method(self.A,b,tol=params['krylov_tol'],atol=0.,**kwargs)
+
+        self.num_solves += 1
+        self.num_iterations += counter['k']
+
+        return x,info,counter['k']
+
+    def get_preconditioner(self,A):
+        """
+        Gets function that applies the inverse of the preconditioner.
+
+        Parameters
+        ----------
+        A : sparse matrix
+
+        Returns
+        -------
+        M : function
+            Function of vector, or ``None`` if there is no preconditioner
+        """
+
+        params = self.parameters
+        precond = params['precond']
+        n = A.shape[0]
+        A = csc_matrix(A)
+
+        # None
+        if precond == 'none':
+            return None
+
+        self.num_preconditioners += 1
+
+        # ILU
+        if precond == 'ilu':
+            try:
+                ilu = spilu(A,drop_tol=params['ilu_drop_tol'],fill_factor=params['ilu_fill_factor'])
+            except RuntimeError: # singular
+                ilu = spilu(A+1e-8*identity(n,format='csc'),
+                            drop_tol=params['ilu_drop_tol'],fill_factor=params['ilu_fill_factor'])
+            self.memory = 12.*(ilu.L.nnz+ilu.U.nnz)
+            return ilu.solve
+
+        # Block Jacobi
+        elif precond == 'block_jacobi':
+            size = max(int(params['block_size']),1)
+            blocks = []
+            for i in range(0,n,size):
+                j = min(i+size,n)
+                Ab = A[i:j,i:j]
+                try:
+                    blocks.append((i,j,splu(Ab)))
+                except RuntimeError: # singular
+                    blocks.append((i,j,splu(Ab+1e-8*identity(j-i,format='csc'))))
+            self.memory = 12.*sum([lu.L.nnz+lu.U.nnz for i,j,lu in blocks])
+            def M(r):
+                z = np.zeros(n)
+                for i,j,lu in blocks:
+                    z[i:j] = lu.solve(r[i:j])
+                return z
+            return M
+
+        # Invalid
+        else:
+            raise PFmethodError_BadParams(['precond'])
+
+    def get_memory(self):
+        """
+        Gets estimated memory of matrix and preconditioner.
+
+        Returns
+        -------
+        memory : float
+                 Bytes
+        """
+
+        memory = getattr(self,'memory',0.) if self.M is not None else 0.
+        if self.A is not None:
+            memory += 12.*self.A.nnz
+        return memory
+
+def new_linsolver(name,prop,params=None):
+    """
+    Creates linear solver.
+
+    Parameters
+    ----------
+    name : string
+           Name of OPTALG linear solver or of Krylov
+           method ``{'gmres','bicgstab'}``
+    prop : string
+           Linear system property ``{'symmetric','unsymmetric'}``
+    params : dict
+             Parameters of Krylov linear solver
+
+    Returns
+    -------
+    linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+    """
+
+    if name in KRYLOV_SOLVERS:
+        return KrylovLinSolver(name,params,prop)
+
+    from optalg.lin_solver import new_linsolver
+
+    return new_linsolver(name,prop)
+
+def install_linsolvers(solver,name,params=None):
+    """
+    Makes an OPTALG solver use Krylov linear solvers. OPTALG solvers
+    create their linear solvers at the start of each solve, right before
+    resetting their data. Hence, the reset method of the given solver is
+    wrapped to replace these linear solvers, before they are analyzed or
+    factorized, with Krylov linear solvers of the same property. The
+    linear solver parameter of the solver is set to ``'superlu'``, whose
+    linear solvers have no setup cost.
+
+    Parameters
+    ----------
+    solver : :class:`OptSolver <optalg.opt_solver.opt_solver.OptSolver>`
+    name : string
+           Krylov method ``{'gmres','bicgstab'}``
+    params : dict
+             Parameters of Krylov linear solvers
+    """
+
+    from optalg.lin_solver.lin_solver import LinSolver
+
+    reset = solver.reset
+
+    def krylov_reset():
+        reset()
+        for attr in ['linsolver','linsolver1','linsolver2']:
+            linsolver = getattr(solver,attr,None)
+            if isinstance(linsolver,LinSolver):
+                setattr(solver,attr,KrylovLinSolver(name,params,linsolver.prop))
+
+    solver.set_parameters({'linsolver': 'superlu'}) # replaced on reset
+    solver.reset = krylov_reset
@@ -45,6 +45,14 @@ class PFmethodError_ShuntVReg(PFmethodError):
         def __init__(self, msg):
             PFmethodError.__init__(self, 'error in shunt voltage regulation: %s' %msg)
 
+class PFmethodError_BadInjections(PFmethodError):
+    def __init__(self):
+        PFmethodError.__init__(self, 'invalid bus injections')
+
+class PFmethodError_BadWarmStart(PFmethodError):
+    def __init__(self):
+        PFmethodError.__init__(self, 'invalid warm start')
+
 class PFmethodError_SolverError(PFmethodError):
     def __init__(self, msg):
         PFmethodError.__init__(self, msg)
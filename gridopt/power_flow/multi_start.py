@@ -0,0 +1,108 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+from .method_error import *
+from .ac_init import apply_init, get_voltages, set_voltages
+from .ac_periods import parse_json_data, get_solution
+
+# Initial voltage modes of the first starting points
+START_INITS = ['network','dc','flat']
+
+def get_starts(num_starts,perturbation,seed):
+    """
+    Gets starting points for multi-start methods. The first ones use
+    the initial voltage modes in :data:`START_INITS`, and the rest are
+    random perturbations of the voltages of the network.
+
+    Parameters
+    ----------
+    num_starts : int
+    perturbation : float
+                   Standard deviation of perturbations of voltage
+                   magnitudes (p.u.) and angles (radians)
+    seed : int
+           Seed of random perturbations
+
+    Returns
+    -------
+    starts : list
+             Tuples of start index, initial voltage mode,
+             perturbation and seed (``None`` for no perturbation)
+    """
+
+    starts = []
+    for i in range(num_starts):
+        if i < len(START_INITS):
+            starts.append((i,START_INITS[i],0.,None))
+        else:
+            starts.append((i,'network',perturbation,seed+i))
+    return starts
+
+def perturb_voltages(net,perturbation,seed):
+    """
+    Applies random perturbations to the voltages of buses
+    that are not slack.
+
+    Parameters
+    ----------
+    net : |Network|
+    perturbation : float
+    seed : int
+    """
+
+    v_mag,v_ang = get_voltages(net)
+    rand = np.random.RandomState(seed)
+    slack = np.array([bus.is_slack() for bus in net.buses],dtype=bool)
+    v_mag[~slack,:] *= 1.+perturbation*rand.randn(np.sum(~slack),v_mag.shape[1])
+    v_ang[~slack,:] += perturbation*rand.randn(np.sum(~slack),v_ang.shape[1])
+    set_voltages(net,v_mag,v_ang)
+
+def solve_start(args):
+    """
+    Solves optimal power flow problem from a starting point.
+
+    Parameters
+    ----------
+    args : tuple
+           Method name, method parameters, JSON data of network,
+           and starting point (see :func:`get_starts`)
+
+    Returns
+    -------
+    info : dict
+           Start index and initial voltage mode, solution, generation
+           cost, and solver status, message, iterations and time
+    """
+
+    from . import new_method
+
+    name,params,data,start = args
+    i,init,perturbation,seed = start
+    net = parse_json_data(data)
+    apply_init(net,init)
+    if seed is not None:
+        perturb_voltages(net,perturbation,seed)
+    method = new_method(name)
+    method.set_parameters(params)
+    try:
+        method.solve(net)
+    except PFmethodError:
+        pass
+    results = method.get_results()
+    snapshot = results['network snapshot']
+    if snapshot is None:
+        snapshot = net
+    return {'start': i,
+            'init': init,
+            'solution': get_solution(snapshot),
+            'cost': float(np.sum(snapshot.gen_P_cost)),
+            'status': results['solver status'],
+            'message': results['solver message'],
+            'iterations': results['solver iterations'],
+            'time': results['solver time']}
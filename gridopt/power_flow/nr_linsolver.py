@@ -0,0 +1,291 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import hashlib
+import numpy as np
+from scipy.sparse import coo_matrix
+
+class NRLinSolver:
+
+    def __init__(self,linsolver,solver,reuse=False,max_reuse=5,ratio=0.5,cache=None,name='default',
+                 line_search='none',max_backtracks=10):
+        """
+        Linear solver of Newton-Raphson iterations that can keep the
+        numeric factorization of the Jacobian for several iterations
+        ("dishonest" Newton). The Jacobian is refactorized when its
+        sparsity pattern changes, e.g., due to PV-PQ switching, when it
+        has been used for max_reuse iterations, or when the mismatch
+        reduction stalls, i.e., when the ratio of consecutive mismatch
+        norms exceeds ratio. Without reuse, every iteration factorizes
+        the Jacobian and sparsity patterns are not tracked.
+
+        If a cache is given, symbolic analyses are taken from it, so
+        that repeated solves of networks with the same topology and
+        flags skip the analysis phase. This is only useful for linear
+        solvers with a symbolic analysis phase (see :func:`has_analysis`).
+
+        Newton steps can be scaled by a line search on the norm of the
+        mismatches: ``'iwamoto'`` uses the optimal multiplier of the
+        quadratic approximation of the mismatches along the step,
+        ``'backtracking'`` halves the step until the norm decreases,
+        and ``'auto'`` takes full steps and, only after a full step
+        increases the norm, takes the best of the optimal multiplier
+        and backtracking. The scaled step replaces the line search of
+        the solver (see :meth:`line_search`), so that only one line
+        search is done per iteration.
+
+        Parameters
+        ----------
+        linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+        solver : :class:`OptSolverNR <optalg.opt_solver.nr.OptSolverNR>`
+        reuse : {``True``, ``False``}
+                Flag for reusing factorizations
+        max_reuse : int
+                    Maximum number of iterations per factorization
+        ratio : float
+                Mismatch reduction ratio that triggers refactorization
+        cache : :class:`FactorCache <gridopt.power_flow.factor_cache.FactorCache>`
+        name : string
+               Linear solver name
+        line_search : string
+                      Line search ``{'none','auto','iwamoto','backtracking'}``
+        max_backtracks : int
+                         Maximum number of step halvings
+        """
+
+        self.linsolver = linsolver
+        self.solver = solver
+        self.reuse = reuse
+        self.max_reuse = max_reuse
+        self.ratio = ratio
+        self.cache = cache
+        self.name = name
+        self.line_search = line_search
+        self.max_backtracks = max_backtracks
+        self.step_lengths = []
+        self.analyzed = False
+        self.pattern = None
+        self.mismatch = None
+        self.residual = None
+        self.num_uses = 0
+        self.num_factorizations = 0
+        self.num_reuses = 0
+
+    def is_analyzed(self):
+
+        return self.analyzed
+
+    def analyze(self,A):
+
+        if self.cache is not None:
+            self.linsolver = self.cache.get_linsolver(A,self.name,factorize=False)
+        else:
+            self.linsolver.analyze(A)
+        if self.reuse:
+            self.pattern = self.get_pattern_key(A)
+        self.analyzed = True
+
+    def factorize_and_solve(self,A,b):
+
+        self.factorize(A)
+        return self.solve(b)
+
+    def factorize(self,A):
+
+        # No reuse
+        if not self.reuse:
+            self.linsolver.factorize(A)
+            self.num_factorizations += 1
+            return
+
+        A = coo_matrix(A)
+        pattern = self.get_pattern_key(A)
+        mismatch = norm_inf(self.solver.problem.f)
+
+        # Reuse
+        if (pattern == self.pattern and
+            self.num_factorizations > 0 and
+            self.num_uses < self.max_reuse and
+            (self.mismatch is None or mismatch <= self.ratio*self.mismatch)):
+            self.num_uses += 1
+            self.num_reuses += 1
+            self.mismatch = mismatch
+            return
+
+        # Factorize
+        if pattern != self.pattern:
+            self.analyze(A)
+        self.linsolver.factorize(A)
+        self.num_factorizations += 1
+        self.num_uses = 1
+        self.mismatch = mismatch
+
+    def solve(self,b):
+
+        p = self.linsolver.solve(b)
+
+        # Line search
+        if self.line_search != 'none' and np.ndim(p) == 1:
+            alpha = self.get_step_length(p)
+            self.step_lengths.append(alpha*self.solver.parameters['acc_factor'])
+            p = alpha*p
+
+        return p
+
+    def line_search(self,x,p,F,GradF,func,smax=np.inf,maxiter=40):
+        """
+        Takes full step along step scaled by :meth:`solve`, in place of
+        the line search of the solver. The problem is evaluated at the
+        new point, so that callbacks do not see trial points.
+
+        Parameters
+        ----------
+        x : array
+        p : array
+            Scaled Newton step
+        F : float
+        GradF : array
+        func : function
+
+        Returns
+        -------
+        s : float
+        fdata : object
+        """
+
+        return 1.,func(x+self.solver.parameters['acc_factor']*p)
+
+    def get_residual(self,x):
+        """
+        Gets mismatches and linear constraint violations at a point.
+
+        Parameters
+        ----------
+        x : array
+
+        Returns
+        -------
+        r : array
+        """
+
+        problem = self.solver.problem
+        problem.eval(x)
+        return np.hstack((problem.f,problem.A*x-problem.b))
+
+    def get_step_length(self,p):
+        """
+        Gets length of Newton step.
+
+        Parameters
+        ----------
+        p : array
+            Newton step
+
+        Returns
+        -------
+        alpha : float
+        """
+
+        # Residual (problem is evaluated at x by the solver)
+        problem = self.solver.problem
+        x = self.solver.x
+        r0 = np.hstack((problem.f,problem.A*x-problem.b))
+        n0 = np.dot(r0,r0)
+        previous = self.residual
+        self.residual = n0
+
+        # Full step unless the previous one increased the residual
+        alpha = 1.
+        if self.line_search == 'auto' and (previous is None or n0 <= previous):
+            return alpha
+        r1 = self.get_residual(x+p)
+        decrease = lambda a,r: np.dot(r,r) < (1.-1e-4*a)*n0
+
+        # Optimal multiplier
+        alpha_opt = None
+        if self.line_search in ['iwamoto','auto']:
+            g0,g1,g2 = n0,np.dot(r0,r1),np.dot(r1,r1)
+            F = lambda a: (1.-a)**2.*g0+2.*a**2.*(1.-a)*g1+a**4.*g2
+            roots = np.roots([2.*g2,-3.*g1,g0+2.*g1,-g0]) if g2 > 0. else []
+            roots = [a.real for a in roots if np.abs(a.imag) < 1e-12 and 0. < a.real <= 2.]
+            if roots:
+                alpha_opt = min(roots,key=F)
+            if self.line_search == 'iwamoto' and alpha_opt is not None:
+                alpha = alpha_opt
+
+        # Backtracking
+        if self.line_search in ['backtracking','auto']:
+            for i in range(self.max_backtracks):
+                if decrease(alpha,r1):
+                    break
+                alpha /= 2.
+                r1 = self.get_residual(x+alpha*p)
+
+        # Best of both
+        if self.line_search == 'auto' and alpha_opt is not None:
+            r_opt = self.get_residual(x+alpha_opt*p)
+            if np.dot(r_opt,r_opt) < np.dot(r1,r1):
+                alpha = alpha_opt
+
+        return alpha
+
+    def get_pattern_key(self,A):
+        """
+        Gets hash of sparsity pattern of matrix.
+
+        Parameters
+        ----------
+        A : sparse matrix
+
+        Returns
+        -------
+        key : string
+        """
+
+        A = coo_matrix(A)
+        h = hashlib.sha1()
+        h.update(('%d %d' %A.shape).encode())
+        h.update(np.ascontiguousarray(A.row,dtype=np.int64).tobytes())
+        h.update(np.ascontiguousarray(A.col,dtype=np.int64).tobytes())
+        return h.hexdigest()
+
+def has_analysis(linsolver):
+    """
+    Checks whether a linear solver has a symbolic analysis phase,
+    i.e., whether it overrides the analysis of the base OPTALG linear
+    solver. This is the case of MUMPS, but not of SuperLU and UMFPACK.
+
+    Parameters
+    ----------
+    linsolver : :class:`LinSolver <optalg.lin_solver.lin_solver.LinSolver>`
+
+    Returns
+    -------
+    flag : {``True``, ``False``}
+    """
+
+    from optalg.lin_solver.lin_solver import LinSolver
+
+    func = lambda f: getattr(f,'__func__',f)
+    return (isinstance(linsolver,LinSolver) and
+            func(type(linsolver).analyze) is not func(LinSolver.analyze))
+
+def norm_inf(x):
+    """
+    Gets infinity norm of vector (zero if empty).
+
+    Parameters
+    ----------
+    x : array
+
+    Returns
+    -------
+    norm : float
+    """
+
+    return float(np.max(np.abs(x))) if np.size(x) > 0 else 0.
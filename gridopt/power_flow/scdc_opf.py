@@ -0,0 +1,447 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+from __future__ import print_function
+import time
+import numpy as np
+from collections import OrderedDict
+from scipy.sparse import coo_matrix
+from .method_error import *
+from .dc_opf import DCOPF
+from .dist_factors import DistributionFactors
+from .dc_utils import get_angle_map, get_flow_map
+
+class SCDCOPF(DCOPF):
+    """
+    Security-constrained DC optimal power flow method.
+    """
+
+    name = 'SCDCOPF'
+
+    _parameters = {'thermal_limits': True,
+                   'contingency_outages': None,    # indices of outaged branches (all if None)
+                   'contingency_factor': 1.,       # post-contingency limits as fraction of ratingA
+                   'contingency_margin': 0.02,     # fraction of limit for adding near-binding constraints
+                   'contingency_max_rounds': 20,   # max number of screening rounds
+                   'contingency_block_size': 100,  # number of outages per block of distribution factors
+                   'contingency_max_columns': 2000} # max number of cached distribution factor columns
+
+    def __init__(self):
+
+        # Parent init
+        DCOPF.__init__(self)
+
+        # Parameters
+        self._parameters.update(SCDCOPF._parameters)
+
+    def create_problem(self,net):
+
+        # Parameters
+        params = self._parameters
+        thermal_limits = params['thermal_limits']
+
+        # Set up problem (flow limits are added as needed)
+        params['thermal_limits'] = False
+        try:
+            problem = DCOPF.create_problem(self,net)
+        finally:
+            params['thermal_limits'] = thermal_limits
+
+        # Return
+        return problem
+
+    def get_flow_data(self,net):
+        """
+        Gets data for evaluating base case and post-contingency
+        branch flows of the variables of a network.
+
+        Parameters
+        ----------
+        net : |Network|
+
+        Returns
+        -------
+        data : dict
+               Keys ``'F'`` and ``'f0'`` (base case flows are F*x + f0,
+               ordered by branch index and then by time period),
+               ``'rating'`` (ratingA of monitored branches and ``inf`` of the
+               others), ``'monitored'`` (indices of monitored branches),
+               ``'outages'`` (screened outages), ``'factors'``
+               (:class:`DistributionFactors <gridopt.power_flow.dist_factors.DistributionFactors>`),
+               ``'columns'`` (cached line outage distribution factors, see
+               :meth:`get_lodf_columns`), and ``'islanding'`` (set of outages
+               found to island the network)
+        """
+
+        # Parameters
+        params = self._parameters
+        outages = params['contingency_outages']
+
+        # Flows
+        S,theta0 = get_angle_map(net,net.num_vars)
+        F,f0 = get_flow_map(net)
+
+        # Ratings
+        factors = DistributionFactors(net,self._dcpf)
+        rating = np.array([br.ratingA for br in net.branches],dtype=float)
+        rating = np.where((rating > 0.) & (~factors.outage),rating,np.inf)
+
+        # Outages
+        if outages is None:
+            outages = np.arange(net.num_branches)
+        outages = np.array(outages,dtype=int)
+        outages = outages[~factors.outage[outages]]
+
+        # Return
+        return {'F': (F*S).tocsr(),
+                'f0': F*theta0+f0,
+                'rating': rating,
+                'monitored': np.where(np.isfinite(rating))[0],
+                'outages': outages,
+                'factors': factors,
+                'columns': OrderedDict(),
+                'islanding': set()}
+
+    def get_lodf_columns(self,data,outages):
+        """
+        Gets line outage distribution factors of monitored branches.
+        Factors of outages that are not cached are computed in blocks,
+        and at most contingency_max_columns columns are kept, with the
+        least recently used ones removed first.
+
+        Parameters
+        ----------
+        data : dict
+               Flow data (see :meth:`get_flow_data`)
+        outages : array
+                  Indices of outaged branches
+
+        Returns
+        -------
+        lodf : 2-D array
+               Factors (monitored branches x outages), zero for outages
+               that island the network
+        islanding : array
+                    Flags for islanding outages
+        """
+
+        # Parameters
+        params = self._parameters
+        block_size = params['contingency_block_size']
+        max_columns = params['contingency_max_columns']
+
+        # Data
+        monitored = data['monitored']
+        columns = data['columns']
+
+        # Missing
+        missing = np.array([k for k in outages if k not in columns],dtype=int)
+        for i in range(0,missing.size,block_size):
+            block = missing[i:i+block_size]
+            lodf,isl = data['factors'].get_lodf(block)
+            for j,k in enumerate(block):
+                columns[k] = None if isl[j] else lodf[monitored,j]
+
+        # Factors
+        lodf = np.zeros((monitored.size,len(outages)))
+        islanding = np.zeros(len(outages),dtype=bool)
+        for j,k in enumerate(outages):
+            columns[k] = columns.pop(k) # most recently used
+            if columns[k] is None:
+                islanding[j] = True
+            else:
+                lodf[:,j] = columns[k]
+
+        # Evict
+        while len(columns) > max(max_columns,len(outages)):
+            columns.popitem(last=False)
+
+        # Return
+        return lodf,islanding
+
+    def get_limits(self,data,cons):
+        """
+        Gets base case and post-contingency branch flow limits.
+
+        Parameters
+        ----------
+        data : dict
+               Flow data (see :meth:`get_flow_data`)
+        cons : dict
+               Constraints, with arrays of monitored branches (``'branch'``),
+               outaged branches (``'outage'``, -1 for base case), time periods
+               (``'period'``), and line outage distribution factors (``'lodf'``)
+
+        Returns
+        -------
+        G : csr_matrix
+        l : array
+        u : array
+        """
+
+        # Parameters
+        factor = self._parameters['contingency_factor']
+
+        # Data
+        nbr = data['rating'].size
+        F = data['F']
+        f0 = data['f0']
+        base = cons['outage'] < 0
+        il = cons['branch']+cons['period']*nbr
+        ic = np.where(base,il,cons['outage']+cons['period']*nbr)
+        L = cons['lodf']
+        D = coo_matrix((L,(np.arange(L.size),np.arange(L.size))),shape=(L.size,L.size))
+
+        # Limits
+        G = (F[il,:]+D*F[ic,:]).tocsr()
+        offset = f0[il]+L*f0[ic]
+        limit = np.where(base,1.,factor)*data['rating'][cons['branch']]
+
+        # Return
+        return G,-limit-offset,limit-offset
+
+    def screen_contingencies(self,data,x):
+        """
+        Screens base case and post-contingency branch flows for
+        violations or near-binding limits. Post-contingency flows
+        are obtained from the base case flows with line outage
+        distribution factors of the monitored branches. Outages that
+        island the network are added to the islanding outages of data.
+
+        Parameters
+        ----------
+        data : dict
+               Flow data (see :meth:`get_flow_data`)
+        x : vector
+
+        Returns
+        -------
+        cons : dict
+               Constraints (see :meth:`get_limits`)
+        """
+
+        # Parameters
+        params = self._parameters
+        thermal_limits = params['thermal_limits']
+        factor = params['contingency_factor']
+        margin = params['contingency_margin']
+        block_size = params['contingency_block_size']
+
+        # Data
+        rating = data['rating']
+        monitored = data['monitored']
+        outages = data['outages']
+        limit = (1.-margin)*factor*rating[monitored].reshape((monitored.size,1))
+        nbr = rating.size
+        T = data['f0'].size//max(nbr,1)
+        f = data['F']*x+data['f0']
+        cons = {'branch': [], 'outage': [], 'period': [], 'lodf': []}
+
+        # Base case
+        if thermal_limits:
+            for t in range(T):
+                br = np.where(np.abs(f[t*nbr:(t+1)*nbr]) > (1.-margin)*rating)[0]
+                cons['branch'].append(br)
+                cons['outage'].append(-np.ones(br.size,dtype=int))
+                cons['period'].append(t*np.ones(br.size,dtype=int))
+                cons['lodf'].append(np.zeros(br.size))
+
+        # Contingencies
+        for i in range(0,outages.size,block_size):
+            block = outages[i:i+block_size]
+            lodf,isl = self.get_lodf_columns(data,block)
+            data['islanding'].update(block[isl])
+            block = block[~isl]
+            lodf = lodf[:,~isl]
+            for t in range(T):
+                ft = f[t*nbr:(t+1)*nbr]
+                flows = ft[monitored].reshape((monitored.size,1))+lodf*ft[block]
+                r,j = np.where(np.abs(flows) > limit)
+                cons['branch'].append(monitored[r])
+                cons['outage'].append(block[j])
+                cons['period'].append(t*np.ones(r.size,dtype=int))
+                cons['lodf'].append(lodf[r,j])
+
+        # Return
+        return dict([(key,np.hstack(values+[np.zeros(0,dtype=float if key == 'lodf' else int)]))
+                     for key,values in list(cons.items())])
+
+    def solve_contingency_rounds(self,solver,problem,net):
+        """
+        Solves problem with base case and post-contingency branch flow
+        limits generated as needed. The base case problem is solved first,
+        with all base case flow limits unless ``'lazy_thermal_limits'`` is
+        set. Then, single-branch outages are screened, the constraints
+        that are violated or nearly binding are added, and the problem is
+        solved again from the previous solution. This is repeated until no
+        constraint is added or contingency_max_rounds rounds are done. Line
+        outage distribution factors of monitored branches are cached across
+        rounds (see :meth:`get_lodf_columns`).
+
+        Parameters
+        ----------
+        solver : :class:`OptSolver <optalg.opt_solver.opt_solver.OptSolver>`
+        problem : |Problem|
+                  Problem without branch flow limits
+        net : |Network|
+
+        Returns
+        -------
+        info : dict
+               Keys ``'x'``, ``'duals'`` (with the shapes of those of the given problem),
+               ``'iterations'``, ``'rounds'``, ``'constraints'`` (rows of monitored branch,
+               outaged branch or -1 for base case, and time period), ``'islanding'``, and
+               ``'violations'`` (number of constraints violated by the solution when the
+               maximum number of rounds is reached)
+        """
+
+        # Parameters
+        params = self._parameters
+        thermal_limits = params['thermal_limits']
+        lazy = params['lazy_thermal_limits']
+        max_rounds = params['contingency_max_rounds']
+        if max_rounds < 1:
+            raise PFmethodError_BadParams(['contingency_max_rounds'])
+
+        # Data
+        n = net.num_vars
+        T = net.num_periods
+        data = self.get_flow_data(net)
+        rating = data['rating']
+
+        # Initial constraints
+        br = np.where(np.isfinite(rating))[0] if thermal_limits and not lazy else np.zeros(0,dtype=int)
+        cons = {'branch': np.tile(br,T),
+                'outage': -np.ones(br.size*T,dtype=int),
+                'period': np.repeat(np.arange(T),br.size),
+                'lodf': np.zeros(br.size*T)}
+        keys = set(zip(cons['branch'],cons['outage'],cons['period']))
+
+        # Rounds
+        x = problem.x
+        duals = None
+        iterations = 0
+        violations = 0
+        for k in range(max_rounds):
+            G,l,u = self.get_limits(data,cons)
+            qp = self.create_quad_problem(problem,G,l,u,x,duals)
+            solver.solve(qp)
+            iterations += solver.get_iterations()
+            x = solver.get_primal_variables()[:n]
+            duals = solver.get_dual_variables()
+            if solver.get_status() != 'solved':
+                break
+            new = self.screen_contingencies(data,x)
+            add = np.array([key not in keys for key in zip(new['branch'],new['outage'],new['period'])],
+                           dtype=bool)
+            if not np.any(add):
+                break
+            if k == max_rounds-1:
+                Gn,ln,un = self.get_limits(data,dict([(key,new[key][add]) for key in new]))
+                f = Gn*x
+                tol = 1e-6*(1.+un-ln)
+                violations = int(np.sum((f < ln-tol) | (f > un+tol)))
+                break
+            keys.update(zip(new['branch'][add],new['outage'][add],new['period'][add]))
+            for key in cons:
+                cons[key] = np.hstack((cons[key],new[key][add]))
+
+        # Duals
+        lam,nu,mu,pi = duals
+        Gb = coo_matrix(problem.find_constraint('variable bounds').G)
+        mu_full = np.zeros(Gb.shape[0])
+        pi_full = np.zeros(Gb.shape[0])
+        mu_full[Gb.row] = mu[Gb.col]
+        pi_full[Gb.row] = pi[Gb.col]
+
+        # Return
+        return {'x': x,
+                'duals': [lam[:problem.A.shape[0]],np.zeros(problem.f.size),mu_full,pi_full],
+                'iterations': iterations,
+                'rounds': k+1,
+                'constraints': np.vstack((cons['branch'],cons['outage'],cons['period'])).T,
+                'islanding': np.array(sorted(data['islanding']),dtype=int),
+                'violations': violations}
+
+    def solve(self,net):
+
+        from optalg.opt_solver import OptSolverError
+
+        # Parameters
+        params = self._parameters
+        solver_name = params['solver']
+        if params['formulation'] != 'angle':
+            raise PFmethodError_BadParams(['formulation'])
+        if params['reuse_problem']:
+            raise PFmethodError_BadParams(['reuse_problem'])
+        if self._warm_start is not None:
+            raise PFmethodError_BadWarmStart()
+
+        # Solver
+        solver = self.create_solver()
+
+        # Problem
+        t0 = time.time()
+        net = net.get_copy()
+        problem = self.create_problem(net)
+        problem_time = time.time()-t0
+
+        # Solve
+        update = True
+        info = None
+        t0 = time.time()
+        try:
+            info = self.solve_contingency_rounds(solver,problem,net)
+        except OptSolverError as e:
+            raise PFmethodError_SolverError(e)
+        except Exception as e:
+            update = False
+            raise e
+        finally:
+
+            # Variables
+            if info is not None:
+                x = info['x']
+                duals = info['duals']
+                iterations = info['iterations']
+            else:
+                update = False
+                x = solver.get_primal_variables()
+                x = x[:net.num_vars] if x is not None else None
+                duals = 4*[None]
+                iterations = solver.get_iterations()
+
+            # Update network
+            if update:
+                net.set_var_values(x)
+                net.clear_sensitivities()
+                problem.store_sensitivities(*duals)
+                net.update_properties()
+
+            # Save results
+            self.set_solver_name(solver_name)
+            self.set_solver_status(solver.get_status())
+            self.set_solver_message(solver.get_error_msg())
+            self.set_solver_iterations(iterations)
+            self.set_solver_time(time.time()-t0)
+            self.set_solver_primal_variables(x)
+            self.set_solver_dual_variables(duals)
+            self.set_problem(None) # skip for now
+            self.set_problem_time(problem_time)
+            self.set_network_snapshot(net)
+            for key in ['rounds','constraints']:
+                self.results.pop('contingency %s' %key,None)
+                if info is not None:
+                    self.results['contingency %s' %key] = info[key]
+            self.results.pop('islanding outages',None)
+            if info is not None:
+                self.results['islanding outages'] = info['islanding']
+            if info is not None and info['violations'] > 0:
+                self.set_solver_status('error')
+                self.set_solver_message('%d contingency constraints violated after %d rounds (contingency_max_rounds)'
+                                        %(info['violations'],info['rounds']))
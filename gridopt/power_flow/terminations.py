@@ -0,0 +1,82 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+
+def get_terminations(params,get_network,get_mismatch,fired):
+    """
+    Gets termination conditions for detecting low voltages
+    and divergence of AC methods. Conditions with zero
+    thresholds or iteration counts are omitted.
+
+    Parameters
+    ----------
+    params : dict
+             Method parameters with keys ``'vmin_thresh'``, ``'vmax_thresh'``,
+             ``'growth_iters'``, ``'stag_iters'`` and ``'stag_tol'``
+    get_network : function
+                  Function of solver that returns the network
+    get_mismatch : function
+                   Function of solver that returns the mismatch norm
+    fired : dict
+            Dictionary where the message of the condition that stops
+            the solver is saved with key ``'msg'``
+
+    Returns
+    -------
+    terminations : list
+                   Tuples of function of solver and message
+    """
+
+    growth = []
+    stag = []
+
+    def fire(msg):
+        fired['msg'] = msg
+        return True
+
+    def low_voltage(s):
+        if np.min(get_network(s).bus_v_min) < params['vmin_thresh']:
+            return fire('low voltage')
+        return False
+
+    def high_voltage(s):
+        if np.max(get_network(s).bus_v_max) > params['vmax_thresh']:
+            return fire('high voltage')
+        return False
+
+    def not_finite(s):
+        if not np.all(np.isfinite(s.x)):
+            return fire('not finite')
+        return False
+
+    def divergence(s):
+        growth.append(get_mismatch(s))
+        k = params['growth_iters']
+        h = growth[-k-1:]
+        if len(h) == k+1 and all([h[i+1] > h[i] for i in range(k)]):
+            return fire('divergence')
+        return False
+
+    def stagnation(s):
+        stag.append(get_mismatch(s))
+        k = params['stag_iters']
+        if len(stag) > k and min(stag[-k:]) > (1.-params['stag_tol'])*min(stag[:-k]):
+            return fire('stagnation')
+        return False
+
+    terminations = [(not_finite,'not finite'),
+                    (low_voltage,'low voltage')]
+    if params['vmax_thresh'] > 0:
+        terminations.append((high_voltage,'high voltage'))
+    if params['growth_iters'] > 0:
+        terminations.append((divergence,'divergence'))
+    if params['stag_iters'] > 0:
+        terminations.append((stagnation,'stagnation'))
+
+    return terminations
@@ -0,0 +1,129 @@
+#*****************************************************#
+# This file is part of GRIDOPT.                       #
+#                                                     #
+# Copyright (c) 2015, Tomas Tinoco De Rubira.         #
+#                                                     #
+# GRIDOPT is released under the BSD 2-clause license. #
+#*****************************************************#
+
+import numpy as np
+
+# Component lists, quantities and index attributes of network variables
+VAR_INDICES = [('buses','voltage magnitude','index_v_mag'),
+               ('buses','voltage angle','index_v_ang'),
+               ('generators','active power','index_P'),
+               ('generators','reactive power','index_Q'),
+               ('loads','active power','index_P'),
+               ('var_generators','active power','index_P'),
+               ('branches','tap ratio','index_ratio'),
+               ('branches','phase shift','index_phase'),
+               ('shunts','susceptance','index_b')]
+
+def get_var_indices(net):
+    """
+    Gets indices of network variables for every time period.
+
+    Parameters
+    ----------
+    net : |Network|
+
+    Returns
+    -------
+    keys : list
+           Tuples (component list, component index, quantity)
+    index : 2-D array
+            Variable indices (variables of a period x time periods)
+    """
+
+    T = net.num_periods
+    keys = []
+    index = []
+    for comps,quantity,attr in VAR_INDICES:
+        for c in getattr(net,comps):
+            if c.has_flags('variable',quantity):
+                keys.append((comps,c.index,quantity))
+                index.append([getattr(c,attr)[t] for t in range(T)])
+
+    return keys,np.array(index,dtype=int).reshape((len(keys),T))
+
+def shift_vars(x,index,shift):
+    """
+    Shifts values of variables across time periods. Periods
+    beyond the horizon take the values of the last period.
+
+    Parameters
+    ----------
+    x : array
+    index : 2-D array
+            Variable indices (variables of a period x time periods)
+    shift : int
+            Number of periods
+
+    Returns
+    -------
+    x : array
+    """
+
+    T = index.shape[1]
+    x_new = np.array(x,dtype=float)
+    for t in range(T):
+        x_new[index[:,t]] = x[index[:,min(max(t+shift,0),T-1)]]
+    return x_new
+
+def shift_rows(v,T,shift):
+    """
+    Shifts values associated with constraint rows ordered by
+    component index and then by time period across time periods.
+    Periods beyond the horizon take the values of the last period.
+
+    Parameters
+    ----------
+    v : array
+    T : int
+    shift : int
+            Number of periods
+
+    Returns
+    -------
+    v : array
+    """
+
+    V = np.array(v,dtype=float).reshape((T,-1))
+    tt = np.minimum(np.maximum(np.arange(T)+shift,0),T-1)
+    return V[tt,:].ravel()
+
+def map_vars(x,src,dst,x0):
+    """
+    Maps values of variables of a network onto the variables of
+    another network by component and quantity. Variables without
+    a match, e.g., powers of generators that were on outage, keep
+    their values, and only periods present in both networks are mapped.
+
+    Parameters
+    ----------
+    x : array
+        Values of variables of source network
+    src : tuple
+          Keys and indices of variables of source network (see :func:`get_var_indices`)
+    dst : tuple
+          Keys and indices of variables of destination network
+    x0 : array
+         Values of variables of destination network
+
+    Returns
+    -------
+    x : array
+    """
+
+    keys_src,index_src = src
+    keys_dst,index_dst = dst
+    T = min(index_src.shape[1],index_dst.shape[1])
+    pos = dict([(key,i) for i,key in enumerate(keys_src)])
+    matched = [(i,pos[key]) for i,key in enumerate(keys_dst) if key in pos]
+
+    x_new = np.array(x0,dtype=float)
+    if matched:
+        i = np.array([m[0] for m in matched],dtype=int)
+        j = np.array([m[1] for m in matched],dtype=int)
+        x_new[index_dst[i,:T]] = np.asarray(x,dtype=float)[index_src[j,:T]]
+    return x_new
@@ -108,6 +108,748 @@ class TestPowerFlow(unittest.TestCase):
             self.assertTrue(results['solver name'] in ['mumps','superlu'])
             self.assertTrue(isinstance(results['network snapshot'], pf.Network))
 
+    def test_DCPF_factor_cache(self):
+
+        for case in utils.test_cases:
+
+            method = gopt.power_flow.new_method('DCPF')
+            self.assertTrue(method.get_parameters()['cache_factors'])
+
+            net = pf.Parser(case).parse(case)
+
+            method.solve(net)
+            x1 = method.get_results()['solver primal variables']
+            self.assertEqual(method._cache.num_misses,1)
+            self.assertEqual(method._cache.num_hits,0)
+            self.assertEqual(method._cache.num_factorizations,1)
+
+            # Change injections only
+            for load in net.loads:
+                load.P = load.P*1.1
+            method.solve(net)
+            x2 = method.get_results()['solver primal variables']
+            self.assertEqual(method.get_results()['solver status'],'solved')
+            self.assertEqual(method._cache.num_misses,1)
+            self.assertEqual(method._cache.num_hits,1)
+            self.assertEqual(method._cache.num_factorizations,1)
+            
+            # Compare with no cache
+            method.set_parameters({'cache_factors': False})
+            method.solve(net)
+            x3 = method.get_results()['solver primal variables']
+            self.assertLess(norm(x2-x3,np.inf),1e-10)
+            self.assertGreater(norm(x1-x2,np.inf),0.)
+
+            # Eviction
+            method.set_parameters({'cache_factors': True, 'cache_max_memory': 0.})
+            method.solve(net)
+            self.assertEqual(len(method._cache.entries),1)
+
+    def test_DCPF_direct_assembly(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            method = gopt.power_flow.new_method('DCPF')
+            method.solve(net)
+            results = method.get_results()
+            x1 = results['solver primal variables']
+            net1 = results['network snapshot']
+
+            method.set_parameters({'direct_assembly': True})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['solver status'],'solved')
+            x2 = results['solver primal variables']
+            net2 = results['network snapshot']
+
+            self.assertTupleEqual(x1.shape,x2.shape)
+            self.assertLess(norm(x1-x2,np.inf),1e-8)
+            self.assertLess(np.abs(net1.bus_P_mis-net2.bus_P_mis),1e-8)
+            for bus in net2.buses:
+                self.assertLess(np.abs(bus.v_ang-net1.get_bus(bus.index).v_ang),1e-8)
+
+    def test_DCPF_multiperiod(self):
+
+        T = 3
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+            netMP = pf.Parser(case).parse(case,T)
+            self.assertEqual(netMP.num_periods,T)
+
+            for direct_assembly in [False,True]:
+
+                method = gopt.power_flow.new_method('DCPF')
+                method.set_parameters({'direct_assembly': direct_assembly})
+
+                method.solve(net)
+                self.assertEqual(method.get_results()['solver status'],'solved')
+                snapshot = method.get_results()['network snapshot']
+
+                method.solve(netMP)
+                self.assertEqual(method.get_results()['solver status'],'solved')
+                snapshotMP = method.get_results()['network snapshot']
+                x = method.get_results()['solver primal variables']
+                self.assertTupleEqual(x.shape,(snapshotMP.num_vars,))
+
+                # Identical periods
+                for bus in snapshot.buses:
+                    busMP = snapshotMP.get_bus(bus.index)
+                    for t in range(T):
+                        self.assertLess(np.abs(busMP.v_ang[t]-bus.v_ang),1e-8)
+
+                # Blocks
+                if not direct_assembly:
+                    A = method.create_problem(netMP.get_copy()).A
+                    rows,cols = method.get_period_blocks(snapshotMP,A)
+                    self.assertTupleEqual(rows.shape,(T,A.shape[0]//T))
+                    self.assertTupleEqual(cols.shape,(T,A.shape[0]//T))
+
+    def test_DCPF_batch(self):
+
+        from gridopt.power_flow.dc_utils import get_bus_injections
+
+        for case in utils.test_cases:
+
+            method = gopt.power_flow.new_method('DCPF')
+
+            net = pf.Parser(case).parse(case)
+
+            # Scenarios
+            factors = [1.,0.9,1.05]
+            P = []
+            angles = []
+            flows = []
+            for f in factors:
+                netf = net.get_copy()
+                for load in netf.loads:
+                    load.P = load.P*f
+                method.solve(netf)
+                snapshot = method.get_results()['network snapshot']
+                P.append(get_bus_injections(snapshot))
+                angles.append([bus.v_ang for bus in snapshot.buses])
+                flows.append([0. if br.is_on_outage() else
+                              -br.b*(br.bus_k.v_ang-br.bus_m.v_ang-br.phase)
+                              for br in snapshot.branches])
+            P = np.array(P).T
+            angles = np.array(angles).T
+            flows = np.array(flows).T
+
+            # Batch
+            batch_angles,batch_flows = method.solve_batch(net,P)
+            self.assertTupleEqual(batch_angles.shape,(net.num_buses,len(factors)))
+            self.assertTupleEqual(batch_flows.shape,(net.num_branches,len(factors)))
+            self.assertLess(norm(batch_angles-angles,np.inf),1e-8)
+            self.assertLess(norm(batch_flows-flows,np.inf),1e-8)
+
+            # Bad injections
+            self.assertRaises(gopt.power_flow.method_error.PFmethodError_BadInjections,
+                              method.solve_batch,net,P[1:,:])
+
+    def test_DCPF_distribution_factors(self):
+
+        from gridopt.power_flow.dc_utils import get_bus_injections
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 300:
+                continue
+
+            method = gopt.power_flow.new_method('DCPF')
+            dense = gopt.power_flow.DistributionFactors(net,method)
+            sparse = gopt.power_flow.DistributionFactors(net,method,sparse=True,max_rows=5,block_size=7)
+
+            # PTDF vs batch solves
+            ptdf = dense.get_ptdf()
+            self.assertTupleEqual(ptdf.shape,(net.num_branches,net.num_buses))
+            method.solve(net)
+            p0 = get_bus_injections(method.get_results()['network snapshot'])
+            P = np.tile(p0.reshape((p0.size,1)),(1,net.num_buses+1))
+            P[:,1:] += np.eye(net.num_buses)
+            angles,flows = method.solve_batch(net,P)
+            self.assertLess(norm(flows[:,1:]-flows[:,:1]-ptdf,np.inf),1e-8)
+
+            # Sparse rows
+            branches = [0,net.num_branches-1,net.num_branches//2]
+            ptdf_rows = sparse.get_ptdf(branches)
+            self.assertLessEqual(len(sparse.rows),5)
+            self.assertLess(np.max(np.abs(ptdf_rows.toarray()-ptdf[branches,:])),1e-7)
+            self.assertLess(norm(sparse.get_ptdf_row(0)-ptdf[0,:],np.inf),1e-7)
+
+            # LODF
+            lodf,islanding = dense.get_lodf()
+            self.assertTupleEqual(lodf.shape,(net.num_branches,net.num_branches))
+            for k in range(net.num_branches):
+                if islanding[k]:
+                    self.assertTrue(np.all(np.isnan(lodf[:,k])))
+                else:
+                    self.assertEqual(lodf[k,k],-1.)
+
+            # Sparse LODF blocks
+            lodf_sparse,islanding_sparse = sparse.get_lodf()
+            self.assertTupleEqual(lodf_sparse.shape,lodf.shape)
+            self.assertTrue(np.all(islanding_sparse == islanding))
+            ok = ~islanding
+            self.assertLess(np.max(np.abs(lodf_sparse.toarray()[:,ok]-lodf[:,ok])),1e-7)
+
+            # Private factorization
+            x = dense.linsolver.solve(dense.b)
+            for branch in net.branches:
+                branch.b *= 2.
+            method.solve(net)
+            self.assertLess(norm(dense.linsolver.solve(dense.b)-x,np.inf),1e-10)
+
+    def test_DCPF_contingencies(self):
+
+        from gridopt.power_flow.dc_utils import get_angle_map, get_flow_map
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 300:
+                continue
+
+            method = gopt.power_flow.new_method('DCPF')
+            method.set_parameters({'contingency_block_size': 7})
+            results = method.solve_contingencies(net)
+
+            self.assertEqual(method.get_results()['solver status'],'solved')
+            self.assertEqual(method._cache.num_factorizations,1)
+            flows = results['contingency flows']
+            self.assertTupleEqual(flows.shape,(net.num_branches,net.num_branches))
+            for k in results['islanding outages']:
+                self.assertTrue(np.all(np.isnan(flows[:,k])))
+                self.assertTrue(k not in results['contingency overloads'])
+            for k,rows in list(results['contingency overloads'].items()):
+                self.assertEqual(flows[k,k],0.)
+                for i in rows:
+                    branch = net.get_branch(i)
+                    self.assertGreater(branch.ratingA,0.)
+                    self.assertGreater(np.abs(flows[i,k]),branch.ratingA)
+
+            # Subset of outages
+            outages = [0,net.num_branches-1]
+            sub = method.solve_contingencies(net,outages)
+            for j,k in enumerate(outages):
+                if k not in results['islanding outages']:
+                    self.assertLess(norm(sub['contingency flows'][:,j]-flows[:,k],np.inf),1e-8)
+
+            # Outaged solves
+            checked = [k for k in range(net.num_branches)
+                       if k not in results['islanding outages']][:5]
+            for k in checked:
+                net_k = net.get_copy()
+                net_k.get_branch(k).outage = True
+                method_k = gopt.power_flow.new_method('DCPF')
+                method_k.solve(net_k)
+                self.assertEqual(method_k.get_results()['solver status'],'solved')
+                snapshot = method_k.get_results()['network snapshot']
+                x = method_k.get_results()['solver primal variables']
+                S,theta0 = get_angle_map(snapshot,snapshot.num_vars)
+                F,f0 = get_flow_map(snapshot)
+                f = F*(S*x+theta0)+f0
+                self.assertLess(norm(f-flows[:,k],np.inf),1e-6*(1.+norm(f,np.inf)))
+
+    def test_DCPF_krylov(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            method = gopt.power_flow.new_method('DCPF')
+            method.solve(net)
+            x1 = method.get_results()['solver primal variables']
+
+            for solver in ['gmres','bicgstab']:
+                for precond in ['ilu','block_jacobi']:
+                    method = gopt.power_flow.new_method('DCPF')
+                    method.set_parameters({'solver': solver,
+                                           'precond': precond})
+                    self.assertEqual(method.get_parameters()['solver_parameters'][solver]['precond'],precond)
+                    method.solve(net)
+                    results = method.get_results()
+                    self.assertEqual(results['solver status'],'solved')
+                    self.assertEqual(results['solver name'],solver)
+                    self.assertLess(norm(results['solver primal variables']-x1,np.inf),1e-6)
+
+    def test_krylov_symmetric(self):
+
+        from scipy.sparse import random, eye, tril
+
+        n = 50
+        R = random(n,n,density=0.1,random_state=0)
+        A = (R+R.T+10.*eye(n)).tocsr()
+        b = np.arange(n,dtype=float)
+
+        for name in ['gmres','bicgstab']:
+
+            # Lower triangle
+            linsolver = gopt.power_flow.krylov.new_linsolver(name,'symmetric')
+            self.assertEqual(linsolver.prop,'symmetric')
+            linsolver.analyze(tril(A))
+            x = linsolver.factorize_and_solve(tril(A),b)
+            self.assertLess(norm(A*x-b,np.inf),1e-8)
+
+            # Full
+            x = linsolver.factorize_and_solve(A,b)
+            self.assertLess(norm(A*x-b,np.inf),1e-8)
+
+    def test_ACPF_regulation_data(self):
+
+        T = 2
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case,T)
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr'})
+            problem = method.create_problem(net)
+            A = problem.find_constraint('variable fixing').A
+            b = problem.find_constraint('variable fixing').b
+            x = problem.x
+
+            for devices in ['tran','shunt']:
+                data = method.get_regulation_data(problem,devices)
+                self.assertEqual(data['v_index'].size,len(data['devices']))
+                self.assertEqual(data['v_max'].size,data['v_index'].size)
+                self.assertTrue(np.all(data['v_max'] >= data['v_min']))
+                for entry in data['devices']:
+                    self.assertGreater(len(entry),0)
+                    for index,i,dmin,dmax in entry:
+                        k = np.where(A.col == index)[0]
+                        self.assertEqual(k.size,1)
+                        self.assertEqual(A.row[k[0]],i)
+                        self.assertLess(np.abs(b[i]-x[index]),1e-8)
+                        self.assertLessEqual(dmin,dmax)
+
+            num_trans = len([bus for bus in net.buses if bus.is_regulated_by_tran() and not bus.is_slack()])
+            self.assertEqual(method.get_regulation_data(problem,'tran')['v_index'].size,num_trans*T)
+
+    def test_ACPF_regulation_sensitivities(self):
+
+        from scipy.sparse import bmat
+        from scipy.sparse.linalg import splu
+
+        T = 2
+        delta = 1e-5
+
+        class LinSolver(object):
+            def __init__(self,M):
+                self.lu = splu(M.tocsc())
+            def solve(self,b):
+                return self.lu.solve(b)
+
+        class Wrapper(object):
+            def __init__(self,p):
+                self.wrapped_problem = p
+
+        class Solver(object):
+            def __init__(self,p,linsolver):
+                self.problem = Wrapper(p)
+                self.linsolver = linsolver
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case,T)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr',
+                                   'lock_taps': False,
+                                   'lock_shunts': False})
+            problem = method.create_problem(net)
+            problem.eval(problem.x)
+            M = bmat([[problem.J],[problem.A]])
+            if M.shape[0] != M.shape[1]:
+                continue
+            try:
+                linsolver = LinSolver(M)
+            except RuntimeError: # singular
+                continue
+            solver = Solver(problem,linsolver)
+            n = M.shape[0]
+
+            for devices in ['tran','shunt']:
+                data = method.get_regulation_data(problem,devices)
+                entries = np.arange(len(data['devices']))
+                offset = problem.f.size+data['offset']
+
+                # Column by column
+                sens = []
+                for j in entries:
+                    s = []
+                    for index,i,dmin,dmax in data['devices'][j]:
+                        b = np.zeros(n)
+                        b[offset+i] = delta
+                        s.append(linsolver.solve(b)[data['v_index'][j]]/delta)
+                    sens.append(np.array(s))
+
+                # Batched
+                for block in [1,3,256]:
+                    method.set_parameters({'reg_block_size': block})
+                    batched = method.get_regulation_sensitivities(solver,data,entries,delta)
+                    self.assertEqual(len(batched),len(sens))
+                    for s1,s2 in zip(batched,sens):
+                        self.assertEqual(s1.size,s2.size)
+                        self.assertLess(norm(s1-s2,np.inf),1e-8*(1.+norm(s2,np.inf)))
+
+                # Subset
+                subset = entries[::2]
+                batched = method.get_regulation_sensitivities(solver,data,subset,delta)
+                for s1,j in zip(batched,subset):
+                    self.assertLess(norm(s1-sens[j],np.inf),1e-8*(1.+norm(sens[j],np.inf)))
+
+    def test_ACPF_fdlf(self):
+
+        T = 2
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case,T)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            # Locked devices
+            method = gopt.power_flow.new_method('ACPF')
+            for lock in [{'lock_taps': False},{'lock_shunts': False}]:
+                method.set_parameters({'solver': 'fdlf', 'quiet': True,
+                                       'lock_taps': True, 'lock_shunts': True})
+                method.set_parameters(lock)
+                self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+
+            # Remote regulation
+            if any([g.bus.index != bus.index for bus in net.buses for g in bus.reg_gens if not g.is_on_outage()]):
+                method = gopt.power_flow.new_method('ACPF')
+                method.set_parameters({'solver': 'fdlf', 'quiet': True})
+                self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+                continue
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr', 'quiet': True})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            net1 = method.results['network snapshot']
+
+            for variant in ['XB','BX']:
+
+                method = gopt.power_flow.new_method('ACPF')
+                method.set_parameters({'solver': 'fdlf',
+                                       'variant': variant,
+                                       'quiet': True})
+                self.assertEqual(method.get_parameters()['solver_parameters']['fdlf']['variant'],variant)
+                method.solve(net)
+                results = method.get_results()
+                self.assertEqual(results['solver name'],'fdlf')
+                self.assertEqual(results['solver status'],'solved')
+                net2 = results['network snapshot']
+                self.assertLess(norm(net2.bus_P_mis,np.inf),1e-2)
+                self.assertLess(norm(net2.bus_Q_mis,np.inf),1e-2)
+                for bus in net2.buses:
+                    self.assertLess(norm(bus.v_mag-net1.get_bus(bus.index).v_mag,np.inf),1e-3)
+
+                # Max iterations (last iterate in network as with NR)
+                method.set_parameters({'maxiter': 1})
+                self.assertRaises(gopt.power_flow.method_error.PFmethodError_SolverError,method.solve,net)
+                results = method.get_results()
+                self.assertEqual(results['solver status'],'error')
+                self.assertEqual(results['solver message'],'maximum number of iterations')
+                snapshot = results['network snapshot']
+                x = results['solver primal variables'][:snapshot.num_vars]
+                self.assertLess(norm(snapshot.get_var_values()-x,np.inf),1e-12)
+
+    def test_ACPF_jacobian_reuse(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr', 'quiet': True})
+            method.solve(net)
+            results1 = method.get_results()
+            self.assertEqual(results1['solver status'],'solved')
+            self.assertLessEqual(results1['solver factorizations'],results1['solver iterations']+1)
+
+            method.set_parameters({'jacobian_reuse': True,
+                                   'reuse_max_iters': 3})
+            method.solve(net)
+            results2 = method.get_results()
+            self.assertEqual(results2['solver status'],'solved')
+            self.assertGreaterEqual(results2['solver factorizations'],1)
+            self.assertLessEqual(results2['solver factorizations'],results2['solver iterations']+1)
+            self.assertLess(norm(results2['network snapshot'].bus_P_mis,np.inf),1e-2)
+            self.assertLess(norm(results2['network snapshot'].bus_Q_mis,np.inf),1e-2)
+
+    def test_ACPF_analysis_cache(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr', 'quiet': True})
+            self.assertTrue(method.get_parameters()['cache_analysis'])
+            cache = method._cache
+
+            method.solve(net)
+            self.assertEqual(method.get_results()['solver status'],'solved')
+
+            # No symbolic analysis (e.g., SuperLU)
+            linsolver = gopt.power_flow.krylov.new_linsolver('default','unsymmetric')
+            if not gopt.power_flow.nr_linsolver.has_analysis(linsolver):
+                self.assertEqual(len(cache.entries),0)
+                continue
+
+            misses = cache.num_misses
+            hits = cache.num_hits
+            self.assertGreaterEqual(misses,1)
+
+            # Same topology
+            method.solve(net)
+            self.assertEqual(method.get_results()['solver status'],'solved')
+            self.assertEqual(cache.num_misses,misses)
+            self.assertGreater(cache.num_hits,hits)
+
+            # Other method
+            other = gopt.power_flow.new_method('ACPF')
+            self.assertEqual(len(other._cache.entries),0)
+
+            # Memory budget
+            method.set_parameters({'cache_max_memory': 0.})
+            method.solve(net)
+            self.assertEqual(len(cache.entries),1)
+
+    def test_ACPF_init(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr', 'quiet': True})
+            method.solve(net)
+            self.assertEqual(method.get_results()['solver status'],'solved')
+            iters = method.get_results()['solver iterations']
+            net1 = method.get_results()['network snapshot']
+
+            for init in ['flat','dc','previous']:
+                method.set_parameters({'init': init})
+                method.solve(net)
+                results = method.get_results()
+                self.assertEqual(results['solver status'],'solved')
+                for bus in results['network snapshot'].buses:
+                    self.assertLess(np.abs(bus.v_mag-net1.get_bus(bus.index).v_mag),1e-3)
+                if init == 'previous':
+                    self.assertLessEqual(results['solver iterations'],iters)
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'init': 'foo'})
+            self.assertRaises(gopt.power_flow.method_error.PFmethodError_BadParams,
+                              method.solve,net)
+
+    def test_ACPF_line_search(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            self.assertEqual(gopt.power_flow.new_method('ACPF').get_parameters()['line_search'],'none')
+
+            for line_search in ['none','auto','iwamoto','backtracking']:
+
+                method = gopt.power_flow.new_method('ACPF')
+                method.set_parameters({'solver': 'nr',
+                                       'line_search': line_search,
+                                       'quiet': True})
+                method.solve(net)
+                results = method.get_results()
+                self.assertEqual(results['solver status'],'solved')
+                steps = results['solver step lengths']
+                if line_search == 'none':
+                    self.assertEqual(steps.size,0)
+                else:
+                    self.assertGreater(steps.size,0)
+                    self.assertTrue(np.all(steps > 0.))
+                    self.assertTrue(np.all(steps <= 2.))
+                self.assertLess(norm(results['network snapshot'].bus_P_mis,np.inf),1e-2)
+
+            method.set_parameters({'line_search': 'foo'})
+            self.assertRaises(gopt.power_flow.method_error.PFmethodError_BadParams,
+                              method.solve,net)
+
+    def test_ACPF_terminations(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            remote = any([g.bus.index != bus.index for bus in net.buses for g in bus.reg_gens if not g.is_on_outage()])
+
+            for solver in ['nr'] if remote else ['nr','fdlf']:
+
+                # Defaults
+                method = gopt.power_flow.new_method('ACPF')
+                method.set_parameters({'solver': solver,
+                                       'quiet': True})
+                method.solve(net)
+                self.assertEqual(method.get_results()['solver status'],'solved')
+
+                self.assertEqual(method.get_parameters()['growth_iters'],0)
+                self.assertEqual(method.get_parameters()['stag_iters'],0)
+
+                # Detectors
+                method.set_parameters({'growth_iters': 5,
+                                       'stag_iters': 10})
+                method.solve(net)
+                self.assertEqual(method.get_results()['solver status'],'solved')
+
+                # High voltage
+                method.set_parameters({'vmax_thresh': 0.5})
+                self.assertRaises(gopt.power_flow.method_error.PFmethodError_SolverError,
+                                  method.solve,net)
+                results = method.get_results()
+                self.assertEqual(results['solver status'],'high voltage')
+
+            # Divergence and stagnation
+            class Solver:
+                pass
+            s = Solver()
+            s.x = np.zeros(3)
+            s.network = net
+            fired = {}
+            params = {'vmin_thresh': 0.,
+                      'vmax_thresh': 0.,
+                      'growth_iters': 2,
+                      'stag_iters': 3,
+                      'stag_tol': 1e-3}
+            terms = gopt.power_flow.terminations.get_terminations(params,
+                                                                  lambda s: s.network,
+                                                                  lambda s: s.mismatch,
+                                                                  fired)
+            self.assertEqual([msg for func,msg in terms],
+                             ['not finite','low voltage','divergence','stagnation'])
+            div = terms[2][0]
+            stag = terms[3][0]
+            for m,d in zip([1.,2.,1.5,1.6,1.7],[False,False,False,False,True]):
+                s.mismatch = m
+                self.assertEqual(div(s),d)
+            self.assertEqual(fired['msg'],'divergence')
+            for m,d in zip([1.,0.5,0.6,0.5,0.7,0.1],[False,False,False,False,True,False]):
+                s.mismatch = m
+                self.assertEqual(stag(s),d)
+            self.assertEqual(fired['msg'],'stagnation')
+            s.x[1] = np.nan
+            self.assertTrue(terms[0][0](s))
+            self.assertEqual(fired['msg'],'not finite')
+
+    def test_ACPF_parallel_periods(self):
+
+        T = 3
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case,T)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            for load in net.loads:
+                load.P = load.P*np.array([0.9,1.,1.1])
+
+            method = gopt.power_flow.new_method('ACPF')
+            method.set_parameters({'solver': 'nr',
+                                   'quiet': True})
+            method.solve(net)
+            net1 = method.get_results()['network snapshot']
+            self.assertFalse('period statuses' in method.get_results())
+
+            for num_procs in [1,2]:
+
+                method = gopt.power_flow.new_method('ACPF')
+                method.set_parameters({'solver': 'nr',
+                                       'parallel_periods': True,
+                                       'num_procs': num_procs,
+                                       'quiet': True})
+                method.solve(net)
+                results = method.get_results()
+                self.assertEqual(results['solver status'],'solved')
+                self.assertEqual(results['period statuses'],T*['solved'])
+                self.assertEqual(results['period iterations'].size,T)
+                net2 = results['network snapshot']
+                self.assertEqual(net2.num_periods,T)
+                self.assertLess(norm(net2.bus_P_mis,np.inf),1e-2)
+                self.assertLess(norm(net2.bus_Q_mis,np.inf),1e-2)
+                for bus in net2.buses:
+                    bus1 = net1.get_bus(bus.index)
+                    self.assertLess(norm(bus.v_mag-bus1.v_mag,np.inf),1e-3)
+                    self.assertLess(norm(bus.v_ang-bus1.v_ang,np.inf),1e-3)
+
+    def test_ACPF_krylov(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            remote = any([g.bus.index != bus.index for bus in net.buses for g in bus.reg_gens if not g.is_on_outage()])
+
+            for solver in ['nr'] if remote else ['nr','fdlf']:
+
+                method = gopt.power_flow.new_method('ACPF')
+                method.set_parameters({'solver': solver,
+                                       'quiet': True})
+                method.solve(net)
+                net1 = method.get_results()['network snapshot']
+
+                method.set_parameters({'linsolver': 'gmres'})
+                self.assertEqual(method.get_parameters()['solver_parameters'][solver]['linsolver'],'gmres')
+                method.solve(net)
+                results = method.get_results()
+                self.assertEqual(results['solver status'],'solved')
+                net2 = results['network snapshot']
+                self.assertLess(norm(net2.bus_P_mis,np.inf),1e-2)
+                for bus in net2.buses:
+                    self.assertLess(np.abs(bus.v_mag-net1.get_bus(bus.index).v_mag),1e-3)
+                    self.assertLess(np.abs(bus.v_ang-net1.get_bus(bus.index).v_ang),1e-3)
+
     def test_ACPF_solutions(self):
 
         print('')
@@ -166,67 +908,347 @@ class TestPowerFlow(unittest.TestCase):
                     self.assertEqual(resultsMP['solver status'],'solved')
                     method.update_network(netMP)
 
-                    self.assertLess(norm(resultsMP['network snapshot'].bus_P_mis-netMP.bus_P_mis,np.inf),1e-10)
-                    self.assertLess(norm(resultsMP['network snapshot'].bus_Q_mis-netMP.bus_Q_mis,np.inf),1e-10)
-                    self.assertLess(norm(resultsMP['network snapshot'].gen_P_cost-netMP.gen_P_cost,np.inf),1e-10)
+                    self.assertLess(norm(resultsMP['network snapshot'].bus_P_mis-netMP.bus_P_mis,np.inf),1e-10)
+                    self.assertLess(norm(resultsMP['network snapshot'].bus_Q_mis-netMP.bus_Q_mis,np.inf),1e-10)
+                    self.assertLess(norm(resultsMP['network snapshot'].gen_P_cost-netMP.gen_P_cost,np.inf),1e-10)
+
+                    print("%s\t%s\t%s\t%d" %(case.split('/')[-1],
+                                             sol_types[sol],
+                                             solver,
+                                             results['solver iterations']))
+
+                    # No sol
+                    if sol_data is None:
+                        continue
+
+                    v_mag_tol = sol_data['v_mag_tol']
+                    v_ang_tol = sol_data['v_ang_tol']
+                    bus_data = sol_data['bus_data']
+
+                    counter = 0
+                    v_mag_error = []
+                    v_ang_error = []
+                    for bus_num,val in list(bus_data.items()):
+                        
+                        v_mag = val['v_mag']
+                        v_ang = val['v_ang']
+                        
+                        try:
+                            busMP = netMP.get_bus_from_number(bus_num)
+                            bus = net.get_bus_from_number(bus_num)
+                        except pf.NetworkError:
+                            continue
+                                                       
+                        for t in range(T):
+                            v_mag_error.append(np.abs(busMP.v_mag[t]-v_mag))
+                            v_ang_error.append(np.abs(busMP.v_ang[t]*180./np.pi-v_ang))
+                        v_mag_error.append(np.abs(bus.v_mag-v_mag))
+                        v_ang_error.append(np.abs(bus.v_ang*180./np.pi-v_ang))
+                       
+                        counter += 1
+
+                    self.assertEqual(len(v_mag_error),len(v_ang_error))
+                    if len(v_mag_error) > 0:
+                        self.assertLessEqual(np.max(v_mag_error),v_mag_tol)
+                        self.assertLessEqual(np.max(v_ang_error),v_ang_tol)
+                    self.assertEqual(len(v_mag_error),counter*(T+1))
+                    self.assertEqual(len(v_ang_error),counter*(T+1))
+
+    def test_ACOPF_solutions(self):
+
+        print('')
+        
+        eps = 0.5 # %
+        
+        method_ipopt = gopt.power_flow.new_method('ACOPF')
+        method_ipopt.set_parameters(params={'solver':'ipopt','quiet': True})
+        method_augl = gopt.power_flow.new_method('ACOPF')
+        method_augl.set_parameters(params={'solver':'augl','quiet': True})
+        method_inlp = gopt.power_flow.new_method('ACOPF')
+        method_inlp.set_parameters(params={'solver':'inlp','quiet': True})
+
+        skipcases = ['aesoSL2014.raw','case3012wp.mat','case9241.mat','case32.art']
+            
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+            
+            self.assertEqual(net.num_periods,1)
+
+            # IPOPT
+            try:
+                net.update_properties()
+                gen_P_cost = net.gen_P_cost
+                method_ipopt.solve(net)
+                has_ipopt = True
+                self.assertEqual(method_ipopt.results['solver status'],'solved')
+                self.assertEqual(net.gen_P_cost,gen_P_cost)
+                self.assertNotEqual(method_ipopt.results['network snapshot'].gen_P_cost,gen_P_cost)
+                self.assertEqual(method_ipopt.results['solver name'], 'ipopt')
+                x1 = method_ipopt.get_results()['solver primal variables']
+                i1 = method_ipopt.get_results()['solver iterations']
+                p1 = method_ipopt.get_results()['network snapshot'].gen_P_cost
+                print("%s\t%s\t%d" %(case.split('/')[-1],'ipopt',i1))
+            except ImportError:
+                has_ipopt = False
+
+            # INLP
+            net.update_properties()
+            gen_P_cost = net.gen_P_cost
+            method_inlp.solve(net)
+            self.assertEqual(method_inlp.results['solver status'],'solved')
+            self.assertEqual(net.gen_P_cost,gen_P_cost)
+            self.assertNotEqual(method_inlp.results['network snapshot'].gen_P_cost,gen_P_cost)
+            self.assertEqual(method_inlp.results['solver name'], 'inlp')
+            x2 = method_inlp.get_results()['solver primal variables']
+            i2 = method_inlp.get_results()['solver iterations']
+            p2 = method_inlp.get_results()['network snapshot'].gen_P_cost
+            print("%s\t%s\t%d" %(case.split('/')[-1],'inlp',i2))
+
+            # AUGL
+            net.update_properties()
+            gen_P_cost = net.gen_P_cost
+            method_augl.solve(net)
+            self.assertEqual(method_augl.results['solver status'],'solved')
+            self.assertEqual(net.gen_P_cost,gen_P_cost)
+            self.assertNotEqual(method_augl.results['network snapshot'].gen_P_cost,gen_P_cost)
+            self.assertEqual(method_augl.results['solver name'], 'augl')
+            x3 = method_augl.get_results()['solver primal variables']
+            i3 = method_augl.get_results()['solver iterations']
+            p3 = method_augl.get_results()['network snapshot'].gen_P_cost
+            print("%s\t%s\t%d" %(case.split('/')[-1],'augl',i3))
+
+            # Checks
+            if has_ipopt:
+                error = 100*(p1-p3)/abs(p3)
+                self.assertLess(np.abs(error),eps)
+                self.assertNotEqual(p1,p3)
+            error = 100*(p2-p3)/abs(p3)
+            self.assertLess(np.abs(error),eps)
+            self.assertNotEqual(p2,p3)
+
+    def test_ACOPF_krylov(self):
+
+        eps = 0.5 # %
+
+        skipcases = ['aesoSL2014.raw','case3012wp.mat','case9241.mat','case32.art']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACOPF')
+            method.set_parameters({'solver': 'augl',
+                                   'quiet': True})
+            method.solve(net)
+            p1 = method.get_results()['network snapshot'].gen_P_cost
+
+            method.set_parameters({'linsolver': 'bicgstab'})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            p2 = method.get_results()['network snapshot'].gen_P_cost
+            self.assertLess(np.abs(100*(p1-p2)/abs(p1)),eps)
+
+    def test_ACOPF_warm_start(self):
+
+        skipcases = ['aesoSL2014.raw','case3012wp.mat','case9241.mat','case32.art']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACOPF')
+            method.set_parameters({'solver': 'augl',
+                                   'quiet': True})
+            method.solve(net)
+            results = copy.copy(method.get_results())
+            self.assertEqual(results['solver status'],'solved')
+            iters = results['solver iterations']
+            cost = results['network snapshot'].gen_P_cost
+
+            # Same problem
+            method.set_warm_start(results=results)
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertLessEqual(method.results['solver iterations'],iters)
+            self.assertLess(np.abs(method.results['network snapshot'].gen_P_cost-cost),
+                            1e-3*(1.+np.abs(cost)))
+
+            # Vectors with same ordering
+            method.set_warm_start(results['solver primal variables'],
+                                  results['solver dual variables'])
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+
+            # Generator outage
+            gens = [gen for gen in net.generators if not gen.is_slack()]
+            if gens:
+                gens[0].outage = True
+                method.set_warm_start(results=results)
+                method.solve(net)
+                self.assertEqual(method.results['solver status'],'solved')
+                self.assertLess(method.results['solver primal variables'].size,
+                                results['solver primal variables'].size)
+                gens[0].outage = False
+
+            # DCOPF and ACPF
+            for name in ['DCOPF','ACPF']:
+                other = gopt.power_flow.new_method(name)
+                other.set_parameters({'quiet': True})
+                other.solve(net)
+                method.set_warm_start(results=other.get_results())
+                method.solve(net)
+                self.assertEqual(method.results['solver status'],'solved')
+
+            # Bad warm start
+            method.set_warm_start(np.zeros(1))
+            self.assertRaises(gopt.power_flow.method_error.PFmethodError_BadWarmStart,
+                              method.solve,net)
+            method.set_warm_start(None)
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+
+    def test_ACOPF_lazy_thermal_limits(self):
+
+        eps = 0.5 # %
+
+        skipcases = ['aesoSL2014.raw','case3012wp.mat','case9241.mat','case32.art']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 3000:
+                continue
+
+            method = gopt.power_flow.new_method('ACOPF')
+            method.set_parameters({'solver': 'augl',
+                                   'quiet': True})
+            method.solve(net)
+            flows = gopt.power_flow.ac_utils.get_branch_flows(method.results['network snapshot'])
+
+            # Tight ratings
+            for br in net.branches:
+                br.ratingA = max(0.9*flows[br.index,0],1e-2) if br.index % 2 == 0 else 0.
+
+            # All limits
+            method.set_parameters({'thermal_limits': True})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertTrue('lazy rounds' not in method.results)
+            cost = method.results['network snapshot'].gen_P_cost
+
+            # Lazy limits
+            method.set_parameters({'lazy_thermal_limits': True})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertGreaterEqual(method.results['lazy rounds'],2)
+            branches = method.results['lazy branches']
+            self.assertGreater(branches.size,0)
+            self.assertTrue(np.all(branches % 2 == 0))
+            snapshot = method.results['network snapshot']
+            self.assertLess(np.abs(100*(snapshot.gen_P_cost-cost)/abs(cost)),eps)
+            flows = gopt.power_flow.ac_utils.get_branch_flows(snapshot)
+            for br in snapshot.branches:
+                self.assertEqual(br.ratingA,net.get_branch(br.index).ratingA)
+                if br.ratingA > 0.:
+                    self.assertLess(flows[br.index,0],br.ratingA*1.01)
+
+            # Max rounds
+            method.set_parameters({'lazy_max_rounds': 1})
+            method.solve(net)
+            self.assertEqual(method.results['lazy rounds'],1)
+            self.assertEqual(method.results['lazy branches'].size,0)
+            self.assertEqual(method.results['solver status'],'error')
+            self.assertTrue('lazy_max_rounds' in method.results['solver message'])
+
+    def test_ACOPF_decompose_periods(self):
+
+        T = 3
+        eps = 0.5 # %
+
+        skipcases = ['aesoSL2014.raw','case3012wp.mat','case9241.mat','case32.art']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case,T)
 
-                    print("%s\t%s\t%s\t%d" %(case.split('/')[-1],
-                                             sol_types[sol],
-                                             solver,
-                                             results['solver iterations']))
+            # Only small
+            if net.num_buses > 3000:
+                continue
 
-                    # No sol
-                    if sol_data is None:
-                        continue
+            for load in net.loads:
+                load.P = load.P*np.array([0.9,1.,1.1])
+            for gen in net.generators:
+                gen.dP_max = 0.
 
-                    v_mag_tol = sol_data['v_mag_tol']
-                    v_ang_tol = sol_data['v_ang_tol']
-                    bus_data = sol_data['bus_data']
+            # Uncoupled
+            method = gopt.power_flow.new_method('ACOPF')
+            method.set_parameters({'solver': 'augl',
+                                   'quiet': True})
+            method.solve(net)
+            cost = np.sum(method.results['network snapshot'].gen_P_cost)
+            P = np.array([gen.P for gen in method.results['network snapshot'].generators])
 
-                    counter = 0
-                    v_mag_error = []
-                    v_ang_error = []
-                    for bus_num,val in list(bus_data.items()):
-                        
-                        v_mag = val['v_mag']
-                        v_ang = val['v_ang']
-                        
-                        try:
-                            busMP = netMP.get_bus_from_number(bus_num)
-                            bus = net.get_bus_from_number(bus_num)
-                        except pf.NetworkError:
-                            continue
-                                                       
-                        for t in range(T):
-                            v_mag_error.append(np.abs(busMP.v_mag[t]-v_mag))
-                            v_ang_error.append(np.abs(busMP.v_ang[t]*180./np.pi-v_ang))
-                        v_mag_error.append(np.abs(bus.v_mag-v_mag))
-                        v_ang_error.append(np.abs(bus.v_ang*180./np.pi-v_ang))
-                       
-                        counter += 1
+            method.set_parameters({'decompose_periods': True,
+                                   'num_procs': 2})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['solver status'],'solved')
+            self.assertEqual(results['admm iterations'],1)
+            self.assertEqual(results['period statuses'],T*['solved'])
+            self.assertLess(np.abs(100*(np.sum(results['network snapshot'].gen_P_cost)-cost)/abs(cost)),eps)
 
-                    self.assertEqual(len(v_mag_error),len(v_ang_error))
-                    if len(v_mag_error) > 0:
-                        self.assertLessEqual(np.max(v_mag_error),v_mag_tol)
-                        self.assertLessEqual(np.max(v_ang_error),v_ang_tol)
-                    self.assertEqual(len(v_mag_error),counter*(T+1))
-                    self.assertEqual(len(v_ang_error),counter*(T+1))
+            # Ramping limits
+            for gen in net.generators:
+                if not gen.is_slack() and np.max(P[gen.index,:])-np.min(P[gen.index,:]) > 1e-2:
+                    gen.dP_max = 0.5*np.max(np.abs(np.diff(P[gen.index,:])))
+            method.set_parameters({'admm_maxiter': 200,
+                                   'admm_tol': 1e-3})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['solver status'],'solved')
+            self.assertGreaterEqual(results['admm iterations'],1)
+            self.assertEqual(results['admm primal residuals'].size,results['admm iterations'])
+            self.assertLess(results['admm primal residuals'][-1],1e-3)
+            for gen in results['network snapshot'].generators:
+                if gen.dP_max > 0.:
+                    self.assertLess(np.max(np.abs(np.diff(gen.P))),gen.dP_max+2e-3)
 
-    def test_ACOPF_solutions(self):
+    def test_ACOPF_multi_start(self):
 
-        print('')
-        
         eps = 0.5 # %
-        
-        method_ipopt = gopt.power_flow.new_method('ACOPF')
-        method_ipopt.set_parameters(params={'solver':'ipopt','quiet': True})
-        method_augl = gopt.power_flow.new_method('ACOPF')
-        method_augl.set_parameters(params={'solver':'augl','quiet': True})
-        method_inlp = gopt.power_flow.new_method('ACOPF')
-        method_inlp.set_parameters(params={'solver':'inlp','quiet': True})
 
         skipcases = ['aesoSL2014.raw','case3012wp.mat','case9241.mat','case32.art']
-            
+
         for case in utils.test_cases:
 
             if case.split('/')[-1] in skipcases:
@@ -237,60 +1259,39 @@ class TestPowerFlow(unittest.TestCase):
             # Only small
             if net.num_buses > 3000:
                 continue
-            
-            self.assertEqual(net.num_periods,1)
-
-            # IPOPT
-            try:
-                net.update_properties()
-                gen_P_cost = net.gen_P_cost
-                method_ipopt.solve(net)
-                has_ipopt = True
-                self.assertEqual(method_ipopt.results['solver status'],'solved')
-                self.assertEqual(net.gen_P_cost,gen_P_cost)
-                self.assertNotEqual(method_ipopt.results['network snapshot'].gen_P_cost,gen_P_cost)
-                self.assertEqual(method_ipopt.results['solver name'], 'ipopt')
-                x1 = method_ipopt.get_results()['solver primal variables']
-                i1 = method_ipopt.get_results()['solver iterations']
-                p1 = method_ipopt.get_results()['network snapshot'].gen_P_cost
-                print("%s\t%s\t%d" %(case.split('/')[-1],'ipopt',i1))
-            except ImportError:
-                has_ipopt = False
 
-            # INLP
-            net.update_properties()
-            gen_P_cost = net.gen_P_cost
-            method_inlp.solve(net)
-            self.assertEqual(method_inlp.results['solver status'],'solved')
-            self.assertEqual(net.gen_P_cost,gen_P_cost)
-            self.assertNotEqual(method_inlp.results['network snapshot'].gen_P_cost,gen_P_cost)
-            self.assertEqual(method_inlp.results['solver name'], 'inlp')
-            x2 = method_inlp.get_results()['solver primal variables']
-            i2 = method_inlp.get_results()['solver iterations']
-            p2 = method_inlp.get_results()['network snapshot'].gen_P_cost
-            print("%s\t%s\t%d" %(case.split('/')[-1],'inlp',i2))
+            method = gopt.power_flow.new_method('ACOPF')
+            method.set_parameters({'solver': 'augl',
+                                   'quiet': True})
+            method.solve(net)
+            cost = method.results['network snapshot'].gen_P_cost
+            self.assertTrue('start statuses' not in method.results)
 
-            # AUGL
-            net.update_properties()
-            gen_P_cost = net.gen_P_cost
-            method_augl.solve(net)
-            self.assertEqual(method_augl.results['solver status'],'solved')
-            self.assertEqual(net.gen_P_cost,gen_P_cost)
-            self.assertNotEqual(method_augl.results['network snapshot'].gen_P_cost,gen_P_cost)
-            self.assertEqual(method_augl.results['solver name'], 'augl')
-            x3 = method_augl.get_results()['solver primal variables']
-            i3 = method_augl.get_results()['solver iterations']
-            p3 = method_augl.get_results()['network snapshot'].gen_P_cost
-            print("%s\t%s\t%d" %(case.split('/')[-1],'augl',i3))
+            # All starts
+            method.set_parameters({'num_starts': 4,
+                                   'num_procs': 2})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['solver status'],'solved')
+            self.assertEqual(len(results['start statuses']),4)
+            self.assertEqual(results['cancelled starts'],0)
+            costs = results['start costs']
+            best = results['best start']
+            self.assertEqual(results['start statuses'][best],'solved')
+            self.assertEqual(costs[best],np.nanmin(costs[np.array(results['start statuses']) == 'solved']))
+            self.assertLess(np.abs(results['network snapshot'].gen_P_cost-costs[best]),1e-6*(1.+np.abs(costs[best])))
+            self.assertLessEqual(costs[best],cost*(1.+eps/100.))
 
-            # Checks
-            if has_ipopt:
-                error = 100*(p1-p3)/abs(p3)
-                self.assertLess(np.abs(error),eps)
-                self.assertNotEqual(p1,p3)
-            error = 100*(p2-p3)/abs(p3)
-            self.assertLess(np.abs(error),eps)
-            self.assertNotEqual(p2,p3)
+            # Bound
+            method.set_parameters({'num_starts': 4,
+                                   'num_procs': 1,
+                                   'cost_bound': 1.1*np.abs(costs[best])+1.})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['solver status'],'solved')
+            self.assertEqual(results['best start'],0)
+            self.assertEqual(results['cancelled starts'],3)
+            self.assertEqual(results['start statuses'][1:],3*['cancelled'])
 
     def test_DCOPF_solutions(self):
 
@@ -438,6 +1439,292 @@ class TestPowerFlow(unittest.TestCase):
                         self.assertEqual(load.sens_P_u_bound[t],mu2[load.index_P[t]])
                         self.assertEqual(load.sens_P_l_bound[t],pi2[load.index_P[t]])
                      
+    def test_DCOPF_lazy_thermal_limits(self):
+
+        T = 2
+
+        skipcases = ['ieee25.raw','case1354.mat','case2869.mat',
+                     'case3375wp.mat','case9241.mat']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case,T)
+
+            for branch in net.branches:
+                if branch.ratingA == 0:
+                    branch.ratingA = 100
+
+            method = gopt.power_flow.new_method('DCOPF')
+            method.set_parameters({'quiet': True,
+                                   'thermal_limits': True})
+
+            # All limits
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertTrue('lazy rounds' not in method.results)
+            cost = method.results['network snapshot'].gen_P_cost
+            lam,nu,mu,pi = method.results['solver dual variables']
+
+            # Lazy limits
+            method.set_parameters({'lazy_thermal_limits': True})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertGreaterEqual(method.results['lazy rounds'],1)
+            self.assertLessEqual(method.results['lazy rows'].size,net.num_branches*T)
+            self.assertLess(norm(method.results['network snapshot'].gen_P_cost-cost,np.inf),
+                            1e-4*(1.+norm(cost,np.inf)))
+            x = method.results['solver primal variables']
+            lam1,nu1,mu1,pi1 = method.results['solver dual variables']
+            self.assertTupleEqual(x.shape,(net.num_vars,))
+            self.assertTupleEqual(lam1.shape,lam.shape)
+            self.assertTupleEqual(mu1.shape,mu.shape)
+            self.assertTupleEqual(pi1.shape,pi.shape)
+
+            # Max rounds
+            method.set_parameters({'lazy_max_rounds': 1})
+            method.solve(net)
+            self.assertEqual(method.results['lazy rounds'],1)
+            self.assertEqual(method.results['lazy rows'].size,0)
+            if method.results['solver status'] != 'solved':
+                self.assertEqual(method.results['solver status'],'error')
+                self.assertTrue('lazy_max_rounds' in method.results['solver message'])
+            lam1,nu1,mu1,pi1 = method.results['solver dual variables']
+            self.assertTupleEqual(mu1.shape,mu.shape)
+            method.set_parameters({'lazy_max_rounds': 0})
+            self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+
+    def test_SCDCOPF(self):
+
+        for case in utils.test_cases:
+
+            net = pf.Parser(case).parse(case)
+
+            # Only small
+            if net.num_buses > 300:
+                continue
+
+            # Ratings feasible for given dispatch
+            dcpf = gopt.power_flow.new_method('DCPF')
+            results = dcpf.solve_contingencies(net)
+            flows = results['contingency flows']
+            ok = [k for k in range(net.num_branches) if k not in results['islanding outages']]
+            for branch in net.branches:
+                branch.ratingA = 1.05*np.max(np.abs(flows[branch.index,ok]))+1e-3
+
+            # DCOPF
+            method = gopt.power_flow.new_method('DCOPF')
+            method.set_parameters({'quiet': True,
+                                   'thermal_limits': True})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            cost = method.results['network snapshot'].gen_P_cost
+
+            # SCDCOPF
+            method = gopt.power_flow.new_method('SCDCOPF')
+            self.assertTrue(method.get_parameters()['thermal_limits'])
+            method.set_parameters({'quiet': True,
+                                   'contingency_block_size': 7})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['solver status'],'solved')
+            self.assertGreaterEqual(results['contingency rounds'],1)
+            self.assertLess(results['contingency rounds'],method.get_parameters()['contingency_max_rounds'])
+            cons = results['contingency constraints']
+            self.assertEqual(cons.shape[1],3)
+            self.assertTrue(np.all(cons[:,1] >= -1))
+            self.assertTrue(np.all(cons[:,2] == 0))
+            self.assertGreaterEqual(results['network snapshot'].gen_P_cost,cost-1e-4*(1.+np.abs(cost)))
+            x = results['solver primal variables']
+            self.assertTupleEqual(x.shape,(results['network snapshot'].num_vars,))
+
+            # Bounded cache of distribution factors
+            method.set_parameters({'contingency_max_columns': 3})
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertEqual(method.results['contingency rounds'],results['contingency rounds'])
+            self.assertTrue(np.all(method.results['contingency constraints'] == cons))
+            self.assertTrue(np.all(method.results['islanding outages'] == results['islanding outages']))
+            method.set_parameters({'contingency_max_columns': 2000})
+            method.solve(net)
+            results = method.get_results()
+
+            # Unsupported warm start and problem reuse
+            method.set_warm_start(x)
+            self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+            method.set_warm_start(None)
+            method.set_parameters({'reuse_problem': True})
+            self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+            method.set_parameters({'reuse_problem': False})
+
+            # Post-contingency flows
+            method.update_network(net)
+            sc = dcpf.solve_contingencies(net)
+            for k in range(net.num_branches):
+                if k in sc['islanding outages']:
+                    self.assertTrue(k in results['islanding outages'])
+                    continue
+                for branch in net.branches:
+                    self.assertLessEqual(np.abs(sc['contingency flows'][branch.index,k]),
+                                         branch.ratingA*(1.+1e-4)+1e-6)
+
+            # Max rounds
+            method.set_parameters({'contingency_max_rounds': 1})
+            method.solve(net)
+            results = method.get_results()
+            self.assertEqual(results['contingency rounds'],1)
+            if results['solver status'] != 'solved':
+                self.assertEqual(results['solver status'],'error')
+                self.assertTrue('contingency_max_rounds' in results['solver message'])
+            method.set_parameters({'contingency_max_rounds': 0})
+            self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+            method.set_parameters({'contingency_max_rounds': 20})
+
+            # Bad formulation
+            method.set_parameters({'formulation': 'ptdf'})
+            self.assertRaises(gopt.power_flow.PFmethodError,method.solve,net)
+
+    def test_DCOPF_ptdf(self):
+
+        T = 2
+
+        skipcases = ['ieee25.raw','case1354.mat','case2869.mat',
+                     'case3375wp.mat','case9241.mat']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case,T)
+
+            for branch in net.branches:
+                if branch.ratingA == 0:
+                    branch.ratingA = 100
+
+            method = gopt.power_flow.new_method('DCOPF')
+            method.set_parameters({'quiet': True,
+                                   'thermal_limits': True})
+
+            # Angle formulation
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            cost = method.results['network snapshot'].gen_P_cost
+            lam,nu,mu,pi = method.results['solver dual variables']
+
+            # PTDF formulation
+            for lazy in [False,True]:
+                method.set_parameters({'formulation': 'ptdf',
+                                       'lazy_thermal_limits': lazy})
+                method.solve(net)
+                self.assertEqual(method.results['solver status'],'solved')
+                self.assertLess(norm(method.results['network snapshot'].gen_P_cost-cost,np.inf),
+                                1e-4*(1.+norm(cost,np.inf)))
+                lam1,nu1,mu1,pi1 = method.results['solver dual variables']
+                self.assertTupleEqual(lam1.shape,(net.num_buses*T,))
+                self.assertLess(norm(lam1-lam[:net.num_buses*T],np.inf),
+                                1e-3*(1.+norm(lam,np.inf)))
+                self.assertTupleEqual(mu1.shape,pi1.shape)
+
+            # Kept factors
+            linsolver = method._factors.linsolver
+            for load in net.loads:
+                load.P = load.P*1.05
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertTrue(method._factors.linsolver is linsolver)
+            for branch in net.branches:
+                branch.b *= 2.
+            method.solve(net)
+            self.assertTrue(method._factors.linsolver is not linsolver)
+
+            method.set_parameters({'formulation': 'foo'})
+            self.assertRaises(gopt.power_flow.method_error.PFmethodError_BadParams,
+                              method.solve,net)
+
+    def test_DCOPF_reuse_problem(self):
+
+        T = 2
+
+        skipcases = ['case1354.mat','case2869.mat',
+                     'case3375wp.mat','case9241.mat']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case,T)
+
+            method = gopt.power_flow.new_method('DCOPF')
+            method.set_parameters({'quiet': True,
+                                   'reuse_problem': True})
+
+            for k in range(3):
+
+                for load in net.loads:
+                    load.P = load.P*(1.+0.05*k)
+
+                # Reference
+                ref = gopt.power_flow.new_method('DCOPF')
+                ref.set_parameters({'quiet': True})
+                ref.solve(net)
+                self.assertEqual(ref.results['solver status'],'solved')
+
+                # Reused
+                method.solve(net)
+                self.assertEqual(method.results['solver status'],'solved')
+                cost = ref.results['network snapshot'].gen_P_cost
+                self.assertLess(norm(method.results['network snapshot'].gen_P_cost-cost,np.inf),
+                                1e-4*(1.+norm(cost,np.inf)))
+
+    def test_DCOPF_warm_start(self):
+
+        T = 2
+
+        skipcases = ['case1354.mat','case2869.mat',
+                     'case3375wp.mat','case9241.mat']
+
+        for case in utils.test_cases:
+
+            if case.split('/')[-1] in skipcases:
+                continue
+
+            net = pf.Parser(case).parse(case,T)
+
+            method = gopt.power_flow.new_method('DCOPF')
+            method.set_parameters({'quiet': True})
+
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            x = method.results['solver primal variables']
+            duals = method.results['solver dual variables']
+            iters = method.results['solver iterations']
+            cost = method.results['network snapshot'].gen_P_cost
+
+            # Same problem
+            method.set_warm_start(x,duals)
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+            self.assertLessEqual(method.results['solver iterations'],iters)
+            self.assertLess(norm(method.results['network snapshot'].gen_P_cost-cost,np.inf),
+                            1e-4*(1.+norm(cost,np.inf)))
+
+            # Rolling horizon
+            method.set_warm_start(x,duals,shift=1)
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+
+            # Bad warm start
+            method.set_warm_start(x[1:])
+            self.assertRaises(gopt.power_flow.method_error.PFmethodError_BadWarmStart,
+                              method.solve,net)
+            method.set_warm_start(None)
+            method.solve(net)
+            self.assertEqual(method.results['solver status'],'solved')
+
     def tearDown(self):
         
         pass